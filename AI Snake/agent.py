@@ -1,298 +1,867 @@
-import copy
-import hamiltonian_cycle
-from config import Direction
-import utils
-
-
-class State:
-    def __init__(self, board, g_heu, heuristic_function, path):
-        self.board = board
-        if heuristic_function is not None:
-            self.h = heuristic_function(self)
-        else:
-            self.h = 0
-        self.g = g_heu
-        self.f = self.h + self.g
-        self.path = path
-
-    def is_goal(self):
-        """
-        Checking if we the snake's head got to the location of the fruit
-        (if the snake ate the fruit)
-        :return: True if the snake ate the fruit, False otherwise
-        """
-        if self.board.snake[0] == self.board.fruit_location:
-            return True
-        return False
-
-    def is_legal_move(self, i, j):
-        """
-        Take indexes of the snake's head coordinates after a move and check if the move is legal
-        :param i: The first coordinate of the snake's head
-        :param j: The second coordinate of the snake's head
-        :return: True of the move is legal,false otherwise
-        """
-        board_size = self.board.board_size
-
-        i, j = utils.cyclic(i, board_size), utils.cyclic(j, board_size)
-        return 0 <= i < board_size and 0 <= j < board_size and (i, j) not in self.board.obstacles and (
-            i, j) not in self.board.snake
-
-    def legal_action(self, flag=False):
-        """
-        Returns the legal actions of the snake from it's current state
-        :param flag: A parameter to determine if the board has borders or not
-        :return: A list of the legal moves
-        """
-        legal_actions = {Direction.LEFT, Direction.RIGHT, Direction.UP, Direction.DOWN}
-        i, j = self.board.snake[0]
-
-        if not self.is_legal_move(i - 1, j):
-            legal_actions.remove(Direction.UP)
-        if not self.is_legal_move(i + 1, j):
-            legal_actions.remove(Direction.DOWN)
-        if not self.is_legal_move(i, j - 1):
-            legal_actions.remove(Direction.LEFT)
-        if not self.is_legal_move(i, j + 1):
-            legal_actions.remove(Direction.RIGHT)
-        if flag:
-            if j - 1 < 0 and Direction.LEFT in legal_actions:
-                legal_actions.remove(Direction.LEFT)
-            if j + 1 >= self.board.board_size and Direction.RIGHT in legal_actions:
-                legal_actions.remove(Direction.RIGHT)
-            if i - 1 < 0 and Direction.UP in legal_actions:
-                legal_actions.remove(Direction.UP)
-            if i + 1 >= self.board.board_size and Direction.DOWN in legal_actions:
-                legal_actions.remove(Direction.DOWN)
-        return list(legal_actions)
-
-    def __eq__(self, other):
-        return other.board == self.board
-
-    def __hash__(self) -> int:
-        return hash(self.board)
-
-
-class Agent:
-    def next_move(self, board, flag=False):
-        """
-        Returns the next move of the snake according to the agent
-        :param board: The board of the game
-        :param flag: A parameter to determine if the board has borders
-        :return: The next legal move of the snake, None of there is no legal moves
-        """
-        raise Exception("Method not implemented!")
-
-
-class AStarAgent(Agent):
-    def __init__(self, heuristic_function):
-        self.heuristic_function = heuristic_function
-        self.moves = []
-
-    def next_move(self, board, flag=False):
-        if not self.moves:
-            self.moves = self.search(board, flag)
-            if not self.moves:
-                return None
-        return self.moves.pop()
-
-    def search(self, board, flag):
-        """
-        Searching for the path from the snake current location to the fruit
-        :param board: The board of the path
-        :param flag: A parameter that determines if the board has borders
-        :return: A path to the fruit, empty list of there is no path
-        """
-        fringe = utils.PriorityQueueWithFunction(lambda state: state.f)
-        initial_state = State(board, 0, self.heuristic_function, [])
-        fringe.push(initial_state)
-        visited = []
-        while not fringe.is_empty():
-            item: State = fringe.pop()
-            if item in visited:
-                continue
-            visited.append(item)
-            if item.is_goal():
-                return item.path
-            for move in item.legal_action(flag):
-                new_board = copy.deepcopy(item.board)
-                new_board.next_move = move
-                new_board.step()
-                new_state = State(new_board, item.g + 1, self.heuristic_function, [move] + item.path)
-                fringe.push(new_state)
-        return []
-
-
-class HamiltonianAgent(Agent):
-    def __init__(self, board_size):
-        self.maze: hamiltonian_cycle.Maze = hamiltonian_cycle.Maze(board_size)
-        self.maze.generate()
-        self.path = []
-
-    def next_move(self, board, flag=False):
-        y, x = board.snake[0]
-        tail_y, tail_x = board.snake[~0]
-        fruit_y, fruit_x = board.fruit_location
-
-        head_pos = self.maze.get_path_number(x, y)
-        tail_pos = self.maze.get_path_number(tail_x, tail_y)
-        fruit_pos = self.maze.get_path_number(fruit_x, fruit_y)
-
-        distance_to_fruit = self.maze.path_distance(head_pos, fruit_pos)
-        distance_to_tail = self.maze.path_distance(head_pos, tail_pos)
-        cutting_amount_available = distance_to_tail - 5
-        empty_squares = self.maze.board_size - len(board.snake) - 3
-
-        if empty_squares < self.maze.board_size / 4:
-            cutting_amount_available = 0
-        elif distance_to_fruit < distance_to_tail:
-            cutting_amount_available -= 1
-            if (distance_to_tail - distance_to_fruit) * 4 > empty_squares:
-                cutting_amount_available -= 10
-        cutting_amount_desired = distance_to_fruit
-        if cutting_amount_desired < cutting_amount_available:
-            cutting_amount_available = cutting_amount_desired
-        if cutting_amount_available < 0:
-            cutting_amount_available = 0
-
-        state: State = State(board, 0, lambda s: 0, None)
-        if flag:
-            legal_moves = state.legal_action(True)
-        else:
-            legal_moves = state.legal_action()
-        can_go_right = Direction.RIGHT in legal_moves and x < board.board_size - 1
-        can_go_left = Direction.LEFT in legal_moves and x > 0
-        can_go_down = Direction.DOWN in legal_moves and y < board.board_size - 1
-        can_go_up = Direction.UP in legal_moves and y > 0
-
-        best_dir = None
-        best_dist = -1
-
-        if can_go_right:
-            dist = self.maze.path_distance(head_pos, self.maze.get_path_number(x + 1, y))
-            if cutting_amount_available >= dist > best_dist:
-                best_dir = Direction.RIGHT
-                best_dist = dist
-        if can_go_left:
-            dist = self.maze.path_distance(head_pos, self.maze.get_path_number(x - 1, y))
-            if cutting_amount_available >= dist > best_dist:
-                best_dir = Direction.LEFT
-                best_dist = dist
-        if can_go_up:
-            dist = self.maze.path_distance(head_pos, self.maze.get_path_number(x, y - 1))
-            if cutting_amount_available >= dist > best_dist:
-                best_dir = Direction.UP
-                best_dist = dist
-        if can_go_down:
-            dist = self.maze.path_distance(head_pos, self.maze.get_path_number(x, y + 1))
-            if cutting_amount_available >= dist > best_dist:
-                best_dir = Direction.DOWN
-                best_dist = dist
-
-        if best_dist >= 0:
-            return best_dir
-        if can_go_up:
-            return Direction.UP
-        if can_go_left:
-            return Direction.LEFT
-        if can_go_down:
-            return Direction.DOWN
-        if can_go_right:
-            return Direction.RIGHT
-        else:
-            return None
-
-
-class BreadthFirstSearchAgent(Agent):
-    def __init__(self):
-        self.path = []
-
-    def next_move(self, board, flag=False):
-        if not self.path:
-            self.path = self.search(board, flag)
-            if not self.path:
-                return None
-        return self.path.pop()
-
-    def search(self, board, flag=False):
-        """
-       Searching for the path from the snake current location to the fruit
-       :param board: The board of the path
-       :param flag: A parameter that determines if the board has borders
-       :return: A path to the fruit, empty list of there is no path
-       """
-        fringe = utils.Queue()
-        initial_state = State(board, 0, None, [])
-        fringe.push(initial_state)
-        visited = list()
-        while not fringe.is_empty():
-            item = fringe.pop()
-            if item in visited:
-                continue
-            visited.append(item)
-            if item.is_goal():
-                return item.path
-            for move in item.legal_action(flag):
-                self.update_fringe(item, move, fringe)
-        return []
-
-    def update_fringe(self, item: State, move, fringe):
-        """
-         Updating the fringe and the path
-         :param item: The current state of the snake
-         :param move: The move the snake will take
-         :param fringe: The data structure that contains the states
-         """
-        new_board = copy.deepcopy(item.board)
-        new_board.next_move = move
-        new_board.step()
-        new_state = State(new_board, item.g + 1, None, [move] + item.path)
-        fringe.push(new_state)
-
-
-class BestFirstSearchAgent(Agent):
-    def __init__(self, heuristic_function=utils.manhattan_d):
-        self.path = []
-        self.h = heuristic_function
-
-    def next_move(self, board, flag=False):
-        if not self.path:
-            self.path = self.search(board, flag)
-            if not self.path:
-                return None
-        return self.path.pop()
-
-    def search(self, board, flag=False):
-        """
-       Searching for the path from the snake current location to the fruit
-       :param board: The board of the path
-       :param flag: A parameter that determines if the board has borders
-       :return: A path to the fruit, empty list of there is no path
-       """
-        fringe = utils.PriorityQueue()
-        initial_state = State(board, 0, None, [])
-        fringe.push(initial_state, self.h)
-        visited = []
-        while not fringe.is_empty():
-            item = fringe.pop()
-            if item in visited:
-                continue
-            visited.append(item)
-            if item.is_goal():
-                return item.path
-            for move in item.legal_action(flag):
-                self.update_fringe(item, move, fringe)
-        return []
-
-    def update_fringe(self, item: State, move, fringe):
-        """
-        Updating the fringe and the path
-        :param item: The current state of the snake
-        :param move: The move the snake will take
-        :param fringe: The data structure that contains the states
-        """
-        new_board = copy.deepcopy(item.board)
-        new_board.next_move = move
-        new_board.step()
-        new_state = State(new_board, item.g + 1, None, [move] + item.path)
-        fringe.push(new_state, item.g)
+import heapq
+import math
+import os
+import sys
+import time
+from collections import deque
+
+import distances
+import grid_search
+import hamiltonian_cycle
+from bitboard import SnakeState
+import planning
+from planning import PlanCache
+from config import Direction
+import utils
+
+
+class State:
+    def __init__(self, board: SnakeState, g_heu, heuristic_function, path, parent=None, move=None, h=None):
+        """
+        :param board: The SnakeState of the state
+        :param g_heu: The cost of the path to the state
+        :param heuristic_function: The heuristic of the search, None for no heuristic
+        :param path: The path to the state, the next move last. None for a state that keeps a pointer to its parent
+        :param parent: The state this state was generated from, when the path is not copied
+        :param move: The move from the parent to this state
+        :param h: The heuristic value of the state when it was already computed (see AStarAgent.search)
+        """
+        self.board = board
+        if h is not None:
+            self.h = h
+        elif heuristic_function is not None:
+            self.h = heuristic_function(self)
+        else:
+            self.h = 0
+        self.g = g_heu
+        self.f = self.h + self.g
+        self.path = path
+        self.parent = parent
+        self.move = move
+
+    def plan(self):
+        """
+        Returns the path to the state, the next move last, rebuilt from the parent pointers if it wasn't copied
+        """
+        if self.path is not None:
+            return self.path
+        moves = []
+        state = self
+        while state.parent is not None:
+            moves.append(state.move)
+            state = state.parent
+        return moves
+
+    def is_goal(self):
+        """
+        Checking if we the snake's head got to the location of the fruit
+        (if the snake ate the fruit)
+        :return: True if the snake ate the fruit, False otherwise
+        """
+        return self.board.head == self.board.fruit
+
+    def is_legal_move(self, i, j):
+        """
+        Take indexes of the snake's head coordinates after a move and check if the move is legal
+        :param i: The first coordinate of the snake's head
+        :param j: The second coordinate of the snake's head
+        :return: True of the move is legal,false otherwise
+        """
+        return self.board.is_free(i, j)
+
+    def legal_action(self, flag=False):
+        """
+        Returns the legal actions of the snake from it's current state
+        :param flag: A parameter to determine if the board has borders or not
+        :return: A list of the legal moves
+        """
+        legal_actions = {Direction.LEFT, Direction.RIGHT, Direction.UP, Direction.DOWN}
+        i, j = divmod(self.board.head, self.board.board_size)
+
+        if not self.is_legal_move(i - 1, j):
+            legal_actions.remove(Direction.UP)
+        if not self.is_legal_move(i + 1, j):
+            legal_actions.remove(Direction.DOWN)
+        if not self.is_legal_move(i, j - 1):
+            legal_actions.remove(Direction.LEFT)
+        if not self.is_legal_move(i, j + 1):
+            legal_actions.remove(Direction.RIGHT)
+        if flag:
+            if j - 1 < 0 and Direction.LEFT in legal_actions:
+                legal_actions.remove(Direction.LEFT)
+            if j + 1 >= self.board.board_size and Direction.RIGHT in legal_actions:
+                legal_actions.remove(Direction.RIGHT)
+            if i - 1 < 0 and Direction.UP in legal_actions:
+                legal_actions.remove(Direction.UP)
+            if i + 1 >= self.board.board_size and Direction.DOWN in legal_actions:
+                legal_actions.remove(Direction.DOWN)
+        # a fixed order, so seeded games do not depend on the hash seed of the process
+        return [direction for direction in Direction if direction in legal_actions]
+
+    def key(self, exact=False):
+        """
+        Returns the identity of the state in the closed list of a search
+        :param exact: If True states are identified by the whole snake (head and body), otherwise states are merged
+        by the position of the head only, which keeps the searches polynomial in the size of the board
+        :return: A hashable key of the state
+        """
+        if exact:
+            return self.board
+        return self.board.head
+
+    def __eq__(self, other):
+        return isinstance(other, State) and other.board == self.board
+
+    def __hash__(self) -> int:
+        return hash(self.board)
+
+
+class Agent:
+    """
+    Base class of the agents. Searching agents count the states they expand in `nodes_expanded`, and stop searching
+    after `deadline` milliseconds per move when it is set
+    """
+    nodes_expanded = 0
+    deadline = None
+
+    def time_limit(self):
+        """
+        Returns the time (of time.perf_counter) a search that starts now must stop at, None if there is no deadline
+        """
+        if self.deadline is None:
+            return None
+        return time.perf_counter() + self.deadline / 1000
+
+    @staticmethod
+    def progress(state):
+        """
+        The rank of a state of the search as the end of a partial plan, lower is better: the closer to the fruit the
+        better, and then the shorter the plan
+        """
+        board = state.board
+        size = board.board_size
+        return utils.manhattan_d(divmod(board.head, size), divmod(board.fruit, size)), state.g
+
+    def spacetime_search(self, board, flag=False, heuristic=True):
+        """
+        Searching for the path to the fruit in space and time, see grid_search.spacetime_search
+        :param board: The board of the path
+        :param flag: A parameter to determine if the board has borders
+        :param heuristic: A* with the heuristic of the agent if True, breadth first search otherwise
+        :return: A path to the fruit, empty list of there is no path. A partial path if the deadline expired
+        """
+        time_limit = self.time_limit()
+        state = SnakeState.from_board(board)
+        grid = grid_search.Grid(state, flag)
+        estimate, snake = None, None
+        if heuristic:
+            cells = getattr(self.heuristic_function, 'cells', None)
+            if cells is not None:  # the heuristic only looks at the head (heuristics.manhattan_cells)
+                estimate = lambda cell, _: cells(grid, cell)
+            else:
+                estimate = lambda _, board_state: self.heuristic_function(State(board_state, 0, None, None))
+                snake = state
+        path, expanded = grid_search.spacetime_search(grid, utils.ClosedList(), estimate, time_limit, snake)
+        self.nodes_expanded += expanded
+        if not path and time_limit is not None and time.perf_counter() > time_limit:
+            return self.partial_plan(State(state, 0, None, []), flag)
+        return path
+
+    @staticmethod
+    def partial_plan(best, flag=False):
+        """
+        The plan to return when the deadline expires: the path to the best state reached so far, or when the search
+        didn't get anywhere a single move to the free space where the tail can be chased
+        :param best: The best state of the search so far
+        :param flag: A parameter to determine if the board has borders
+        :return: A plan, the next move last
+        """
+        plan = best.plan()
+        if plan:
+            return plan
+        move = planning.escape_move(best.board, flag)
+        return [move] if move else []
+
+    def next_move(self, board, flag=False):
+        """
+        Returns the next move of the snake according to the agent
+        :param board: The board of the game
+        :param flag: A parameter to determine if the board has borders
+        :return: The next legal move of the snake, None of there is no legal moves
+        """
+        raise Exception("Method not implemented!")
+
+    def plan(self):
+        """
+        Returns the list of the planned moves the agent pops its next moves from (the next move last), clearing it
+        makes the agent search again on its next move
+        """
+        return self.path
+
+
+class AStarAgent(Agent):
+    def __init__(self, heuristic_function, exact_states=False, plan_cache=False, safe=False, deadline=None,
+                 spacetime=False):
+        """
+        :param heuristic_function: The heuristic of the search
+        :param exact_states: Identify the states of the search by the whole snake instead of by its head
+        :param plan_cache: Keep the plan and the distance field of the fruit between moves, and search only when the
+        plan is no longer valid and the shortest path to the fruit is blocked by the snake
+        :param safe: Only follow plans that leave the tail reachable from the head, and chase the tail otherwise
+        :param deadline: The time budget of a search in milliseconds, after it the best partial plan is returned
+        :param spacetime: Search the cells of the board in time (grid_search.spacetime_search), where the parts of
+        the body are free once they moved away
+        """
+        self.heuristic_function = heuristic_function
+        self.spacetime = spacetime
+        self.exact_states = exact_states
+        self.plan_cache = PlanCache() if plan_cache else None
+        self.safe = safe
+        self.deadline = deadline
+        self.moves = []
+        self.nodes_expanded = 0
+
+    def plan(self):
+        return self.moves
+
+    def next_move(self, board, flag=False):
+        if self.plan_cache is not None:
+            return self.next_cached_move(board, flag)
+        if not self.moves:
+            self.moves = self.search(board, flag)
+            if self.safe:
+                return self.next_safe_move(board, flag)
+            if not self.moves:
+                return None
+        return self.moves.pop()
+
+    def next_safe_move(self, board, flag=False):
+        """
+        Check a new plan before following it: if the snake can't chase its tail at the end of the plan (or there is no
+        plan) the plan is dropped, and the snake makes one tail chasing move and replans on the next tick
+        :return: The next move, None if the snake has no legal move
+        """
+        state = SnakeState.from_board(board)
+        if self.moves and planning.is_safe(state, self.moves, flag):
+            return self.moves.pop()
+        self.moves = []
+        return planning.escape_move(state, flag)
+
+    def next_cached_move(self, board, flag=False):
+        """
+        Returns the next move of the plan while the snake is on track, otherwise replans: the rest of the plan is
+        kept if it is still collision free, then the shortest path along the distance field is tried, and only then
+        the board is searched
+        """
+        if not (self.moves and self.plan_cache.on_track(board)):
+            state = SnakeState.from_board(board)
+            if not self.plan_cache.is_valid(state, self.moves, flag):
+                self.moves = self.plan_cache.descend(state, flag) or self.search(board, flag)
+                if self.safe and not (self.moves and planning.is_safe(state, self.moves, flag)):
+                    self.moves = []
+                    return planning.escape_move(state, flag)
+            if not self.moves:
+                return None
+        move = self.moves.pop()
+        self.plan_cache.expect(board, move)
+        return move
+
+    def search(self, board, flag):
+        """
+        Searching for the path from the snake current location to the fruit
+        :param board: The board of the path
+        :param flag: A parameter that determines if the board has borders
+        :return: A path to the fruit, empty list of there is no path. A partial path if the deadline expired
+        """
+        if self.spacetime:
+            return self.spacetime_search(board, flag, heuristic=True)
+        time_limit = self.time_limit()
+        fringe = utils.PriorityQueueWithFunction(lambda state: state.f)
+        initial_state = State(SnakeState.from_board(board), 0, self.heuristic_function, [])
+        fringe.push(initial_state)
+        closed = utils.ClosedList()
+        best, best_progress = initial_state, self.progress(initial_state)
+        # heuristics that can score all the successors of a state at once (heuristics.weighed_compact_successors)
+        successors = getattr(self.heuristic_function, 'successors', None)
+        while not fringe.is_empty():
+            if time_limit is not None and time.perf_counter() > time_limit:
+                return self.partial_plan(best, flag)
+            item: State = fringe.pop()
+            if not closed.close(item.key(self.exact_states), item.g):
+                continue
+            self.nodes_expanded += 1
+            if item.is_goal():
+                return item.path
+            children = []
+            for move in item.legal_action(flag):
+                new_board = item.board.advance(move)
+                if not closed.is_closed(new_board if self.exact_states else new_board.head, item.g + 1):
+                    children.append((move, new_board))
+            scores = successors([board for _, board in children]) if successors and children else None
+            for k, (move, new_board) in enumerate(children):
+                new_state = State(new_board, item.g + 1, self.heuristic_function, [move] + item.path,
+                                  h=scores[k] if scores else None)
+                fringe.push(new_state)
+                # the heuristic can be slow, so the generated states are ranked too and not only the expanded ones
+                if time_limit is not None and self.progress(new_state) < best_progress:
+                    best, best_progress = new_state, self.progress(new_state)
+        return []
+
+
+class HamiltonianAgent(Agent):
+    def __init__(self, board_size, tour_file=None):
+        """
+        :param board_size: The size of the board
+        :param tour_file: A file to load a precomputed tour of the same board size from. If it doesn't exist yet, the
+        generated tour is saved to it
+        """
+        if tour_file and os.path.exists(tour_file):
+            self.maze: hamiltonian_cycle.Maze = hamiltonian_cycle.Maze.load(tour_file)
+            if self.maze.board_size != board_size:
+                raise ValueError(f'The tour in {tour_file} is for a board of size {self.maze.board_size}')
+        else:
+            self.maze: hamiltonian_cycle.Maze = hamiltonian_cycle.Maze(board_size)
+            self.maze.generate()
+            if tour_file:
+                self.maze.save(tour_file)
+        self.path = []
+        # position lookups along the cycle, and per tick occupancy bitmaps of the obstacles and the snake
+        self.tour = self.maze.tour_to_number.tolist()
+        self.cells = self.maze.number_to_tour.tolist()
+        self.obstacles = None
+        self.blocked = bytearray()
+        self.blocked_cells = []
+        self.occupied = bytearray(board_size * board_size)
+        self.body = deque()
+
+    def sync(self, board):
+        """
+        Update the occupancy bitmaps of the agent to the board. Between two ticks only the head and the tail of the
+        snake change, so the bitmaps are updated from these deltas. They are rebuilt only when the board doesn't
+        follow the previous tick (a new game, or a move the agent didn't see)
+        :param board: The board of the game
+        """
+        size = board.board_size
+        snake = board.snake
+        if board.obstacles is not self.obstacles or len(board.obstacles) != len(self.blocked_cells):
+            self.obstacles = board.obstacles
+            self.blocked = bytearray(size * size)
+            self.blocked_cells = [i * size + j for i, j in board.obstacles if 0 <= i < size and 0 <= j < size]
+            for cell in self.blocked_cells:
+                self.blocked[cell] = 1
+            self.body.clear()
+        body, occupied = self.body, self.occupied
+        i, j = snake[0]
+        head = i * size + j
+        if body and body[0] != head:
+            while len(body) >= len(snake):
+                occupied[body.pop()] = 0
+            body.appendleft(head)
+            occupied[head] = 1
+        tail_i, tail_j = snake[-1]
+        if len(body) != len(snake) or body[0] != head or body[-1] != tail_i * size + tail_j:
+            for cell in body:
+                occupied[cell] = 0
+            body.clear()
+            for i, j in snake:
+                body.append(i * size + j)
+                occupied[i * size + j] = 1
+
+    def next_move(self, board, flag=False):
+        self.sync(board)
+        size = board.board_size
+        tour = self.tour
+        y, x = board.snake[0]
+        tail_y, tail_x = board.snake[~0]
+        fruit_y, fruit_x = board.fruit_location
+
+        head = x + y * size
+        head_pos = tour[head]
+        tail_pos = tour[tail_x + tail_y * size]
+        fruit_pos = tour[fruit_x + fruit_y * size]
+
+        distance_to_fruit = self.maze.path_distance(head_pos, fruit_pos)
+        distance_to_tail = self.maze.path_distance(head_pos, tail_pos)
+        cutting_amount_available = distance_to_tail - 5
+        empty_squares = self.maze.arena_size - len(board.snake) - 3
+
+        if empty_squares < self.maze.arena_size / 4:
+            cutting_amount_available = 0
+        elif distance_to_fruit < distance_to_tail:
+            cutting_amount_available -= 1
+            if (distance_to_tail - distance_to_fruit) * 4 > empty_squares:
+                cutting_amount_available -= 10
+        cutting_amount_desired = distance_to_fruit
+        if cutting_amount_desired < cutting_amount_available:
+            cutting_amount_available = cutting_amount_desired
+        if cutting_amount_available < 0:
+            cutting_amount_available = 0
+
+        blocked, occupied = self.blocked, self.occupied
+        if cutting_amount_available == 0:
+            # no shortcut is allowed, so the move is to the next cell of the cycle if it is free
+            next_cell = self.cells[(head_pos + 1) % self.maze.arena_size]
+            if not (blocked[next_cell] or occupied[next_cell]):
+                if next_cell == head + 1:
+                    return Direction.RIGHT
+                if next_cell == head - 1:
+                    return Direction.LEFT
+                return Direction.DOWN if next_cell == head + size else Direction.UP
+
+        # the neighbours inside the board that have no obstacle and no part of the snake
+        can_go_right = x < size - 1 and not (blocked[head + 1] or occupied[head + 1])
+        can_go_left = x > 0 and not (blocked[head - 1] or occupied[head - 1])
+        can_go_down = y < size - 1 and not (blocked[head + size] or occupied[head + size])
+        can_go_up = y > 0 and not (blocked[head - size] or occupied[head - size])
+
+        best_dir = None
+        best_dist = -1
+
+        if can_go_right:
+            dist = self.maze.path_distance(head_pos, tour[head + 1])
+            if cutting_amount_available >= dist > best_dist:
+                best_dir = Direction.RIGHT
+                best_dist = dist
+        if can_go_left:
+            dist = self.maze.path_distance(head_pos, tour[head - 1])
+            if cutting_amount_available >= dist > best_dist:
+                best_dir = Direction.LEFT
+                best_dist = dist
+        if can_go_up:
+            dist = self.maze.path_distance(head_pos, tour[head - size])
+            if cutting_amount_available >= dist > best_dist:
+                best_dir = Direction.UP
+                best_dist = dist
+        if can_go_down:
+            dist = self.maze.path_distance(head_pos, tour[head + size])
+            if cutting_amount_available >= dist > best_dist:
+                best_dir = Direction.DOWN
+                best_dist = dist
+
+        if best_dist >= 0:
+            return best_dir
+        if can_go_up:
+            return Direction.UP
+        if can_go_left:
+            return Direction.LEFT
+        if can_go_down:
+            return Direction.DOWN
+        if can_go_right:
+            return Direction.RIGHT
+        else:
+            return None
+
+
+class BreadthFirstSearchAgent(Agent):
+    def __init__(self, exact_states=False, distance_oracle=False, deadline=None, spacetime=False):
+        """
+        :param exact_states: Identify the states of the search by the whole snake instead of by its head
+        :param distance_oracle: Use the distance table of the board to give up at once when the fruit can't be
+        reached, and to never expand cells that can't reach the fruit
+        :param deadline: The time budget of a search in milliseconds, after it the best partial plan is returned
+        :param spacetime: Search the cells of the board in time (grid_search.spacetime_search), where the parts of
+        the body are free once they moved away
+        """
+        self.spacetime = spacetime
+        self.exact_states = exact_states
+        self.distance_oracle = distance_oracle
+        self.deadline = deadline
+        self.table = None
+        self.path = []
+        self.nodes_expanded = 0
+
+    def next_move(self, board, flag=False):
+        if not self.path:
+            self.path = self.search(board, flag)
+            if not self.path:
+                return None
+        return self.path.pop()
+
+    def search(self, board, flag=False):
+        """
+       Searching for the path from the snake current location to the fruit
+       :param board: The board of the path
+       :param flag: A parameter that determines if the board has borders
+       :return: A path to the fruit, empty list of there is no path. A partial path if the deadline expired
+       """
+        if self.spacetime:
+            return self.spacetime_search(board, flag, heuristic=False)
+        time_limit = self.time_limit()
+        fringe = utils.Queue()
+        initial_state = State(SnakeState.from_board(board), 0, None, [])
+        fringe.push(initial_state)
+        closed = utils.ClosedList()
+        self.table = None
+        if self.distance_oracle:
+            start = initial_state.board
+            self.table = distances.table_for(start.board_size, start.obstacle_mask, wrap=not flag)
+            if self.table.distance(start.head, start.fruit) is None:
+                return []
+        best, best_progress = initial_state, self.progress(initial_state)
+        while not fringe.is_empty():
+            if time_limit is not None and time.perf_counter() > time_limit:
+                return self.partial_plan(best, flag)
+            item = fringe.pop()
+            if not closed.close(item.key(self.exact_states), item.g):
+                continue
+            self.nodes_expanded += 1
+            if item.is_goal():
+                return item.path
+            if time_limit is not None and self.progress(item) < best_progress:
+                best, best_progress = item, self.progress(item)
+            for move in item.legal_action(flag):
+                self.update_fringe(item, move, fringe, closed)
+        return []
+
+    def update_fringe(self, item: State, move, fringe, closed=None):
+        """
+         Updating the fringe and the path
+         :param item: The current state of the snake
+         :param move: The move the snake will take
+         :param fringe: The data structure that contains the states
+         :param closed: The closed list of the search, states already reached as cheaply are not added
+         """
+        new_state = State(item.board.advance(move), item.g + 1, None, [move] + item.path)
+        if closed is not None and closed.is_closed(new_state.key(self.exact_states), new_state.g):
+            return
+        if self.table is not None and self.table.distance(new_state.board.head, new_state.board.fruit) is None:
+            return  # a cell in another region than the fruit can never lead to it
+        fringe.push(new_state)
+
+
+class BestFirstSearchAgent(Agent):
+    def __init__(self, heuristic_function=utils.manhattan_d, exact_states=False, deadline=None):
+        self.path = []
+        self.h = heuristic_function
+        self.exact_states = exact_states
+        self.deadline = deadline
+        self.nodes_expanded = 0
+
+    def next_move(self, board, flag=False):
+        if not self.path:
+            self.path = self.search(board, flag)
+            if not self.path:
+                return None
+        return self.path.pop()
+
+    def search(self, board, flag=False):
+        """
+       Searching for the path from the snake current location to the fruit
+       :param board: The board of the path
+       :param flag: A parameter that determines if the board has borders
+       :return: A path to the fruit, empty list of there is no path. A partial path if the deadline expired
+       """
+        time_limit = self.time_limit()
+        fringe = utils.PriorityQueue()
+        initial_state = State(SnakeState.from_board(board), 0, None, [])
+        fringe.push(initial_state, self.h)
+        closed = utils.ClosedList()
+        best, best_progress = initial_state, self.progress(initial_state)
+        while not fringe.is_empty():
+            if time_limit is not None and time.perf_counter() > time_limit:
+                return self.partial_plan(best, flag)
+            item = fringe.pop()
+            if not closed.close(item.key(self.exact_states), item.g):
+                continue
+            self.nodes_expanded += 1
+            if item.is_goal():
+                return item.path
+            if time_limit is not None and self.progress(item) < best_progress:
+                best, best_progress = item, self.progress(item)
+            for move in item.legal_action(flag):
+                self.update_fringe(item, move, fringe, closed)
+        return []
+
+    def update_fringe(self, item: State, move, fringe, closed=None):
+        """
+        Updating the fringe and the path
+        :param item: The current state of the snake
+        :param move: The move the snake will take
+        :param fringe: The data structure that contains the states
+        :param closed: The closed list of the search, states already reached as cheaply are not added
+        """
+        new_state = State(item.board.advance(move), item.g + 1, None, [move] + item.path)
+        if closed is not None and closed.is_closed(new_state.key(self.exact_states), new_state.g):
+            return
+        fringe.push(new_state, item.g)
+
+
+class MemoryBoundedAgent(Agent):
+    """
+    Base class of the searches that keep a bounded number of states in memory. The states point to their parents
+    instead of copying their paths, and the bound is a number of states, or a number of bytes divided by the size of
+    the first state of the search (the snake, the board and the state)
+    """
+
+    def __init__(self, heuristic_function, max_nodes=None, max_bytes=None, exact_states=False, deadline=None):
+        """
+        :param heuristic_function: The heuristic of the search
+        :param max_nodes: The number of states the search may keep in memory
+        :param max_bytes: The number of bytes the states of the search may take (an estimate)
+        :param exact_states: Identify the states of the search by the whole snake instead of by its head
+        :param deadline: The time budget of a search in milliseconds, after it the best partial plan is returned
+        """
+        self.heuristic_function = heuristic_function
+        self.max_nodes = max_nodes
+        self.max_bytes = max_bytes
+        self.exact_states = exact_states
+        self.deadline = deadline
+        self.path = []
+        self.nodes_expanded = 0
+
+    def next_move(self, board, flag=False):
+        if not self.path:
+            self.path = self.search(board, flag)
+            if not self.path:
+                return None
+        return self.path.pop()
+
+    def node_limit(self, state):
+        """
+        Returns the number of states the search may keep in memory, None for no limit
+        """
+        limits = []
+        if self.max_nodes is not None:
+            limits.append(self.max_nodes)
+        if self.max_bytes is not None:
+            board = state.board
+            size = sys.getsizeof(state) + sys.getsizeof(state.__dict__) + sys.getsizeof(board) + \
+                   sys.getsizeof(board.body) + sys.getsizeof(board.occupied)
+            limits.append(self.max_bytes // size)
+        return max(min(limits), 1) if limits else None
+
+    def child(self, item: State, move):
+        return State(item.board.advance(move), item.g + 1, self.heuristic_function, None, item, move)
+
+    def search(self, board, flag=False):
+        raise Exception("Method not implemented!")
+
+
+class IterativeDeepeningAStarAgent(MemoryBoundedAgent):
+    """
+    IDA*: depth first searches bounded by the f value of the states, the bound is raised to the lowest f value that
+    exceeded it until the fruit is found. Only the states of the current branch and their siblings are in memory, and a
+    transposition table of up to the node limit entries (at most one per cell when the states are identified by the
+    head) keeps the lowest g value every state was reached with in any iteration and the last iteration it was
+    expanded in. A state is expanded once per iteration and never through a longer path than a path the search
+    already found, the bound only grows so that path is in every later iteration too. A small table trades memory for
+    time, the states it can't hold are expanded again on every path to them, but never when they are on the current
+    branch already (the branch would go around in a cycle).
+    With a node limit the search expands at most EXPANSIONS states per cell of the board, and then returns the partial
+    plan to the state closest to the fruit
+    """
+    EXPANSIONS = 32
+
+    def search(self, board, flag=False):
+        """
+        Searching for the path from the snake current location to the fruit
+        :param board: The board of the path
+        :param flag: A parameter that determines if the board has borders
+        :return: A path to the fruit, empty list of there is no path. A partial path if the deadline expired
+        """
+        time_limit = self.time_limit()
+        initial_state = State(SnakeState.from_board(board), 0, self.heuristic_function, None)
+        limit = self.node_limit(initial_state)
+        budget = self.EXPANSIONS * board.board_size * board.board_size if limit is not None else None
+        best, best_progress = initial_state, self.progress(initial_state)
+        bound = initial_state.f
+        table = {}  # key: (lowest g, iteration)
+        iteration = 0
+        while True:
+            iteration += 1
+            next_bound = None
+            stack = [initial_state]
+            branch = []  # the states of the current branch, from the root
+            on_branch = set()  # the keys of the states of the branch
+            while stack:
+                if time_limit is not None and time.perf_counter() > time_limit or budget is not None and budget <= 0:
+                    return self.partial_plan(best, flag)
+                item = stack.pop()
+                if item.f > bound:
+                    if next_bound is None or item.f < next_bound:
+                        next_bound = item.f
+                    continue
+                key = item.key(self.exact_states)
+                entry = table.get(key)
+                if entry is not None and (entry[0] < item.g or entry == (item.g, iteration)):
+                    continue
+                if entry is not None or limit is None or len(table) < limit:
+                    table[key] = (item.g, iteration)
+                self.nodes_expanded += 1
+                if item.is_goal():
+                    return item.plan()
+                if budget is not None:
+                    budget -= 1
+                if (time_limit is not None or budget is not None) and self.progress(item) < best_progress:
+                    best, best_progress = item, self.progress(item)
+                while branch and branch[-1] is not item.parent:
+                    on_branch.discard(branch.pop().key(self.exact_states))
+                branch.append(item)
+                on_branch.add(key)
+                # a state of the branch was reached with a lower g than its children, they are never worth expanding
+                children = [child for child in (self.child(item, move) for move in item.legal_action(flag))
+                            if child.key(self.exact_states) not in on_branch]
+                # the most promising child is popped first
+                children.sort(key=lambda state: state.f, reverse=True)
+                stack.extend(children)
+            if next_bound is None:
+                return []
+            bound = next_bound
+
+
+class MemoryBoundedAStarAgent(MemoryBoundedAgent):
+    """
+    Simplified memory-bounded A* (SMA*): A* until the open and the closed states reach the node limit, then the open
+    state with the highest f value (the shallowest one of the ties) is dropped and its f value is backed up into its
+    parent. A parent whose children were all dropped is opened again with the lowest f value of its forgotten
+    children, to regenerate them when they are the most promising states again. Of the states with the lowest f value
+    the deepest is expanded first, and a state that is too deep for a path through it to fit the node limit gets an
+    infinite f value
+    """
+
+    def search(self, board, flag=False):
+        """
+        Searching for the path from the snake current location to the fruit
+        :param board: The board of the path
+        :param flag: A parameter that determines if the board has borders
+        :return: A path to the fruit, empty list of there is no path. A partial path if the deadline expired or the
+        node limit is too small to hold a path to the fruit
+        """
+        time_limit = self.time_limit()
+        initial_state = State(SnakeState.from_board(board), 0, self.heuristic_function, None)
+        limit = self.node_limit(initial_state)
+        best, best_progress = initial_state, self.progress(initial_state)
+        # the open states are in a min heap and a max heap of f with lazy deletion, an entry is live while its counter
+        # is the `entry` of its state. An expanded state counts its open children and keeps the lowest f of the
+        # dropped ones in `forgotten`
+        self.low, self.high = [], []
+        self.counter = 0
+        self.num_of_open = self.num_of_expanded = 0
+        self.add_open(initial_state)
+        closed = utils.ClosedList()
+        while self.num_of_open:
+            if time_limit is not None and time.perf_counter() > time_limit:
+                return self.finish(self.partial_plan(best, flag))
+            _, _, counter, item = heapq.heappop(self.low)
+            if item.entry != counter:
+                continue
+            item.entry = None
+            self.num_of_open -= 1
+            if item.f == math.inf:  # the fruit is too far for the node limit
+                return self.finish(self.partial_plan(best, flag))
+            key = item.key(self.exact_states)
+            if item.open_children is None and not closed.close(key, item.g):
+                self.forget(item, None)  # reached as cheaply through another state
+                continue
+            self.nodes_expanded += 1
+            if item.is_goal():
+                return self.finish(item.plan())
+            if (time_limit is not None or limit is not None) and self.progress(item) < best_progress:
+                best, best_progress = item, self.progress(item)
+            self.num_of_expanded += 1
+            item.open_children, item.forgotten = 0, None
+            for move in item.legal_action(flag):
+                new_state = self.child(item, move)
+                if closed.is_closed(new_state.key(self.exact_states), new_state.g):
+                    continue
+                new_state.f = max(new_state.f, item.f)  # pathmax, the f values never decrease along a path
+                if limit is not None and new_state.g >= limit - 1 and not new_state.is_goal():
+                    new_state.f = math.inf
+                self.add_open(new_state)
+                item.open_children += 1
+            if not item.open_children:
+                self.forget(item, None)
+            while limit is not None and self.num_of_open + self.num_of_expanded > limit and self.num_of_open > 1:
+                _, _, counter, worst = heapq.heappop(self.high)
+                if worst.entry != counter:
+                    continue
+                worst.entry = None
+                self.num_of_open -= 1
+                if worst.open_children is not None:  # an expanded state that was opened again
+                    key = worst.key(self.exact_states)
+                    if closed.best_g.get(key) == worst.g:
+                        del closed.best_g[key]
+                self.forget(worst, worst.f)
+            if len(self.low) + len(self.high) > 4 * self.num_of_open + 64:
+                # the dead entries of the heaps keep the dropped states in memory
+                self.low = [entry for entry in self.low if entry[3].entry == entry[2]]
+                self.high = [entry for entry in self.high if entry[3].entry == entry[2]]
+                heapq.heapify(self.low)
+                heapq.heapify(self.high)
+        return self.finish(self.partial_plan(best, flag) if limit is not None else [])
+
+    def add_open(self, state):
+        self.counter += 1
+        state.entry = self.counter
+        if not hasattr(state, 'open_children'):
+            state.open_children = None
+        heapq.heappush(self.low, (state.f, -state.g, self.counter, state))
+        heapq.heappush(self.high, (-state.f, state.g, self.counter, state))
+        self.num_of_open += 1
+
+    def forget(self, state, f):
+        """
+        Remove a state from the open children of its parent, and back up its f value into the parent. A parent
+        without open children and with a dropped child is opened again, to regenerate it
+        :param state: The state to remove
+        :param f: The f value of the state, None for a dead end
+        """
+        parent = state.parent
+        if parent is None:
+            return
+        parent.open_children -= 1
+        if f is not None and (parent.forgotten is None or f < parent.forgotten):
+            parent.forgotten = f
+        if not parent.open_children and parent.entry is None and parent.forgotten is not None:
+            self.num_of_expanded -= 1
+            parent.f = parent.forgotten
+            self.add_open(parent)
+
+    def finish(self, plan):
+        self.low = self.high = None
+        return plan
+
+
+class BidirectionalSearchAgent(Agent):
+    """
+    Breadth first search of the cells of the board from the head and from the fruit at once (grid_search), the body
+    parts are obstacles until they leave their cells
+    """
+
+    def __init__(self):
+        self.path = []
+        self.nodes_expanded = 0
+
+    def next_move(self, board, flag=False):
+        if not self.path:
+            self.path = self.search(board, flag)
+            if not self.path:
+                return None
+        return self.path.pop()
+
+    def search(self, board, flag=False):
+        """
+        Searching for the path from the snake current location to the fruit
+        :param board: The board of the path
+        :param flag: A parameter that determines if the board has borders
+        :return: A path to the fruit, empty list of there is no path
+        """
+        path, expanded = grid_search.bidirectional_bfs(grid_search.Grid(SnakeState.from_board(board), flag))
+        self.nodes_expanded += expanded
+        return path
+
+
+class JumpPointSearchAgent(BidirectionalSearchAgent):
+    """
+    Jump point search of the cells of the board (grid_search): straight runs through open cells are crossed in one
+    jump, so only the cells around obstacles and the body are expanded
+    """
+
+    def search(self, board, flag=False):
+        grid = grid_search.Grid(SnakeState.from_board(board), flag)
+        path, expanded = grid_search.jump_point_search(grid)
+        self.nodes_expanded += expanded
+        if not path and grid.goal >= 0:  # no path, or a path that crosses itself
+            path, expanded = grid_search.bidirectional_bfs(grid)
+            self.nodes_expanded += expanded
+        return path
@@ -0,0 +1,281 @@
+"""
+A Snake arena: many snakes and many fruits on one board, every snake driven by its own agent.
+The rules are the rules of Board.step and Game.run for every snake: the head wraps around the borders, the tail is
+removed before the collision check unless a fruit was eaten, a snake dies on an obstacle, on any snake (its own body
+included) or after 256 ticks without a fruit. All the snakes move at once, snakes whose heads meet on the same cell
+both die, and the body of a dead snake is removed from the board. An eaten fruit respawns on a random free cell once all the moves of the tick are resolved.
+All the snakes share an occupancy grid of the cells (the index of the snake on a cell, -1 for none) for O(1)
+collision checks, and the set and bitmask of the blocked cells (the obstacles and all the living snakes), which step
+updates with the cells that changed. The fruits are kept in a utils.BucketGrid, so every snake is given its nearest
+fruit on every tick.
+An agent sees the board of its snake as a game Board: the other snakes are obstacles and the fruit is the nearest one.
+A snake retargets when its nearest fruit changes (another snake ate it, or a closer one spawned) and replans when the
+next cell of its plan was taken by another snake: the plan of its agent is dropped and the agent searches again.
+
+USAGE: python3 arena.py --snakes 16 --fruits 32 -s 64 --agent astar
+"""
+import random
+import time
+from collections import deque
+from optparse import OptionParser
+
+import config
+from game import Board, get_agent, get_heuristic
+from utils import BucketGrid, FreeCells
+
+STARVATION = 256
+EMPTY = -1
+OBSTACLE = -2
+_STEP = {config.Direction.LEFT: (0, -1), config.Direction.RIGHT: (0, 1),
+         config.Direction.UP: (-1, 0), config.Direction.DOWN: (1, 0)}
+
+
+class Snake:
+    def __init__(self, index, agent, head):
+        self.index = index
+        self.agent = agent
+        self.body = deque([head])
+        self.cells = set()
+        self.mask = 0
+        self.target = None
+        self.alive = True
+        self.iterations = 0
+        self.next_head = None
+        self.tail = None
+
+
+class Arena:
+    def __init__(self, board_size, obstacle_chance, agents, num_of_fruits, board_file=None, border=0, rand=random):
+        """
+        :param board_size: The size of the board
+        :param obstacle_chance: Chance to spawn obstacles in the board
+        :param agents: The agents of the snakes, one per snake
+        :param num_of_fruits: The number of fruits on the board
+        :param board_file: A file with the layout of the board
+        :param border: The borders of the board, 1 to keep the agents from moving through them
+        :param rand: A source of randomness for the snakes and the fruits
+        """
+        board = Board(board_size, obstacle_chance, board_file)
+        self.board_size = size = board.board_size
+        self.obstacles = board.obstacles
+        self.flag = border == 1
+        self.rand = rand
+        self.grid = [EMPTY] * (size * size)
+        for i, j in self.obstacles:
+            self.grid[i * size + j] = OBSTACLE
+        self.blocked = set(self.obstacles)
+        self.blocked_mask = board.obstacle_mask
+        self.free = FreeCells((i, j) for i in range(size) for j in range(size) if (i, j) not in self.obstacles)
+        self.fruits = BucketGrid(size, wrap=not self.flag)
+        self.snakes = []
+        for index, agent in enumerate(agents):
+            head = self.free.sample(rand)
+            if head is None:
+                break
+            snake = Snake(index, agent, head)
+            self.snakes.append(snake)
+            self.take(head, snake)
+        for _ in range(num_of_fruits):
+            self.spawn_fruit()
+        self.ticks = 0
+        self.decisions = 0
+
+    def take(self, cell, snake):
+        flat = cell[0] * self.board_size + cell[1]
+        self.grid[flat] = snake.index
+        self.free.remove(cell)
+        self.blocked.add(cell)
+        self.blocked_mask |= 1 << flat
+        snake.cells.add(cell)
+        snake.mask |= 1 << flat
+
+    def release(self, cell, snake):
+        flat = cell[0] * self.board_size + cell[1]
+        self.grid[flat] = EMPTY
+        if cell not in self.fruits:
+            self.free.add(cell)
+        self.blocked.discard(cell)
+        self.blocked_mask &= ~(1 << flat)
+        snake.cells.discard(cell)
+        snake.mask &= ~(1 << flat)
+
+    def owner(self, cell):
+        """
+        Returns the index of the snake on a cell, EMPTY or OBSTACLE
+        """
+        return self.grid[cell[0] * self.board_size + cell[1]]
+
+    def spawn_fruit(self):
+        """
+        Put a fruit on a random free cell
+        :return: The cell of the fruit, None if the board is full
+        """
+        cell = self.free.sample(self.rand)
+        if cell is not None:
+            self.free.remove(cell)
+            self.fruits.add(cell)
+        return cell
+
+    def view(self, snake):
+        """
+        Returns the board of a snake for its agent, see ArenaView
+        """
+        return ArenaView(self, snake)
+
+    def check_plan(self, snake, fruit):
+        """
+        Drop the plan of the agent of a snake when its nearest fruit changed or when the next cell of the plan is taken
+        by another snake
+        :param snake: The snake
+        :param fruit: The nearest fruit of the snake on this tick
+        """
+        plan = snake.agent.plan()
+        retarget, snake.target = fruit != snake.target, fruit
+        if not plan:
+            return
+        if not retarget:
+            di, dj = _STEP[plan[-1]]
+            head = snake.body[0]
+            owner = self.owner(((head[0] + di) % self.board_size, (head[1] + dj) % self.board_size))
+            if owner == EMPTY or owner == snake.index:
+                return
+        plan.clear()
+
+    def step(self):
+        """
+        Advance all the living snakes by one tick
+        :return: The number of living snakes after the tick
+        """
+        size = self.board_size
+        alive = [snake for snake in self.snakes if snake.alive]
+        for snake in alive:
+            view = self.view(snake)
+            self.check_plan(snake, view.fruit_location)
+            move = snake.agent.next_move(view, self.flag)
+            self.decisions += 1
+            if not move:
+                snake.next_head = None
+                continue
+            di, dj = _STEP[move]
+            head = snake.body[0]
+            snake.next_head = ((head[0] + di) % size, (head[1] + dj) % size)
+
+        # the tails leave first, a head can move into a cell a tail left in the same tick
+        heads = {}
+        for snake in alive:
+            if snake.next_head is None:
+                continue
+            heads[snake.next_head] = heads.get(snake.next_head, 0) + 1
+            snake.tail = None
+            if snake.next_head not in self.fruits:
+                snake.tail = snake.body.pop()
+                self.release(snake.tail, snake)
+        dead = set()
+        for snake in alive:
+            head = snake.next_head
+            if head is None or self.owner(head) != EMPTY or heads[head] > 1 or snake.iterations == STARVATION:
+                dead.add(snake)
+        eaten = 0
+        for snake in alive:
+            if snake in dead:
+                continue
+            head = snake.next_head
+            snake.body.appendleft(head)
+            self.take(head, snake)
+            snake.iterations += 1
+            if head in self.fruits:
+                self.fruits.remove(head)
+                snake.iterations = 0
+                eaten += 1
+        for snake in dead:
+            snake.alive = False
+            for part in snake.body:
+                self.release(part, snake)
+            if snake.tail is not None:  # the score is the length of the snake when it died
+                snake.body.append(snake.tail)
+        # the fruits spawn on the board after the tick, never on a cell a head or a tail moved to in it
+        for _ in range(eaten):
+            self.spawn_fruit()
+        self.ticks += 1
+        return len(alive) - len(dead)
+
+    def run(self, max_ticks=None):
+        """
+        Play until all the snakes are dead
+        :param max_ticks: Stop after this many ticks even if some snakes are still alive
+        :return: The scores of the snakes (the lengths of the snakes, when they died)
+        """
+        while any(snake.alive for snake in self.snakes) and (max_ticks is None or self.ticks < max_ticks):
+            self.step()
+        return [len(snake.body) for snake in self.snakes]
+
+
+class ArenaView:
+    """
+    The board of one snake of an Arena seen as a game Board (board_size, snake, obstacles, obstacle_mask,
+    fruit_location and next_move): the obstacles are the obstacles of the board and the other snakes, the fruit is the
+    nearest one. The obstacles are the blocked cells of the arena without the snake's own body, nothing is copied
+    """
+
+    def __init__(self, arena, snake):
+        self.board_size = arena.board_size
+        self.snake = snake.body
+        self.obstacles = BlockedCells(arena.blocked, snake.cells)
+        self.obstacle_mask = arena.blocked_mask & ~snake.mask
+        fruit, _ = arena.fruits.nearest(snake.body[0])
+        self.fruit_location = fruit if fruit is not None else ()
+        self.next_move = config.Direction.LEFT
+
+
+class BlockedCells:
+    """
+    A read only set of the blocked cells of an arena without the cells of one snake
+    """
+
+    def __init__(self, blocked, own):
+        self.blocked = blocked
+        self.own = own
+
+    def __contains__(self, cell):
+        return cell in self.blocked and cell not in self.own
+
+    def __iter__(self):
+        return (cell for cell in self.blocked if cell not in self.own)
+
+    def __len__(self):
+        return len(self.blocked) - len(self.own)
+
+
+def main():
+    usage_str = """USAGE:python3 arena.py <options>"""
+    parser = OptionParser(usage_str)
+    parser.add_option('--snakes', help='Number of snakes', default=8, type=int)
+    parser.add_option('--fruits', help='Number of fruits on the board', default=8, type=int)
+    parser.add_option('-s', '--size', dest='board_size', help='The size of the board', default=config.BOARD_SIZE,
+                      type=int)
+    parser.add_option('--obstacle-chance', help='Chance to spawn obstacles in the board', default=0.2, type=float)
+    parser.add_option('--board-file', help='A file with the layout of the board')
+    parser.add_option('-b', '--border', help="The borders of the board", default=0, type=int)
+    parser.add_option('--seed', help='Seed of the board, the snakes and the fruits', type=int)
+    parser.add_option('--ticks', help='Stop after this many ticks', type=int)
+    agents = ['astar', 'bfs', 'gbfs', 'bibfs', 'jps', 'idastar', 'smastar']
+    parser.add_option('--agent', choices=agents, default=agents[0], type='choice', metavar=agents,
+                      help='The agent of every snake')
+    parser.add_option('--heu', help='The heuristic for the A* agent', default='manhattan')
+    args, _ = parser.parse_args()
+
+    if args.seed is not None:
+        random.seed(args.seed)
+    agents = [get_agent(args.agent, size=args.board_size, heu=get_heuristic(args.heu, wrap=args.border != 1))
+              for _ in range(args.snakes)]
+    arena = Arena(args.board_size, args.obstacle_chance, agents, args.fruits, board_file=args.board_file,
+                  border=args.border)
+    start = time.perf_counter()
+    scores = arena.run(args.ticks)
+    wall_time = time.perf_counter() - start
+    print(f'{len(scores)} snakes played {arena.ticks} ticks in {wall_time:.2f}s ({arena.ticks / wall_time:.0f} '
+          f'ticks/s, {arena.decisions / wall_time:.0f} decisions/s), scores: {scores}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""
+Loading of the board assets: the obstacle templates and the board layout files.
+Every file is read and parsed once per process and cached by its absolute path and modification time, so the games of
+a --num-of-games run (or of a simulation worker) share one parsed copy, and a file that changes on disk is parsed
+again. Relative paths are resolved against the working directory first and the package directory second, so the
+scripts can be run from anywhere.
+The cached values are immutable (tuples and frozensets), copy them before changing them.
+"""
+import os
+from collections import namedtuple
+
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(PACKAGE_DIR, 'data')
+
+BoardLayout = namedtuple('BoardLayout', ['size', 'obstacles', 'mask'])
+BoardLayout.__doc__ = """
+A board file: the number of rows, the frozenset of the (row, col) obstacles and their bitmask (cell row * size + col)
+"""
+
+_cache = {}  # (parser, absolute path): (mtime, value)
+
+
+def resolve(file_name, directory=PACKAGE_DIR):
+    """
+    Returns the absolute path of a file: the path itself if it exists, otherwise relative to a directory of the package
+    :param file_name: The path of the file
+    :param directory: The directory to look in when the path doesn't exist from the working directory
+    """
+    if os.path.isabs(file_name) or os.path.exists(file_name):
+        return os.path.abspath(file_name)
+    return os.path.join(directory, file_name)
+
+
+def data_path(file_name):
+    """
+    Returns the absolute path of a file of the data directory of the package
+    """
+    return resolve(file_name, DATA_DIR)
+
+
+def _cached(parse, path):
+    mtime = os.stat(path).st_mtime_ns
+    key = (parse, path)
+    entry = _cache.get(key)
+    if entry is None or entry[0] != mtime:
+        with open(path) as file:
+            entry = _cache[key] = (mtime, parse(file))
+    return entry[1]
+
+
+def _parse_templates(file):
+    return tuple(tuple(tuple(int(c) for c in part.split(',')) for part in line.strip().split('_'))
+                 for line in file if line.strip())
+
+
+def _parse_layout(file):
+    rows = [line.strip().split(',') for line in file if line.strip()]
+    obstacles = frozenset((i, j) for i, row in enumerate(rows) for j, cell in enumerate(row) if cell == 'x')
+    return BoardLayout(len(rows), obstacles, obstacle_mask(obstacles, len(rows)))
+
+
+def obstacle_templates(file_name='obt.txt'):
+    """
+    Loading the obstacle templates of the random boards
+    :param file_name: The file of the templates, one template per line of '_' separated 'row,col' offsets
+    :return: A tuple of the templates, every template a tuple of (row, col) offsets
+    """
+    return _cached(_parse_templates, data_path(file_name))
+
+
+def board_layout(file_name):
+    """
+    Loading a board file of rows of comma separated cells, 'x' for an obstacle
+    :param file_name: The file of the board
+    :return: The BoardLayout of the file
+    """
+    return _cached(_parse_layout, resolve(file_name))
+
+
+def board_layouts():
+    """
+    Returns the BoardLayouts of all the board files loaded in this process
+    """
+    return [value for (parse, _), (_, value) in _cache.items() if parse is _parse_layout]
+
+
+def obstacle_mask(obstacles, board_size):
+    """
+    Returns the bitmask of a collection of (row, col) cells, the layout of bitboard.SnakeState
+    """
+    mask = 0
+    for i, j in obstacles:
+        mask |= 1 << (i * board_size + j)
+    return mask
+
+
+def clear_cache():
+    _cache.clear()
@@ -0,0 +1,219 @@
+"""
+Reproducible benchmark of the AI Snake agents and heuristics.
+Every agent plays the same fixed seeds (and so the same boards) on several board sizes. For every (agent, size) the
+benchmark records the nodes expanded, the per-move latency percentiles, the peak memory of the games and the final
+board coverage, writes them to a JSON file, and can compare them against a baseline file to catch regressions.
+The latency percentiles with few moves above them and the p99 latency are too noisy to fail the comparison, unless
+asked to.
+
+USAGE: python3 benchmark.py -o bench.json [--baseline old_bench.json]
+"""
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from optparse import OptionParser
+
+import numpy as np
+
+import display_engine
+from game import Game, get_agent, get_heuristic
+
+# name: (agent, heuristic)
+CONFIGS = {
+    'astar-manhattan': ('astar', 'manhattan'),
+    'astar-weighted-compact': ('astar', 'weighted-compact'),
+    'bfs': ('bfs', 'manhattan'),
+    'gbfs': ('gbfs', 'manhattan'),
+    'bibfs': ('bibfs', 'manhattan'),
+    'jps': ('jps', 'manhattan'),
+    'idastar': ('idastar', 'manhattan'),
+    'smastar': ('smastar', 'manhattan'),
+    'hamiltonian': ('hamiltonian', 'manhattan'),
+}
+
+# metric: True if a higher value is better
+METRICS = {
+    'nodes_expanded': False,
+    'latency_p50_ms': False,
+    'latency_p90_ms': False,
+    'latency_p99_ms': False,
+    'memory_peak_kb': False,
+    'coverage': True,
+}
+# the tail latency of a few games is mostly timer and scheduler noise, it is reported but only gated on request
+GATED_METRICS = tuple(metric for metric in METRICS if metric != 'latency_p99_ms')
+# latency percentile: the share of the moves at or above it
+LATENCY_TAILS = {'latency_p50_ms': 0.5, 'latency_p90_ms': 0.1, 'latency_p99_ms': 0.01}
+# a latency percentile with fewer moves than this above it is never a regression
+MIN_LATENCY_SAMPLES = 200
+
+
+def play(config, board_size, seed, obstacle_chance, trace_memory=False):
+    """
+    Play one seeded game with one of the configurations
+    :param config: The name of the configuration in CONFIGS
+    :param board_size: The size of the board
+    :param seed: The seed of the game, which fixes the board and the fruits
+    :param obstacle_chance: The chance to spawn obstacles (the Hamiltonian agent always plays without obstacles)
+    :param trace_memory: Measure the peak memory of the game with tracemalloc (slows the game down)
+    :return: A tuple of (score, nodes expanded, list of per move latencies in seconds, peak memory in bytes)
+    """
+    agent_name, heu = CONFIGS[config]
+    if agent_name == 'hamiltonian':
+        obstacle_chance = 0
+    random.seed(seed)
+    np.random.seed(seed)
+    if trace_memory:
+        tracemalloc.start()
+    agent = get_agent(agent_name, size=board_size, heu=get_heuristic(heu))
+    game = Game(board_size, obstacle_chance, agent, display_engine.DefaultDisplayEngine, num_of_games=1,
+                frame_rate=None, verbose=False)
+
+    latencies = []
+    next_move = agent.next_move
+
+    def timed_next_move(board, flag=False):
+        start = time.perf_counter()
+        move = next_move(board, flag)
+        latencies.append(time.perf_counter() - start)
+        return move
+
+    agent.next_move = timed_next_move
+    score = game.run()
+    peak = 0
+    if trace_memory:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return score, agent.nodes_expanded, latencies, peak
+
+
+def benchmark(configs, sizes, seeds, obstacle_chance, measure_memory=True, log=sys.stderr):
+    """
+    Run all the configurations on all the board sizes and seeds
+    :return: A dictionary of the metrics of every '<config>/<size>'
+    """
+    results = {}
+    for config in configs:
+        for board_size in sizes:
+            scores, nodes, latencies, peaks = [], 0, [], []
+            for seed in seeds:
+                score, expanded, game_latencies, _ = play(config, board_size, seed, obstacle_chance)
+                scores.append(score)
+                nodes += expanded
+                latencies += game_latencies
+                if measure_memory:
+                    # the games are deterministic, so the memory is measured on a replay of the same game
+                    peaks.append(play(config, board_size, seed, obstacle_chance, trace_memory=True)[3])
+            latencies_ms = np.array(latencies) * 1000 if latencies else np.zeros(1)
+            key = f'{config}/{board_size}'
+            results[key] = {
+                'games': len(seeds),
+                'moves': len(latencies),
+                'nodes_expanded': nodes,
+                'latency_p50_ms': float(np.percentile(latencies_ms, 50)),
+                'latency_p90_ms': float(np.percentile(latencies_ms, 90)),
+                'latency_p99_ms': float(np.percentile(latencies_ms, 99)),
+                'memory_peak_kb': max(peaks) / 1024 if peaks else None,
+                'coverage': sum(scores) / (len(scores) * board_size * board_size),
+            }
+            print(f'{key}: {json.dumps(results[key])}', file=log)
+    return results
+
+
+def compare(results, baseline, tolerance, min_latency_delta_ms=0.05, min_latency_samples=MIN_LATENCY_SAMPLES,
+            metrics=GATED_METRICS):
+    """
+    Compare results against a baseline
+    :param results: The metrics of the current run
+    :param baseline: The metrics of the baseline run
+    :param tolerance: The relative change that is allowed before a metric counts as a regression
+    :param min_latency_delta_ms: Latency changes smaller than this are timer noise and never count as regressions
+    :param min_latency_samples: Latency changes count as regressions only when both runs have this many moves above
+    the percentile
+    :param metrics: The metrics of METRICS to compare
+    :return: A list of descriptions of the regressions
+    """
+    regressions = []
+    for key, current in results.items():
+        if key not in baseline:
+            continue
+        samples = min(current.get('moves', 0), baseline[key].get('moves', 0))
+        for metric in metrics:
+            higher_is_better = METRICS[metric]
+            new, old = current.get(metric), baseline[key].get(metric)
+            if new is None or old is None:
+                continue
+            if metric in LATENCY_TAILS and samples * LATENCY_TAILS[metric] < min_latency_samples:
+                continue
+            if higher_is_better:
+                regressed = new < old * (1 - tolerance)
+            else:
+                regressed = new > old * (1 + tolerance)
+            if metric.endswith('_ms') and abs(new - old) < min_latency_delta_ms:
+                regressed = False
+            if regressed:
+                regressions.append(f'{key} {metric}: {old:.4g} -> {new:.4g}')
+    return regressions
+
+
+def main():
+    usage_str = """USAGE:python3 benchmark.py <options>"""
+    parser = OptionParser(usage_str)
+    parser.add_option('-o', '--output', help='File to write the results to', default='bench.json')
+    parser.add_option('--baseline', help='A results file to compare against')
+    parser.add_option('--tolerance', help='Allowed relative change before reporting a regression', default=0.1,
+                      type=float)
+    parser.add_option('--min-latency-delta', help='Latency changes (ms) below this are never regressions',
+                      default=0.05, type=float)
+    parser.add_option('--min-latency-samples', help='Moves a run needs above a latency percentile before it can '
+                                                    'be a regression',
+                      default=MIN_LATENCY_SAMPLES, type=int)
+    parser.add_option('--gate-p99', action='store_true', default=False,
+                      help='Report the p99 latency changes as regressions too (noisy with few games)')
+    parser.add_option('--configs', help=f'Comma separated configurations out of {",".join(CONFIGS)}',
+                      default=','.join(CONFIGS))
+    parser.add_option('--sizes', help='Comma separated board sizes', default='8,16,32')
+    parser.add_option('--seeds', help='Number of seeded games per configuration and size', default=3, type=int)
+    parser.add_option('--obstacle-chance', help='Chance to spawn obstacles in the board', default=0.2, type=float)
+    parser.add_option('--no-memory', action='store_true', default=False, help='Skip the memory measurement')
+    args, _ = parser.parse_args()
+
+    configs = args.configs.split(',')
+    for config in configs:
+        if config not in CONFIGS:
+            parser.error(f'Unknown configuration {config}')
+    sizes = [int(size) for size in args.sizes.split(',')]
+
+    results = benchmark(configs, sizes, list(range(args.seeds)), args.obstacle_chance,
+                        measure_memory=not args.no_memory)
+    report = {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'seeds': args.seeds,
+            'obstacle_chance': args.obstacle_chance,
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'results': results,
+    }
+    with open(args.output, 'w') as file:
+        json.dump(report, file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)['results']
+        metrics = tuple(METRICS) if args.gate_p99 else GATED_METRICS
+        regressions = compare(results, baseline, args.tolerance, args.min_latency_delta, args.min_latency_samples,
+                              metrics)
+        for regression in regressions:
+            print(f'REGRESSION {regression}', file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+        print('No regressions against the baseline', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
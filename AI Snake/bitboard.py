@@ -0,0 +1,168 @@
+import random
+
+import assets
+import flood_fill
+from config import Direction
+
+_zobrist_tables = {}
+
+
+def zobrist_table(board_size):
+    """
+    Returns the Zobrist keys of a board size: one random 64 bit key per cell for the occupancy of the snake, and
+    one per cell for the position of the head.
+    The keys are drawn from a private generator so hashing never consumes the game's random stream
+    :param board_size: The size of the board
+    :return: A tuple of (occupancy keys, head keys)
+    """
+    if board_size not in _zobrist_tables:
+        rand = random.Random(board_size)
+        cells = board_size * board_size
+        _zobrist_tables[board_size] = ([rand.getrandbits(64) for _ in range(cells)],
+                                       [rand.getrandbits(64) for _ in range(cells)])
+    return _zobrist_tables[board_size]
+
+
+class SnakeState:
+    """
+    A compact immutable snapshot of the snake on the board, used by the search agents instead of deep copies of
+    the whole Board.
+    Cells are stored as flat indexes (row * board_size + col). The occupied cells of the snake are kept in an
+    integer bitmask next to the body (head first), and the obstacles bitmask is shared between all the states of
+    the same board, so expanding a state never copies the board.
+    States are hashable: the hash is a Zobrist key of the head and the occupied cells, updated incrementally on
+    every move, and two states are equal when they have the same body and fruit.
+    The region of free cells reachable from the head is computed only when a heuristic asks for it, and is then
+    carried over to the successors from the move deltas (see flood_fill.advance_region).
+    """
+
+    __slots__ = ('board_size', 'obstacle_mask', 'occupied', 'body', 'fruit', 'key', 'head_region')
+
+    def __init__(self, board_size, obstacle_mask, occupied, body, fruit, key=None):
+        """
+        :param board_size: The size of the board
+        :param obstacle_mask: Bitmask of the obstacles cells, shared between states
+        :param occupied: Bitmask of the cells occupied by the snake
+        :param body: Tuple of the flat indexes of the snake, the head first
+        :param fruit: The flat index of the fruit, -1 if there is no fruit on the board
+        :param key: The Zobrist key of the state, computed from the body when not given
+        """
+        self.board_size = board_size
+        self.obstacle_mask = obstacle_mask
+        self.occupied = occupied
+        self.body = body
+        self.fruit = fruit
+        if key is None:
+            cell_keys, head_keys = zobrist_table(board_size)
+            key = head_keys[body[0]]
+            for cell in body:
+                key ^= cell_keys[cell]
+        self.key = key
+        self.head_region = None
+
+    @classmethod
+    def from_board(cls, board):
+        """
+        Build a state from a game board
+        :param board: The board of the game
+        :return: A new SnakeState with the snake, obstacles and fruit of the board
+        """
+        size = board.board_size
+        obstacle_mask = getattr(board, 'obstacle_mask', None)
+        if obstacle_mask is None:  # the views of the arena and of the vectorized environment
+            obstacle_mask = assets.obstacle_mask(board.obstacles, size)
+        body = tuple(i * size + j for i, j in board.snake)
+        occupied = 0
+        for cell in body:
+            occupied |= 1 << cell
+        fruit = board.fruit_location
+        fruit = fruit[0] * size + fruit[1] if fruit else -1
+        return cls(size, obstacle_mask, occupied, body, fruit)
+
+    @property
+    def head(self):
+        return self.body[0]
+
+    @property
+    def snake(self):
+        """
+        The snake as a list of (row, col) coordinates, the head first (same layout as Board.snake)
+        """
+        size = self.board_size
+        return [divmod(cell, size) for cell in self.body]
+
+    @property
+    def fruit_location(self):
+        if self.fruit < 0:
+            return ()
+        return divmod(self.fruit, self.board_size)
+
+    @property
+    def obstacles(self):
+        """
+        The obstacles as a set of (row, col) coordinates (same layout as Board.obstacles)
+        """
+        size = self.board_size
+        mask = self.obstacle_mask
+        cells = set()
+        while mask:
+            low = mask & -mask
+            cells.add(divmod(low.bit_length() - 1, size))
+            mask ^= low
+        return cells
+
+    def cell(self, i, j):
+        """
+        Take coordinates on the board, wrap them around the borders and return the flat index of the cell
+        """
+        size = self.board_size
+        return (i % size) * size + j % size
+
+    def is_free(self, i, j):
+        """
+        Check if the cell in the given coordinates (wrapped around the borders) has no obstacle and no snake part
+        :return: True if the cell is free, False otherwise
+        """
+        return not (self.obstacle_mask | self.occupied) >> self.cell(i, j) & 1
+
+    def advance(self, direction):
+        """
+        Make a move and return the resulting state, following the rules of Board.step: the head moves one cell
+        (wrapping around the borders) and the tail is removed unless the snake ate the fruit.
+        The current state is not changed.
+        :param direction: The direction of the move
+        :return: A new SnakeState after the move
+        """
+        size = self.board_size
+        i, j = divmod(self.body[0], size)
+        if direction == Direction.LEFT:
+            j -= 1
+        elif direction == Direction.RIGHT:
+            j += 1
+        elif direction == Direction.UP:
+            i -= 1
+        elif direction == Direction.DOWN:
+            i += 1
+        head = (i % size) * size + j % size
+
+        cell_keys, head_keys = zobrist_table(size)
+        key = self.key ^ head_keys[self.body[0]] ^ head_keys[head] ^ cell_keys[head]
+        occupied = self.occupied
+        if head == self.fruit:
+            body = (head,) + self.body
+        else:
+            tail = self.body[-1]
+            occupied &= ~(1 << tail)
+            key ^= cell_keys[tail]
+            body = (head,) + self.body[:-1]
+        state = SnakeState(size, self.obstacle_mask, occupied | 1 << head, body, self.fruit, key)
+        if self.head_region is not None:
+            state.head_region = flood_fill.advance_region(self.head_region, self, state)
+        return state
+
+    def __eq__(self, other):
+        return isinstance(other, SnakeState) and other.key == self.key and other.body == self.body and \
+               other.fruit == self.fruit
+
+    def __hash__(self):
+        return self.key
@@ -5,6 +5,7 @@ HEIGHT = 700
 GUI_WIDTH = 700
 BLOCK_SIZE = GUI_WIDTH / BOARD_SIZE
 FRAME_RATE = 30
+DISPLAY_RATE = 30  # frames per second of the GUI, independent of the speed of the game
 
 
 class Direction(enum.Enum):
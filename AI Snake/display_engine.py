@@ -1,6 +1,16 @@
-import pygame
+import math
+import sys
+import threading
+import time
+
+import assets
 import config
 
+try:
+    import pygame
+except ImportError:  # only the GUI display needs pygame
+    pygame = None
+
 
 class DisplayEngine:
     """
@@ -20,10 +30,13 @@ class DisplayEngine:
 
 class GUIDisplayEngine(DisplayEngine):
     """
-    A class to display on the monitor
+    A class to display on the monitor.
+    The screen is drawn at its own frame rate (config.DISPLAY_RATE), independent of the speed of the simulation: on
+    the ticks between two frames render returns at once, so these ticks are dropped, and a frame redraws and updates
+    only the cells that changed since the previous frame (usually the head, the neck, the tail and the apple)
     """
 
-    def __init__(self, input_cb):
+    def __init__(self, input_cb, frame_rate=None):
         # super().__init__(lambda x: print(x))
         super().__init__(input_cb)
         pygame.init()
@@ -31,15 +44,23 @@ class GUIDisplayEngine(DisplayEngine):
             (config.HEIGHT, config.GUI_WIDTH))
         self.timer = pygame.time.Clock()
         self.screen.fill((0, 0, 0))
-        self.apple = pygame.image.load(f'data/apple.png').convert()
-        self.body = pygame.image.load(f'data/body.png').convert()
-        self.head = pygame.image.load(f'data/head.png').convert()
+        self.apple = pygame.image.load(assets.data_path('apple.png')).convert()
+        self.body = pygame.image.load(assets.data_path('body.png')).convert()
+        self.head = pygame.image.load(assets.data_path('head.png')).convert()
         self.first_run = True
         self.played_games = 0
         self.end_game = False
+        self.game_over = False
+        self.frame_interval = 1 / (frame_rate or config.DISPLAY_RATE)
+        self.next_frame = 0
+        self.drawn = {}  # (row, col): what is drawn on the cell
 
     def render(self, game):
         if game.state == config.GameState.GAME_OVER:
+            if self.game_over:  # Game.run renders the end of a game more than once
+                return
+            self.game_over = True
+            self.draw(game.board)
             self.played_games += 1
             if game.num_of_games <= self.played_games:
                 if self.end_game:
@@ -48,56 +69,211 @@ class GUIDisplayEngine(DisplayEngine):
                     self.end_game = False
             else:
                 self.first_run = True
+                self.drawn = {}
                 self.screen.fill((0, 0, 0,))
                 pygame.display.update()
-        else:
-            board = game.board
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    pygame.quit()
-                if event.type == pygame.KEYDOWN:
-                    if game.state == config.GameState.PAUSED:
-                        game.state = config.GameState.RUNNING
-                    if event.key == pygame.K_LEFT and board.next_move != config.Direction.RIGHT:
-                        self.input_cb(config.Direction.LEFT)
-                    elif event.key == pygame.K_UP and board.next_move != config.Direction.DOWN:
-                        self.input_cb(config.Direction.UP)
-                    elif event.key == pygame.K_DOWN and board.next_move != config.Direction.UP:
-                        self.input_cb(config.Direction.DOWN)
-                    elif event.key == pygame.K_RIGHT and board.next_move != config.Direction.LEFT:
-                        self.input_cb(config.Direction.RIGHT)
-            block_size = config.BLOCK_SIZE
-            if self.first_run:
-                for obs_cor in board.obstacles:
-                    row, col = obs_cor[0] * block_size, obs_cor[1] * block_size
-                    rect = pygame.Rect(col, row, block_size, block_size)
-                    pygame.draw.rect(self.screen, (228, 87, 46), rect)
-            self.first_run = False
-            apple_row, apple_col = board.fruit_location[0] * block_size, \
-                                   board.fruit_location[1] * block_size
-            self.screen.blit(self.apple, (apple_col, apple_row))
+            return
+        self.game_over = False
+        now = time.perf_counter()
+        if now < self.next_frame:
+            return
+        self.next_frame = now + self.frame_interval
+        self.handle_events(game)
+        self.draw(game.board)
+
+    def handle_events(self, game):
+        board = game.board
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                pygame.quit()
+            if event.type == pygame.KEYDOWN:
+                if game.state == config.GameState.PAUSED:
+                    game.state = config.GameState.RUNNING
+                if event.key == pygame.K_LEFT and board.next_move != config.Direction.RIGHT:
+                    self.input_cb(config.Direction.LEFT)
+                elif event.key == pygame.K_UP and board.next_move != config.Direction.DOWN:
+                    self.input_cb(config.Direction.UP)
+                elif event.key == pygame.K_DOWN and board.next_move != config.Direction.UP:
+                    self.input_cb(config.Direction.DOWN)
+                elif event.key == pygame.K_RIGHT and board.next_move != config.Direction.LEFT:
+                    self.input_cb(config.Direction.RIGHT)
+
+    def draw(self, board):
+        """
+        Draw a frame: the cells whose content changed since the previous frame are redrawn, and only their rectangles
+        are updated on the screen
+        """
+        block_size = config.BLOCK_SIZE
+        if self.first_run:
+            for obs_cor in board.obstacles:
+                row, col = obs_cor[0] * block_size, obs_cor[1] * block_size
+                rect = pygame.Rect(col, row, block_size, block_size)
+                pygame.draw.rect(self.screen, (228, 87, 46), rect)
             pygame.display.update()
-            head = board.snake[0]
-            if board.next_move == config.Direction.UP:
-                multiply = 0
-            elif board.next_move == config.Direction.DOWN:
-                multiply = 2
-            elif board.next_move == config.Direction.LEFT:
-                multiply = 1
+            self.first_run = False
+        if board.next_move == config.Direction.UP:
+            multiply = 0
+        elif board.next_move == config.Direction.DOWN:
+            multiply = 2
+        elif board.next_move == config.Direction.LEFT:
+            multiply = 1
+        else:
+            multiply = 3
+        wanted = {}
+        if board.fruit_location:
+            wanted[tuple(board.fruit_location)] = 'apple'
+        for part in board.snake:
+            wanted[part] = 'body'
+        if board.snake:
+            wanted[board.snake[0]] = multiply  # the head, by its rotation
+
+        dirty = []
+        for cell, drawn in self.drawn.items():
+            if cell not in wanted:
+                rect = self.cell_rect(cell)
+                pygame.draw.rect(self.screen, (0, 0, 0), rect)
+                dirty.append(rect)
+        for cell, kind in wanted.items():
+            if self.drawn.get(cell) == kind:
+                continue
+            rect = self.cell_rect(cell)
+            pygame.draw.rect(self.screen, (0, 0, 0), rect)
+            if kind == 'apple':
+                self.screen.blit(self.apple, rect.topleft)
+            elif kind == 'body':
+                self.screen.blit(self.body, rect.topleft)
             else:
-                multiply = 3
-            rotate = 90
-            self.screen.blit(pygame.transform.rotate(self.head, rotate * multiply),
-                             (head[1] * block_size, head[0] * block_size))
-            if len(board.snake) > 1:
-                body = board.snake[1]
-                self.screen.blit(self.body,
-                                 (body[1] * block_size, body[0] * block_size))
-            pygame.display.update()
-            tail = board.snake[-1]
-            pygame.draw.rect(self.screen, (0, 0, 0),
-                             (tail[1] * block_size, tail[0] * block_size, 43,
-                              43))
+                self.screen.blit(pygame.transform.rotate(self.head, 90 * kind), rect.topleft)
+            dirty.append(rect)
+        self.drawn = wanted
+        if dirty:
+            pygame.display.update(dirty)
+
+    @staticmethod
+    def cell_rect(cell):
+        block_size = config.BLOCK_SIZE
+        return pygame.Rect(int(cell[1] * block_size), int(cell[0] * block_size), math.ceil(block_size),
+                           math.ceil(block_size))
+
+
+class CLIDisplayEngine(DisplayEngine):
+    """
+    A class to display in a terminal with ANSI escape codes.
+    render only takes a snapshot of the board, at most config.DISPLAY_RATE times a second, and hands it to a writer
+    thread that keeps only the latest snapshot. The writer draws the cells that changed since the last frame it wrote,
+    so a slow terminal drops frames instead of slowing down the game
+    """
+    CHARS = {'apple': '*', 'body': 'o', 'head': '@', 'obstacle': '#'}
+
+    def __init__(self, input_cb, frame_rate=None, stream=sys.stdout):
+        super().__init__(input_cb)
+        self.stream = stream
+        self.frame_interval = 1 / (frame_rate or config.DISPLAY_RATE)
+        self.next_frame = 0
+        self.played_games = 0
+        self.game_over = False
+        self.drawn = {}  # (row, col): what is drawn on the cell
+        self.rows = 0
+        self.latest = None
+        self.closed = False
+        self.lock = threading.Lock()
+        self.ready = threading.Event()
+        self.writer = None
+
+    def render(self, game):
+        if game.state == config.GameState.GAME_OVER:
+            if self.game_over:  # Game.run renders the end of a game more than once
+                return
+            self.game_over = True
+            self.played_games += 1
+            self.push(game, clear=False)
+            # Board.end_game prints the score after this render, so the writer is stopped and the cursor put under
+            # the board before it. The next game starts the writer again on a cleared screen
+            self.close()
+            return
+        new_game = self.game_over or self.writer is None
+        self.game_over = False
+        now = time.perf_counter()
+        if not new_game and now < self.next_frame:
+            return
+        self.next_frame = now + self.frame_interval
+        self.push(game, clear=new_game)
+
+    def push(self, game, clear):
+        """
+        Take a snapshot of the board and hand it to the writer thread, replacing the snapshot it didn't write yet
+        """
+        board = game.board
+        cells = {}
+        for obstacle in board.obstacles:
+            cells[tuple(obstacle)] = 'obstacle'
+        if board.fruit_location:
+            cells[tuple(board.fruit_location)] = 'apple'
+        for part in board.snake:
+            cells[part] = 'body'
+        if board.snake:
+            cells[board.snake[0]] = 'head'
+        status = f'Game {self.played_games + (0 if self.game_over else 1)}  Score: {len(board.snake)}  ' \
+                 f'Steps: {game.steps}'
+        with self.lock:
+            if self.latest is not None:
+                clear = clear or self.latest[0]
+            self.latest = (clear, board.board_size, cells, status)
+        if self.writer is None:
+            self.writer = threading.Thread(target=self.write_frames, daemon=True)
+            self.writer.start()
+        self.ready.set()
+
+    def write_frames(self):
+        while True:
+            self.ready.wait()
+            self.ready.clear()
+            with self.lock:
+                if self.closed:
+                    return
+                frame, self.latest = self.latest, None
+            if frame is None:  # the frame of this wakeup was written on the previous one
+                continue
+            self.stream.write(self.frame_diff(*frame))
+            self.stream.flush()
+
+    def frame_diff(self, clear, board_size, cells, status):
+        """
+        Returns the escape codes that turn the last written frame into this one
+        """
+        out = []
+        if clear:
+            out.append('\x1b[?25l\x1b[2J')
+            self.drawn = {}
+        self.rows = board_size
+        for cell in self.drawn:
+            if cell not in cells:
+                out.append(f'\x1b[{cell[0] + 1};{2 * cell[1] + 1}H ')
+        for cell, kind in cells.items():
+            if self.drawn.get(cell) != kind:
+                out.append(f'\x1b[{cell[0] + 1};{2 * cell[1] + 1}H{self.CHARS[kind]}')
+        out.append(f'\x1b[{board_size + 1};1H\x1b[2K{status}')
+        self.drawn = cells
+        return ''.join(out)
+
+    def close(self):
+        """
+        Stop the writer thread, write the last frame and give the cursor back to the terminal, below the board
+        """
+        if self.writer is None:
+            return
+        with self.lock:
+            last = self.latest
+            self.latest = None
+            self.closed = True
+        self.ready.set()
+        self.writer.join()
+        self.writer = None
+        self.closed = False
+        if last is not None:
+            self.stream.write(self.frame_diff(*last))
+        self.stream.write(f'\x1b[{self.rows + 2};1H\x1b[?25h')
+        self.stream.flush()
 
 
 class DefaultDisplayEngine(DisplayEngine):
@@ -0,0 +1,159 @@
+"""
+Precomputed all-pairs distance tables for static obstacle maps.
+The obstacles of a board never change during a game, so the shortest distances between all the free cells (ignoring
+the snake) can be computed once per board and used as an exact lower bound of the length of any path of the snake.
+The last tables are kept in memory for the process. The tables of the board files (the layouts loaded with
+assets.board_layout, the --board-file option of the scripts) are also cached on disk, keyed by a hash of the layout, so
+repeated runs on the same board file start instantly. The random boards are never the same twice, so their tables are
+not written to disk.
+
+USAGE: python3 distances.py --board-file <file>   (precompute the table of a board file)
+"""
+import hashlib
+import os
+from functools import lru_cache
+from optparse import OptionParser
+
+import numpy as np
+
+import assets
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'cache')
+UNREACHABLE = np.iinfo(np.uint16).max
+# the number of tables kept in memory, a table of a 64x64 board takes 32MB
+MAX_TABLES = 4
+
+
+class DistanceTable:
+    """
+    The shortest path distances between every two free cells of a board, ignoring the snake.
+    Distances are stored in a (free cells x free cells) uint16 array, UNREACHABLE for cells in different regions
+    """
+
+    def __init__(self, board_size, cells, dist):
+        """
+        :param board_size: The size of the board
+        :param cells: Array of the flat indexes of the free cells
+        :param dist: Array of the distances between the free cells, ordered like `cells`
+        """
+        self.board_size = board_size
+        self.cells = cells
+        self.dist = dist
+        self.index = np.full(board_size * board_size, -1, dtype=np.int64)
+        self.index[cells] = np.arange(len(cells))
+
+    @classmethod
+    def compute(cls, board_size, obstacle_mask, wrap=True, chunk=512):
+        """
+        Compute the table with a BFS from all the free cells at once: the reached cells of every source are a layer
+        of a boolean array, and all the layers are grown together with array shifts
+        :param board_size: The size of the board
+        :param obstacle_mask: Bitmask of the obstacles cells
+        :param wrap: True if the snake can go through the borders of the board
+        :param chunk: The number of sources to grow together, to bound the memory
+        """
+        cells_count = board_size * board_size
+        blocked = np.array([obstacle_mask >> cell & 1 for cell in range(cells_count)], dtype=bool)
+        free = ~blocked.reshape(board_size, board_size)
+        cells = np.flatnonzero(~blocked)
+        dist = np.full((len(cells), cells_count), UNREACHABLE, dtype=np.uint16)
+        for start in range(0, len(cells), chunk):
+            sources = cells[start:start + chunk]
+            rows = np.arange(len(sources))
+            frontier = np.zeros((len(sources), board_size, board_size), dtype=bool)
+            frontier.reshape(len(sources), -1)[rows, sources] = True
+            reached = frontier.copy()
+            block = dist[start:start + chunk]
+            block[rows, sources] = 0
+            distance = 0
+            while frontier.any():
+                distance += 1
+                frontier = _neighbours(frontier, wrap) & free & ~reached
+                block[frontier.reshape(len(sources), -1)] = distance
+                reached |= frontier
+        return cls(board_size, cells, dist[:, cells])
+
+    def distance(self, a, b):
+        """
+        Returns the distance between two cells (flat indexes), None if there is no path between them
+        """
+        ia, ib = self.index[a], self.index[b]
+        if ia < 0 or ib < 0:
+            return None
+        d = self.dist[ia, ib]
+        return None if d == UNREACHABLE else int(d)
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as file:
+            np.savez_compressed(file, board_size=self.board_size, cells=self.cells, dist=self.dist)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(int(data['board_size']), data['cells'], data['dist'])
+
+
+def _neighbours(layers, wrap):
+    """
+    Returns the cells one step away from the reached cells of every layer
+    """
+    if wrap:
+        return np.roll(layers, 1, 1) | np.roll(layers, -1, 1) | np.roll(layers, 1, 2) | np.roll(layers, -1, 2)
+    result = np.zeros_like(layers)
+    result[:, 1:, :] |= layers[:, :-1, :]
+    result[:, :-1, :] |= layers[:, 1:, :]
+    result[:, :, 1:] |= layers[:, :, :-1]
+    result[:, :, :-1] |= layers[:, :, 1:]
+    return result
+
+
+def layout_hash(board_size, obstacle_mask, wrap=True):
+    """
+    Returns the key of a board layout in the disk cache
+    """
+    return hashlib.sha1(f'{board_size}:{int(wrap)}:{obstacle_mask:x}'.encode()).hexdigest()
+
+
+def from_board_file(board_size, obstacle_mask):
+    """
+    Check if a layout is the layout of a board file loaded in this process
+    """
+    return any(layout.size == board_size and layout.mask == obstacle_mask for layout in assets.board_layouts())
+
+
+@lru_cache(maxsize=MAX_TABLES)
+def table_for(board_size, obstacle_mask, wrap=True):
+    """
+    Returns the distance table of a board, from memory, from the disk cache, or computed (and then cached). Only the
+    tables of the board files are read from and written to the disk cache
+    :param board_size: The size of the board
+    :param obstacle_mask: Bitmask of the obstacles cells
+    :param wrap: True if the snake can go through the borders of the board
+    """
+    if not from_board_file(board_size, obstacle_mask):
+        return DistanceTable.compute(board_size, obstacle_mask, wrap)
+    path = os.path.join(CACHE_DIR, f'distances-{layout_hash(board_size, obstacle_mask, wrap)}.npz')
+    if os.path.exists(path):
+        return DistanceTable.load(path)
+    table = DistanceTable.compute(board_size, obstacle_mask, wrap)
+    table.save(path)
+    return table
+
+
+def main():
+    usage_str = """USAGE:python3 distances.py <options>"""
+    parser = OptionParser(usage_str)
+    parser.add_option('--board-file', help='A file with the layout of the board')
+    parser.add_option('-b', '--border', help="The borders of the board", default=0, type=int)
+    args, _ = parser.parse_args()
+    if not args.board_file:
+        parser.error('--board-file is required')
+
+    layout = assets.board_layout(args.board_file)
+    table = table_for(layout.size, layout.mask, wrap=args.border != 1)
+    print(f'Distance table of {args.board_file}: {len(table.cells)} free cells')
+
+
+if __name__ == '__main__':
+    main()
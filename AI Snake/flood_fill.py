@@ -0,0 +1,208 @@
+"""
+Bitboard flood fill and incremental reachability for the Snake heuristics.
+A set of cells is an integer bitmask where bit `row * board_size + col` is the cell (row, col), so growing a region
+by one step in all four directions is a few shifts of the whole mask.
+"""
+from functools import lru_cache
+
+
+def popcount(mask):
+    """
+    Count the cells in a mask
+    """
+    return bin(mask).count('1')
+
+
+class Geometry:
+    """
+    The shift masks of a square board, with or without wrapping around the borders
+    """
+
+    def __init__(self, board_size, wrap):
+        self.board_size = board_size
+        self.wrap = wrap
+        self.cells = board_size * board_size
+        self.full = (1 << self.cells) - 1
+        row = (1 << board_size) - 1
+        self.first_row = row
+        self.last_row = row << (self.cells - board_size)
+        self.first_col = 0
+        for i in range(board_size):
+            self.first_col |= 1 << (i * board_size)
+        self.last_col = self.first_col << (board_size - 1)
+
+    def neighbours(self, mask):
+        """
+        Returns the cells that are one step away (up, down, left or right) from a cell in the mask
+        """
+        size = self.board_size
+        result = ((mask & ~self.last_col) << 1) | ((mask & ~self.first_col) >> 1) | \
+                 ((mask << size) & self.full) | (mask >> size)
+        if self.wrap:
+            result |= ((mask & self.last_col) >> (size - 1)) | ((mask & self.first_col) << (size - 1)) | \
+                      (mask >> (self.cells - size)) | ((mask & self.first_row) << (self.cells - size))
+        return result
+
+    def ring(self, cell):
+        """
+        Returns the 8 cells around a cell in cyclic order (up, up-right, right, ... up-left), so every two
+        consecutive cells are neighbours. Cells outside the board are -1
+        """
+        size = self.board_size
+        i, j = divmod(cell, size)
+        ring = []
+        for di, dj in ((-1, 0), (-1, 1), (0, 1), (1, 1), (1, 0), (1, -1), (0, -1), (-1, -1)):
+            ni, nj = i + di, j + dj
+            if self.wrap:
+                ring.append((ni % size) * size + nj % size)
+            elif 0 <= ni < size and 0 <= nj < size:
+                ring.append(ni * size + nj)
+            else:
+                ring.append(-1)
+        return ring
+
+
+@lru_cache(maxsize=None)
+def geometry(board_size, wrap=False):
+    return Geometry(board_size, wrap)
+
+
+def flood(seed, space, geo):
+    """
+    Returns the cells of `space` that are connected to `seed` through cells of `space`
+    :param seed: A mask of the starting cells, must be a subset of space
+    :param space: A mask of the cells the fill can go through
+    :param geo: The geometry of the board
+    :return: The mask of the reached cells (including the seed)
+    """
+    reached = frontier = seed
+    while frontier:
+        frontier = geo.neighbours(frontier) & space & ~reached
+        reached |= frontier
+    return reached
+
+
+def nth_cell(mask, n):
+    """
+    Returns the index of the n-th (0-based) cell of a mask, in row-major order
+    """
+    low, high = 0, mask.bit_length()
+    while low < high:
+        mid = (low + high) // 2
+        if popcount(mask & ((1 << (mid + 1)) - 1)) > n:
+            high = mid
+        else:
+            low = mid + 1
+    return low
+
+
+def board_masks(board):
+    """
+    Returns the masks of a board: works both with the game Board and with a SnakeState
+    :return: A tuple of (free cells mask, occupied by the snake mask)
+    """
+    size = board.board_size
+    geo = geometry(size)
+    occupied = getattr(board, 'occupied', None)
+    obstacle_mask = getattr(board, 'obstacle_mask', None)
+    if not isinstance(occupied, int):  # the set of the game Board
+        occupied = 0
+        for i, j in board.snake:
+            occupied |= 1 << (i * size + j)
+    if obstacle_mask is None:
+        obstacle_mask = 0
+        for i, j in board.obstacles:
+            if 0 <= i < size and 0 <= j < size:
+                obstacle_mask |= 1 << (i * size + j)
+    return geo.full & ~(occupied | obstacle_mask), occupied
+
+
+def _is_simple(cell, space, geo):
+    """
+    Check that removing a cell from a region can't disconnect it: all the neighbours of the cell that are in the
+    space must be connected through the 8 cells around it
+    """
+    inside = [c >= 0 and bool(space >> c & 1) for c in geo.ring(cell)]
+    if all(inside):
+        return True
+    # label the runs of consecutive cells of the ring that are in the space, the neighbours are the even positions
+    start = inside.index(False)
+    run = 0
+    neighbour_runs = set()
+    for step in range(1, 9):
+        k = (start + step) % 8
+        if not inside[k]:
+            run += 1
+        elif k % 2 == 0:
+            neighbour_runs.add(run)
+    return len(neighbour_runs) <= 1
+
+
+def head_region(state):
+    """
+    Returns the region of the head of a SnakeState: the cells connected to the head through free cells (in the
+    geometry of the heuristics, which does not wrap around the borders), including the head itself.
+    The region is cached on the state and carried over incrementally by SnakeState.advance
+    """
+    if state.head_region is None:
+        geo = geometry(state.board_size)
+        head = 1 << state.body[0]
+        space = (geo.full & ~(state.occupied | state.obstacle_mask)) | head
+        state.head_region = flood(head, space, geo)
+    return state.head_region
+
+
+def advance_region(region, parent, child):
+    """
+    Update the head region of a state after a move, from the head-advance and tail-retract deltas.
+    In the usual case the old head just leaves the region, and the freed tail joins it if it touches it, which is
+    near constant time. Only when the old head was a cut cell of the region it is flooded again.
+    :param region: The head region of the parent state
+    :param parent: The state before the move
+    :param child: The state after the move
+    :return: The head region of the child state, or None if it should be computed lazily from scratch
+    """
+    geo = geometry(child.board_size)
+    old_head, head = parent.body[0], child.body[0]
+    head_bit = 1 << head
+    if old_head == head or not region & head_bit:
+        return None
+    # the space of the child region is the free cells and the new head, the old head is now part of the body
+    space = (geo.full & ~(child.occupied | child.obstacle_mask)) | head_bit
+    if not _is_simple(old_head, region, geo):
+        return flood(head_bit, space, geo)
+    region &= ~(1 << old_head)
+    if len(child.body) == len(parent.body):  # the snake didn't eat, so the tail was retracted
+        tail_bit = 1 << parent.body[-1]
+        if space & tail_bit and geo.neighbours(tail_bit) & region:
+            region |= flood(tail_bit, space & ~region, geo)
+    return region
+
+
+def dead_end(board):
+    """
+    The number of free cells that can't be reached from the snake's head
+    """
+    free, occupied = board_masks(board)
+    if hasattr(board, 'head_region'):
+        region = head_region(board)
+    else:
+        geo = geometry(board.board_size)
+        i, j = board.snake[0]
+        head = 1 << (i * board.board_size + j)
+        region = flood(head, free | head, geo)
+    return popcount(free) - popcount(region & free)
+
+
+def connectivity(board, rand):
+    """
+    The number of free cells that are not connected to a random free cell
+    :param board: The board or SnakeState
+    :param rand: A source of randomness with a `randint` method
+    """
+    free, _ = board_masks(board)
+    count = popcount(free)
+    if count <= 1:
+        return 0
+    seed = 1 << nth_cell(free, rand.randint(0, count - 1))
+    return count - popcount(flood(seed, free, geometry(board.board_size)))
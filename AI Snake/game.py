@@ -1,32 +1,57 @@
+from collections import deque
 from optparse import OptionParser
-import pygame
 import random
+import time
+
+import numpy as np
+
+import assets
 import display_engine
 import config
+import instrumentation
+import replay
 from agent import *
 from heuristics import *
+from utils import FreeCells
+
+try:
+    import pygame
+except ImportError:  # pygame is only needed for the GUI and the frame rate limit
+    pygame = None
 
 
 class Game:
 
     def __init__(self, board_size, obstacle_chance, agent=None, display_class=display_engine.DefaultDisplayEngine,
-                 border=0, board_file=None, num_of_games=None):
+                 border=0, board_file=None, num_of_games=None, frame_rate=config.FRAME_RATE, verbose=True, seed=None):
         self.board = Board(board_size, obstacle_chance, board_file)
         self.iterations = 0
+        self.steps = 0
         self.agent = agent
         self.state = None
         self.display = display_class(self.board.move)
-        self.clock = pygame.time.Clock()
+        self.frame_rate = frame_rate
+        if frame_rate:
+            self.clock = pygame.time.Clock() if pygame else FrameClock()
+        else:
+            self.clock = None
         self.border = border
         self.num_of_games = num_of_games
+        self.verbose = verbose
+        self.seed = seed
 
-    def run(self):
+    def run(self, replay_file=None):
         """
         This function runs the game until the game is won or the snake die
+        :param replay_file: A file to write the replay of the game to (see replay.py)
+        :return: The score of the game (the length of the snake)
         """
         self.state = config.GameState.RUNNING
+        self.iterations = 0
+        self.steps = 0
         self.board.spawn_snake(2, 2, 1)
         self.board.spawn_fruit()
+        recorder = replay.Recorder(self.board, self.seed) if replay_file else None
         while self.state != config.GameState.GAME_OVER:
             if self.state == config.GameState.PAUSED:
                 continue
@@ -43,37 +68,68 @@ class Game:
                 self.board.next_move = move
                 self.board.step()
 
-            if self.board.snake[0] in self.board.obstacles or self.board.snake[0] in self.board.snake[
-                                                                                     1:] or self.iterations == 256:
+            if self.board.collision or self.board.snake[0] in self.board.obstacles or self.iterations == 256:
                 self.state = config.GameState.GAME_OVER
 
             elif self.board.snake[0] == self.board.fruit_location:
-                if len(self.board.snake) > pow(self.board.board_size, 2) - 1:  # Game won
+                if not self.board.free:  # Game won, there is no free cell left for a fruit
                     self.state = config.GameState.GAME_OVER
                 else:
                     self.iterations = 0
                     self.board.eat_fruit()
             self.iterations += 1
+            self.steps += 1
+            if recorder:
+                recorder.record(move, self.board, self.iterations)
             self.display.render(self)
-            self.clock.tick(config.FRAME_RATE)
+            if self.clock:
+                self.clock.tick(self.frame_rate)
         self.state = config.GameState.GAME_OVER
         self.display.render(self)
-        self.board.end_game()
+        if recorder:
+            recorder.save(replay_file)
+        if self.verbose:
+            self.board.end_game()
+        return len(self.board.snake)
+
+
+class FrameClock:
+    """
+    Limits the frame rate of the game like pygame.time.Clock, when pygame is not installed
+    """
+
+    def __init__(self):
+        self.last = time.perf_counter()
+
+    def tick(self, frame_rate):
+        delay = self.last + 1 / frame_rate - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        self.last = time.perf_counter()
 
 
 class Board:
-    def __init__(self, board_size, obstacle_chance, board_file=None):
+    def __init__(self, board_size, obstacle_chance, board_file=None, obstacles=None):
         self.board_size = board_size
         self.next_move = config.Direction.LEFT
-        self.snake = []
+        self.snake = deque()
+        self.occupied = set()
+        self.collision = False
         self.obstacles = set()
         self.fruit_location = ()
-        if board_file:
+        # the bitmask of the obstacles for bitboard.SnakeState.from_board, kept up to date with `obstacles`
+        self.obstacle_mask = 0
+        if obstacles is not None:
+            self.obstacles = set(obstacles)
+            self.obstacle_mask = assets.obstacle_mask(self.obstacles, board_size)
+        elif board_file:
             self.load_from_file(board_file)
         else:
             # generate a new board
             self.generate_obstacles(board_size, obstacle_chance,
                                     self.load_obstacles('obt.txt'))
+        self.free = FreeCells()
+        self.reset_free_cells()
 
     def move(self, direction):
         """
@@ -85,22 +141,24 @@ class Board:
     @staticmethod
     def load_obstacles(file_name):
         """
-        Loading the obstacles from a file to the object
+        Loading the obstacles from a file of the data directory, parsed once per process (see assets.py)
         :param file_name: The file of the obstacles
-        :return: a list of the coordinates of the obstacles
+        :return: a tuple of the obstacles, every obstacle a tuple of the coordinates of its cells
         """
-        with open(f'data/{file_name}') as file:
-            return [[[int(c) for c in b.split(',')] for b in a.split('_')] for a in file.readlines()]
+        return assets.obstacle_templates(file_name)
 
     def load_from_file(self, file_name):
-        with open(file_name) as file:
-            _board = [line.split(',') for line in file.readlines()]
-            if not _board:
-                return
-            for i in range(len(_board)):
-                for j in range(len(_board[0])):
-                    if _board[i][j] == 'x':
-                        self.obstacles.add((i, j))
+        """
+        Loading the layout of the board from a file of rows of comma separated cells, 'x' for an obstacle, parsed once
+        per process (see assets.py). The size of the board is the number of rows of the file
+        :param file_name: The file of the board
+        """
+        layout = assets.board_layout(file_name)
+        if not layout.size:
+            return
+        self.board_size = layout.size
+        self.obstacles = set(layout.obstacles)
+        self.obstacle_mask = layout.mask
 
     def generate_obstacles(self, board_size, obstacle_chance, obstacles):
         """
@@ -110,7 +168,7 @@ class Board:
         :param obstacles: list of obstacles
         :return: board with randomly generated obstacles
         """
-        all_obstacles = []
+        all_obstacles = set()
         for i in range(int(board_size / 4) + 1):
             for j in range(int(board_size / 4) + 1):
                 if random.random() > obstacle_chance:
@@ -122,26 +180,53 @@ class Board:
                 ob = random.choice(obstacles)
                 ob = [(row + curr_j + cell_j, col + curr_i + cell_i) for row, col in ob]
                 ob = [(row, col) for row, col in ob if row < board_size and col < board_size]
-                all_obstacles += ob
-        self.obstacles = all_obstacles[:]
+                all_obstacles.update(ob)
+        self.obstacles = all_obstacles
+        self.obstacle_mask = assets.obstacle_mask(all_obstacles, board_size)
 
     def spawn_snake(self, row, col, length):
         """
         Spawns a snake where the head's coordinates are (row, col) and with body length of `length` (including the head)
         """
         head = (row, col)
-        self.snake = [head]
+        self.snake = deque([head])
+        self.collision = False
         if head in self.obstacles:
             self.obstacles.remove(head)
+            self.obstacle_mask &= ~(1 << (row * self.board_size + col))
         for i in range(1, length):
             part = (row, col + i)
             if part in self.obstacles:
                 self.obstacles.remove(part)
+                self.obstacle_mask &= ~(1 << (row * self.board_size + col + i))
             self.snake.append(part)
+        self.occupied = set(self.snake)
+        self.reset_free_cells()
+
+    def restore(self, snake, fruit_location):
+        """
+        Put the snake and the fruit on the board, to continue a game from a recorded state
+        :param snake: The coordinates of the parts of the snake, the head first
+        :param fruit_location: The coordinates of the fruit, () for no fruit
+        """
+        self.snake = deque(snake)
+        self.occupied = set(self.snake)
+        self.collision = False
+        self.fruit_location = fruit_location
+        self.reset_free_cells()
+
+    def reset_free_cells(self):
+        """
+        Rebuild the free cells of the board (inside the board, without an obstacle or a part of the snake)
+        """
+        self.free = FreeCells((i, j) for i in range(self.board_size) for j in range(self.board_size)
+                              if (i, j) not in self.obstacles and (i, j) not in self.occupied)
 
     def step(self):
         """
-        Updates the coordinates of the snake after making a move in the game
+        Updates the coordinates of the snake after making a move in the game.
+        The body is a deque and the occupied cells a set, so moving, growing and checking if the snake ran into itself
+        are all O(1). `self.collision` is set when the new head is on a part of the body
         """
         head_i, head_j = self.snake[0]
         direction = self.next_move
@@ -157,22 +242,23 @@ class Board:
         head_i = (head_i + self.board_size) % self.board_size
         head_j = (head_j + self.board_size) % self.board_size
 
-        if (head_i, head_j) != self.fruit_location:
-            self.snake.pop()
+        head = (head_i, head_j)
+        if head != self.fruit_location:
+            tail = self.snake.pop()
+            self.occupied.discard(tail)
+            self.free.add(tail)
 
-        self.snake.insert(0, (head_i, head_j))
+        self.collision = head in self.occupied
+        self.snake.appendleft(head)
+        self.occupied.add(head)
+        self.free.remove(head)
 
     def spawn_fruit(self):
         """
-        add fruit to random location on the board
+        add fruit to a uniformly random free cell of the board, no fruit if the board is full
         """
-        i = random.randint(0, config.BOARD_SIZE - 1)
-        j = random.randint(0, config.BOARD_SIZE - 1)
-
-        while (i, j) in self.obstacles or (i, j) in self.snake:
-            i = random.randint(0, config.BOARD_SIZE - 1)
-            j = random.randint(0, config.BOARD_SIZE - 1)
-        self.fruit_location = (i, j)
+        cell = self.free.sample()
+        self.fruit_location = cell if cell is not None else ()
 
     def eat_fruit(self):
         """
@@ -207,15 +293,42 @@ def main():
     )
 
     parser.add_option('-n', '--num-of-games', help='Number of games to play', default=1, type=int)
-    parser.add_option('-f', '--frame-rate', help='Limit frame rate of the game', default=config.FRAME_RATE, type=int)
-
-    agents = ['astar', 'bfs', 'hamiltonian', 'gbfs']
-    heus = ['manhattan', 'wighted-compact']
+    parser.add_option('--seed', help='Seed the games, to reproduce them', type=int)
+    parser.add_option('--replay', help="A file to record the replay of the game to, '{game}' in the name is replaced "
+                                       "by the number of the game")
+    parser.add_option('-f', '--frame-rate', default=config.FRAME_RATE, type=int,
+                      help='Limit the ticks per second of the game, 0 for no limit (the GUI draws at its own rate)')
+    parser.add_option('--board-file', help='A file with the layout of the board (sets the size of the board)')
+
+    agents = ['astar', 'bfs', 'hamiltonian', 'gbfs', 'bibfs', 'jps', 'idastar', 'smastar']
+    heus = ['manhattan', 'weighted-compact', 'distance']
     parser.add_option(
         '--agent', choices=agents, help=f'The agent to drive the snake',
         default=agents[0], type='choice', metavar=agents
     )
     parser.add_option('--heu', choices=heus, help=f'The heuristic for the A* agent', default=heus[0], metavar=heus)
+    parser.add_option('--weights-file', help='A weights file of tune.py for the weighted-compact heuristic')
+    parser.add_option('--exact-states', action='store_true', default=False,
+                      help='Let the search agents tell states apart by the whole snake instead of by the head')
+    parser.add_option('--plan-cache', action='store_true', default=False,
+                      help='Let the A* agent reuse its plan and follow the cached distance field of the fruit '
+                           'before searching')
+    parser.add_option('--safe', action='store_true', default=False,
+                      help='Let the A* agent follow only paths that leave its tail reachable')
+    parser.add_option('--deadline', type=float,
+                      help='Time budget of a search in milliseconds, after it the agent follows the best partial plan')
+    parser.add_option('--spacetime', action='store_true', default=False,
+                      help='Let the A* and BFS agents search through the body cells that are freed on the way')
+    parser.add_option('--max-nodes', type=int,
+                      help='The number of search states the IDA* and SMA* agents may keep in memory')
+    parser.add_option('--max-bytes', type=int,
+                      help='The memory in bytes the search states of the IDA* and SMA* agents may take (an estimate)')
+    parser.add_option('--tour-file', help='A file to load the tour of the Hamiltonian agent from (saved if missing)')
+    parser.add_option('--distance-oracle', action='store_true', default=False,
+                      help='Let the BFS agent prune cells that can not reach the fruit, with the distance table')
+
+    parser.add_option('--instrument', help='Record per move counters and timers of the agent to a JSON or CSV file')
+    parser.add_option('--profile', help='Run the games under cProfile and dump the statistics to a file')
 
     displays = ['GUI', 'CLI', 'Silent']
     parser.add_option(
@@ -224,38 +337,67 @@ def main():
     )
 
     args, _ = parser.parse_args()
+    if args.seed is not None:
+        random.seed(args.seed)
+        np.random.seed(args.seed)
+    if args.board_file:
+        args.board_size = assets.board_layout(args.board_file).size
 
     config.FRAME_RATE = args.frame_rate
     config.BLOCK_SIZE = config.GUI_WIDTH / args.board_size
 
     display = get_display(args.display)
-    heu = get_heuristic(args.heu)
+    heu = get_heuristic(args.heu, args.weights_file, wrap=args.border != 1)
     agent = get_agent(
         args.agent,
-        size=args.board_size, heu=heu)
+        size=args.board_size, heu=heu, plan_cache=args.plan_cache, distance_oracle=args.distance_oracle,
+        tour_file=args.tour_file, safe=args.safe, deadline=args.deadline,
+        spacetime=args.spacetime, max_nodes=args.max_nodes, max_bytes=args.max_bytes,
+        exact_states=args.exact_states)
     border = args.border
-    game = Game(args.board_size, args.obstacle_chance, agent, display, border, num_of_games=args.num_of_games)
-
-    scores = []
-    for _ in range(args.num_of_games):
-        game.run()
-        scores.append(len(game.board.snake))
+    # frame limiting is only needed when someone is watching
+    frame_rate = args.frame_rate if args.display != 'Silent' else None
+    game = Game(args.board_size, args.obstacle_chance, agent, display, border, board_file=args.board_file,
+                num_of_games=args.num_of_games, frame_rate=frame_rate, seed=args.seed)
+
+    def play():
+        scores = []
+        for i in range(args.num_of_games):
+            game.run(args.replay.format(game=i) if args.replay else None)
+            scores.append(len(game.board.snake))
+        return scores
+
+    probe = instrumentation.Instrumentation(agent).enable() if args.instrument else None
+    try:
+        scores = instrumentation.profile(play, args.profile) if args.profile else play()
+    finally:
+        if probe:
+            probe.disable()
+            probe.save(args.instrument)
+    if probe:
+        print(f'Instrumentation totals: {probe.totals()}')
     avg = sum(scores) / args.num_of_games
     avg_coverage = avg / (args.board_size * args.board_size)
     print(f'Finished with average score of {avg}, average board coverage: {avg_coverage * 100: 0.2f}%')
 
 
-def get_heuristic(name: str):
+def get_heuristic(name: str, weights_file=None, wrap=True):
     """
     Take the name of a heuristics function and returns an instance of the heuristics
     :param name: The name of the heuristics function
+    :param weights_file: A weights file of the tuner (tune.py) for the weighted-compact heuristic
+    :param wrap: True if the snake can go through the borders of the board (the distance heuristic)
     :return: An instance of the heuristics function
     """
     name = name.lower()
     if name == 'manhattan':
         return manhattan_distance
     if name == 'weighted-compact':
+        if weights_file:
+            return make_weighed_compact_heuristics(load_weights(weights_file))
         return weighed_compact_heuristics
+    if name == 'distance':
+        return make_table_distance(wrap)
 
 
 def get_agent(name: str, **kwargs):
@@ -266,15 +408,32 @@ def get_agent(name: str, **kwargs):
     :return: An instance of the agent
     """
     name = name.lower()
+    exact_states = kwargs.get('exact_states', False)
     if name == 'astar':
-        return AStarAgent(kwargs['heu'])
+        return AStarAgent(kwargs['heu'], exact_states=exact_states, plan_cache=kwargs.get('plan_cache', False),
+                          safe=kwargs.get('safe', False), deadline=kwargs.get('deadline'),
+                          spacetime=kwargs.get('spacetime', False))
     elif name == 'hamiltonian':
         board_size = kwargs['size']
-        return HamiltonianAgent(board_size)
+        return HamiltonianAgent(board_size, kwargs.get('tour_file'))
+    elif name == 'bibfs':
+        return BidirectionalSearchAgent()
+    elif name == 'jps':
+        return JumpPointSearchAgent()
+    elif name == 'idastar':
+        return IterativeDeepeningAStarAgent(kwargs['heu'], max_nodes=kwargs.get('max_nodes'),
+                                            max_bytes=kwargs.get('max_bytes'), exact_states=exact_states,
+                                            deadline=kwargs.get('deadline'))
+    elif name == 'smastar':
+        return MemoryBoundedAStarAgent(kwargs['heu'], max_nodes=kwargs.get('max_nodes'),
+                                       max_bytes=kwargs.get('max_bytes'), exact_states=exact_states,
+                                       deadline=kwargs.get('deadline'))
     elif name == 'bfs':
-        return BreadthFirstSearchAgent()
+        return BreadthFirstSearchAgent(exact_states=exact_states,
+                                       distance_oracle=kwargs.get('distance_oracle', False),
+                                       deadline=kwargs.get('deadline'), spacetime=kwargs.get('spacetime', False))
     else:
-        return BestFirstSearchAgent()
+        return BestFirstSearchAgent(exact_states=exact_states, deadline=kwargs.get('deadline'))
 
 
 def get_display(name: str):
@@ -285,6 +444,8 @@ def get_display(name: str):
     """
     if name == 'GUI':
         return display_engine.GUIDisplayEngine
+    elif name == 'CLI':
+        return display_engine.CLIDisplayEngine
     elif name == 'Silent':
         return display_engine.DefaultDisplayEngine
 
@@ -0,0 +1,307 @@
+"""
+Searches of the cells of the board for the snake: bidirectional BFS, jump point search and space-time search.
+They search cells instead of SnakeStates, so uniform open regions are crossed without copying the snake. The body is
+an obstacle that goes away with time: the part at index i of the body leaves its cell after L - i moves, and the head
+can't reach a cell in fewer moves than the (wrapped) manhattan distance to it, so a part is passable when it leaves
+its cell before the head could possibly get there. This is conservative, any simple path found this way is a legal
+path of the moving snake.
+The space-time search instead checks the body exactly: it knows the tick every part of the body leaves its cell and
+the ticks the head passes through every cell of the path, so it finds paths that need a part to move away first.
+"""
+import heapq
+import time
+
+from config import Direction
+from planning import DIRECTIONS, neighbour
+
+OPPOSITE = {Direction.LEFT: Direction.RIGHT, Direction.RIGHT: Direction.LEFT,
+            Direction.UP: Direction.DOWN, Direction.DOWN: Direction.UP}
+HORIZONTAL = (Direction.LEFT, Direction.RIGHT)
+VERTICAL = (Direction.UP, Direction.DOWN)
+
+
+class Grid:
+    """
+    The passable cells of a SnakeState, from the head to the fruit
+    """
+
+    def __init__(self, state, flag=False):
+        """
+        :param state: The SnakeState
+        :param flag: A parameter that determines if the board has borders
+        """
+        self.size = state.board_size
+        self.flag = flag
+        self.head = state.head
+        self.goal = state.fruit
+        self.obstacle_mask = state.obstacle_mask
+        self.occupied = state.occupied
+        length = len(state.body)
+        self.free_tick = {cell: length - i for i, cell in enumerate(state.body)}
+        self.known = bytearray(self.size * self.size)  # 0 not checked yet, 1 passable, 2 blocked
+
+    def distance(self, a, b):
+        """
+        The length of the shortest path between two cells on an empty board
+        """
+        size = self.size
+        ai, aj = divmod(a, size)
+        bi, bj = divmod(b, size)
+        di, dj = abs(ai - bi), abs(aj - bj)
+        if not self.flag:
+            di, dj = min(di, size - di), min(dj, size - dj)
+        return di + dj
+
+    def passable(self, cell):
+        """
+        Check that a cell is inside the board, has no obstacle, and is free when the head can first get to it
+        """
+        if cell < 0:
+            return False
+        known = self.known[cell]
+        if not known:
+            passable = not self.obstacle_mask >> cell & 1 and \
+                       (not self.occupied >> cell & 1 or self.free_tick[cell] <= self.distance(self.head, cell))
+            known = self.known[cell] = 1 if passable else 2
+        return known == 1
+
+    def free_at(self, cell, tick):
+        """
+        Check that a cell is inside the board, has no obstacle, and no part of the body at a tick (the parts that were
+        on the board at the start of the search)
+        """
+        if cell < 0 or self.obstacle_mask >> cell & 1:
+            return False
+        return not self.occupied >> cell & 1 or self.free_tick[cell] <= tick
+
+    def step(self, cell, direction):
+        return neighbour(cell, direction, self.size, self.flag)
+
+
+def bidirectional_bfs(grid):
+    """
+    Breadth first search from the head and from the fruit at once, growing the smaller frontier by a whole layer
+    until the two searches meet
+    :param grid: The Grid to search
+    :return: A tuple of (the path, the next move last, and the number of expanded cells). The path is empty if the
+    fruit can't be reached
+    """
+    head, goal = grid.head, grid.goal
+    if goal < 0 or head == goal:
+        return [], 0
+    forward = {head: None}  # cell: (the previous cell, the move from it)
+    backward = {goal: None}  # cell: (the next cell, the move to it)
+    forward_frontier, backward_frontier = [head], [goal]
+    expanded = 0
+    while forward_frontier and backward_frontier:
+        next_frontier = []
+        if len(forward_frontier) <= len(backward_frontier):
+            for cell in forward_frontier:
+                expanded += 1
+                for move in DIRECTIONS:
+                    child = grid.step(cell, move)
+                    if child in forward:
+                        continue
+                    if child in backward:
+                        forward[child] = (cell, move)
+                        return _join(forward, backward, child), expanded
+                    if grid.passable(child):
+                        forward[child] = (cell, move)
+                        next_frontier.append(child)
+            forward_frontier = next_frontier
+        else:
+            for cell in backward_frontier:
+                expanded += 1
+                for move in DIRECTIONS:
+                    parent = grid.step(cell, OPPOSITE[move])
+                    if parent in backward:
+                        continue
+                    if parent in forward:
+                        backward[parent] = (cell, move)
+                        return _join(forward, backward, parent), expanded
+                    if grid.passable(parent):
+                        backward[parent] = (cell, move)
+                        next_frontier.append(parent)
+            backward_frontier = next_frontier
+    return [], expanded
+
+
+def _join(forward, backward, meet):
+    moves = []
+    cell = meet
+    while forward[cell]:
+        cell, move = forward[cell]
+        moves.append(move)
+    moves.reverse()
+    cell = meet
+    while backward[cell]:
+        cell, move = backward[cell]
+        moves.append(move)
+    moves.reverse()
+    return moves
+
+
+def jump(grid, cell, direction):
+    """
+    Move straight from a cell until a jump point: the fruit, a cell with a forced neighbour (a side cell that is open
+    while the side cell before it was blocked) or, for vertical moves, a cell a horizontal jump can leave from. On a
+    board without borders the jump also stops after going around the whole board
+    :return: A tuple of (jump point, distance), None if the move runs into a blocked cell
+    """
+    horizontal = direction in HORIZONTAL
+    sides = VERTICAL if horizontal else HORIZONTAL
+    distance = 0
+    while True:
+        previous, cell = cell, grid.step(cell, direction)
+        if not grid.passable(cell):
+            return None
+        distance += 1
+        if cell == grid.goal or distance >= grid.size:
+            return cell, distance
+        for side in sides:
+            if grid.passable(grid.step(cell, side)) and not grid.passable(grid.step(previous, side)):
+                return cell, distance
+        if not horizontal:
+            for side in sides:
+                if jump(grid, cell, side) is not None:
+                    return cell, distance
+
+
+def jump_point_search(grid):
+    """
+    A* over the jump points of the grid (4-connected jump point search). The heuristic is the wrapped manhattan
+    distance, which is exact on an empty board
+    :param grid: The Grid to search
+    :return: A tuple of (the path, the next move last, and the number of expanded jump points). The path is empty if
+    the fruit can't be reached
+    """
+    head, goal = grid.head, grid.goal
+    if goal < 0 or head == goal:
+        return [], 0
+    parents = {head: None}  # jump point: (the previous jump point, direction, distance)
+    best_g = {head: 0}
+    fringe = [(grid.distance(head, goal), 0, head)]
+    expanded = 0
+    while fringe:
+        _, g, node = heapq.heappop(fringe)
+        if g > best_g[node]:
+            continue
+        expanded += 1
+        if node == goal:
+            return _segments(grid, parents, goal), expanded
+        parent = parents[node]
+        if parent is None:
+            directions = DIRECTIONS
+        elif parent[1] in HORIZONTAL:
+            directions = (parent[1],) + VERTICAL
+        else:
+            directions = (parent[1],) + HORIZONTAL
+        for direction in directions:
+            found = jump(grid, node, direction)
+            if found is None:
+                continue
+            point, distance = found
+            new_g = g + distance
+            if new_g < best_g.get(point, new_g + 1):
+                best_g[point] = new_g
+                parents[point] = (node, direction, distance)
+                heapq.heappush(fringe, (new_g + grid.distance(point, goal), new_g, point))
+    return [], expanded
+
+
+def _segments(grid, parents, goal):
+    """
+    Expand the jump points of a path to moves, the path is dropped if it crosses itself (the snake would run into the
+    part of its body laid along the path)
+    """
+    moves = []
+    node = goal
+    while parents[node]:
+        node, direction, distance = parents[node]
+        moves += [direction] * distance
+    cells = {grid.head}
+    cell = grid.head
+    for move in reversed(moves):
+        cell = grid.step(cell, move)
+        if cell in cells:
+            return []
+        cells.add(cell)
+    return moves
+
+
+def spacetime_search(grid, closed, heuristic=None, time_limit=None, state=None):
+    """
+    Search of the cells of the board in time. A node is a cell, the tick the head gets to it and a pointer to the node
+    before it, so no board is copied unless the heuristic needs the snake. A move is legal when the cell is free of the
+    body at that tick: the parts of the body leave their cells on their free ticks, and the cells of the path itself
+    stay under the body for L ticks after the head passed through them.
+    The closed list is keyed by (cell, tick). After L ticks all the parts of the body the search started with are gone
+    and the free ticks don't tell the ticks apart anymore, so the ticks of the keys stop at L and the search is finite
+    :param grid: The Grid to search
+    :param closed: The closed list of the search
+    :param heuristic: A function of a cell and the SnakeState of the snake when its head got there (None when
+    `state` isn't given) that estimates the number of moves left for A*, None for breadth first search
+    :param time_limit: The time (of time.perf_counter) to stop at, and return the path to the node closest to the fruit
+    :param state: The SnakeState of the grid. When it is given every node keeps the snake along its path for the
+    heuristic
+    :return: A tuple of (the path, the next move last, and the number of expanded nodes). The path is empty if the
+    fruit can't be reached
+    """
+    head, goal = grid.head, grid.goal
+    if goal < 0 or head == goal:
+        return [], 0
+    length = len(grid.free_tick)
+    seen = {head}  # the cells of all the nodes, a cell that was never seen can't be on the path of a node
+    root = (head, 0, None, None, state)
+    fringe = [(heuristic(head, state) if heuristic else 0, 0, root)]
+    best, best_progress = root, (grid.distance(head, goal), 0)
+    counter = 0
+    expanded = 0
+    while fringe:
+        if time_limit is not None and time.perf_counter() > time_limit:
+            return _moves(best), expanded
+        _, _, node = heapq.heappop(fringe)
+        cell, tick = node[0], node[1]
+        if not closed.close((cell, min(tick, length)), tick):
+            continue
+        expanded += 1
+        if cell == goal:
+            return _moves(node), expanded
+        for move in DIRECTIONS:
+            child = grid.step(cell, move)
+            if not grid.free_at(child, tick + 1) or closed.is_closed((child, min(tick + 1, length)), tick + 1):
+                continue
+            if child in seen and _on_body(node, child, tick + 1 - length):
+                continue
+            seen.add(child)
+            counter += 1
+            board = node[4].advance(move) if state is not None else None
+            child_node = (child, tick + 1, move, node, board)
+            priority = tick + 1 + heuristic(child, board) if heuristic else counter
+            heapq.heappush(fringe, (priority, counter, child_node))
+            progress = (grid.distance(child, goal), tick + 1)
+            if progress < best_progress:
+                best, best_progress = child_node, progress
+    return [], expanded
+
+
+def _moves(node):
+    """
+    The path to a node of the space-time search, the next move last
+    """
+    moves = []
+    while node[3] is not None:
+        moves.append(node[2])
+        node = node[3]
+    return moves
+
+
+def _on_body(node, cell, tick):
+    """
+    Check if a cell is still under the body laid along the path of a node: the head passed through it after the tick
+    """
+    while node is not None and node[1] > tick:
+        if node[0] == cell:
+            return True
+        node = node[3]
+    return False
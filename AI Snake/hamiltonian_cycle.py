@@ -1,23 +1,31 @@
+import random
+
 import numpy as np
 
 from config import Direction
 
 
-class Node:
-    def __init__(self):
-        self.visited = False
-        self.can_go_right = False
-        self.can_go_down = False
-
-
 class Maze:
+    """
+    A Hamiltonian cycle of the board, built around a random spanning tree of a half-size grid of nodes (every node is
+    a 2x2 block of cells, and the cycle walks around the walls of the tree).
+    The tree is kept in flat boolean arrays (`right[n]` / `down[n]` for node n = x + y * board_size / 2) and the
+    cycle in `tour_to_number`, the position of every cell (x + y * board_size) along the cycle, and in its inverse
+    `number_to_tour`, the cell at every position of the cycle.
+    """
+
     def __init__(self, board_size):
         self.board_size = board_size
         self.arena_size = board_size * board_size
-        self.nodes = [Node() for _ in range(self.arena_size // 4)]
+        self.nodes_size = board_size // 2
+        self.right = np.zeros(self.nodes_size * self.nodes_size, dtype=bool)
+        self.down = np.zeros(self.nodes_size * self.nodes_size, dtype=bool)
         self.tour_to_number = np.zeros(self.arena_size, dtype=int)
+        self.number_to_tour = np.zeros(self.arena_size, dtype=int)
 
     def reset(self):
+        self.right[:] = False
+        self.down[:] = False
         self.tour_to_number = np.zeros(self.arena_size, dtype=int)
         self.generate()
 
@@ -45,176 +53,77 @@ class Maze:
             return coord_b - coord_a - 1
         return coord_b - coord_a - 1 + self.arena_size
 
-    def mark_visited(self, x, y):
-        self.nodes[x + y * self.board_size // 2].visited = True
-
-    def mark_can_go_right(self, x, y):
-        self.nodes[x + y * self.board_size // 2].can_go_right = True
-
-    def mark_can_go_down(self, x, y):
-        self.nodes[x + y * self.board_size // 2].can_go_down = True
-
-    def is_visited(self, x, y):
-        return self.nodes[x + y * self.board_size // 2].visited
-
-    def can_go_right(self, x, y):
-        return self.nodes[x + y * self.board_size // 2].can_go_right
-
-    def can_go_down(self, x, y):
-        return self.nodes[x + y * self.board_size // 2].can_go_down
-
-    def can_go_left(self, x, y):
-        if x == 0:
-            return False
-        return self.can_go_right(x - 1, y)
-
-    def can_go_up(self, x, y):
-        if y == 0:
-            return False
-        return self.can_go_down(x, y - 1)
-
     def generate(self):
-        self.generate_r(-1, -1, 0, 0)
+        self.generate_tree()
         self.generate_tour_number()
 
-    def generate_r(self, from_x, from_y, x, y):
-        if x < 0 or y < 0 or x >= self.board_size / 2 or y >= self.board_size / 2:
-            return
-        if self.is_visited(x, y):
-            return
-        self.mark_visited(x, y)
-
-        if from_x != -1:
-            if from_x < x:
-                self.mark_can_go_right(from_x, from_y)
-            elif from_x > x:
-                self.mark_can_go_right(x, y)
-            elif from_y < y:
-                self.mark_can_go_down(from_x, from_y)
-            elif from_y > y:
-                self.mark_can_go_down(x, y)
-
-        for i in range(2):
-            r = np.random.randint(0, 4)
-            if r == 0:
-                self.generate_r(x, y, x - 1, y)
-            elif r == 1:
-                self.generate_r(x, y, x + 1, y)
-            elif r == 2:
-                self.generate_r(x, y, x, y - 1)
-            elif r == 3:
-                self.generate_r(x, y, x, y + 1)
-
-        self.generate_r(x, y, x - 1, y)
-        self.generate_r(x, y, x + 1, y)
-        self.generate_r(x, y, x, y + 1)
-        self.generate_r(x, y, x, y - 1)
-
-    def _find_next_dir(self, x, y, snake_dir: Direction):
-        if snake_dir == Direction.RIGHT:
-            if self.can_go_up(x, y):
-                return Direction.UP
-            elif self.can_go_right(x, y):
-                return Direction.RIGHT
-            elif self.can_go_down(x, y):
-                return Direction.DOWN
-            else:
-                return Direction.LEFT
-        elif snake_dir == Direction.DOWN:
-            if self.can_go_right(x, y):
-                return Direction.RIGHT
-            elif self.can_go_down(x, y):
-                return Direction.DOWN
-            elif self.can_go_left(x, y):
-                return Direction.LEFT
-            else:
-                return Direction.UP
-        elif snake_dir == Direction.LEFT:
-            if self.can_go_down(x, y):
-                return Direction.DOWN
-            elif self.can_go_left(x, y):
-                return Direction.LEFT
-            elif self.can_go_up(x, y):
-                return Direction.UP
-            else:
-                return Direction.RIGHT
-        elif snake_dir == Direction.UP:
-            if self.can_go_left(x, y):
-                return Direction.LEFT
-            elif self.can_go_up(x, y):
-                return Direction.UP
-            elif self.can_go_right(x, y):
-                return Direction.RIGHT
+    def generate_tree(self):
+        """
+        Build a random spanning tree of the nodes with an iterative randomized depth first search (no recursion, so
+        any board size works). The random generator is seeded once from np.random, so seeding numpy reproduces the
+        maze
+        """
+        rand = random.Random(np.random.randint(0, 2 ** 31 - 1))
+        size = self.nodes_size
+        visited = bytearray(size * size)
+        right = bytearray(size * size)
+        down = bytearray(size * size)
+        visited[0] = 1
+        stack = [0]
+        while stack:
+            node = stack[-1]
+            y, x = divmod(node, size)
+            options = []
+            if x > 0 and not visited[node - 1]:
+                options.append(node - 1)
+            if x < size - 1 and not visited[node + 1]:
+                options.append(node + 1)
+            if y > 0 and not visited[node - size]:
+                options.append(node - size)
+            if y < size - 1 and not visited[node + size]:
+                options.append(node + size)
+            if not options:
+                stack.pop()
+                continue
+            neighbour = options[rand.randrange(len(options))] if len(options) > 1 else options[0]
+            if neighbour == node + 1:
+                right[node] = 1
+            elif neighbour == node - 1:
+                right[neighbour] = 1
+            elif neighbour == node + size:
+                down[node] = 1
             else:
-                return Direction.DOWN
-        return None
-
-    def set_tour_number(self, x, y, tour_number):
-        if self.get_path_number(x, y) != 0:
-            print(self.get_path_number(x, y), 'trying to set to', tour_number)
-            return
-        self.tour_to_number[x + y * self.board_size] = tour_number
+                down[neighbour] = 1
+            visited[neighbour] = 1
+            stack.append(neighbour)
+        self.right = np.frombuffer(right, dtype=np.uint8).astype(bool)
+        self.down = np.frombuffer(down, dtype=np.uint8).astype(bool)
 
     def generate_tour_number(self):
-        start_x, start_y = 0, 0
-        x, y = start_x, start_y
-
-        start_dir = Direction.UP if self.can_go_down(x, y) else Direction.LEFT
-        snake_dir = start_dir
-        tour_num = 0
-        while tour_num != self.arena_size:
-            next_dir = self._find_next_dir(x, y, snake_dir)
-            if snake_dir == Direction.RIGHT:
-                self.set_tour_number(x * 2, y * 2, tour_num)
-                tour_num += 1
-                if next_dir in [snake_dir, Direction.DOWN, Direction.LEFT]:
-                    self.set_tour_number(x * 2 + 1, y * 2, tour_num)
-                    tour_num += 1
-                if next_dir in [Direction.DOWN, Direction.LEFT]:
-                    self.set_tour_number(x * 2 + 1, y * 2 + 1, tour_num)
-                    tour_num += 1
-                if next_dir == Direction.LEFT:
-                    self.set_tour_number(x * 2, y * 2 + 1, tour_num)
-                    tour_num += 1
-            elif snake_dir == Direction.DOWN:
-                self.set_tour_number(x * 2 + 1, y * 2, tour_num)
-                tour_num += 1
-                if next_dir in [snake_dir, Direction.LEFT, Direction.UP]:
-                    self.set_tour_number(x * 2 + 1, y * 2 + 1, tour_num)
-                    tour_num += 1
-                if next_dir in [Direction.LEFT, Direction.UP]:
-                    self.set_tour_number(x * 2, y * 2 + 1, tour_num)
-                    tour_num += 1
-                if next_dir == Direction.UP:
-                    self.set_tour_number(x * 2, y * 2, tour_num)
-                    tour_num += 1
-            elif snake_dir == Direction.LEFT:
-                self.set_tour_number(x * 2 + 1, y * 2 + 1, tour_num)
-                tour_num += 1
-                if next_dir in [snake_dir, Direction.RIGHT, Direction.UP]:
-                    self.set_tour_number(x * 2, y * 2 + 1, tour_num)
-                    tour_num += 1
-                if next_dir in [Direction.RIGHT, Direction.UP]:
-                    self.set_tour_number(x * 2, y * 2, tour_num)
-                    tour_num += 1
-                if next_dir == Direction.RIGHT:
-                    self.set_tour_number(x * 2 + 1, y * 2, tour_num)
-                    tour_num += 1
-            elif snake_dir == Direction.UP:
-                self.set_tour_number(x * 2, y * 2 + 1, tour_num)
-                tour_num += 1
-                if next_dir in [snake_dir, Direction.RIGHT, Direction.DOWN]:
-                    self.set_tour_number(x * 2, y * 2, tour_num)
-                    tour_num += 1
-                if next_dir in [Direction.RIGHT, Direction.DOWN]:
-                    self.set_tour_number(x * 2 + 1, y * 2, tour_num)
-                    tour_num += 1
-                if next_dir == Direction.DOWN:
-                    self.set_tour_number(x * 2 + 1, y * 2 + 1, tour_num)
-                    tour_num += 1
-
+        """
+        Walk around the walls of the spanning tree and number the cells in the order they are visited.
+        The walk only collects the cells, the numbers are then written with one array assignment
+        """
+        size = self.nodes_size
+        right, down = self.right.tolist(), self.down.tolist()
+        width = self.board_size
+        order = []
+        x, y = 0, 0
+        snake_dir = Direction.UP if down[0] else Direction.LEFT
+        while len(order) < self.arena_size:
+            node = x + y * size
+            can_right = right[node]
+            can_down = down[node]
+            can_left = x > 0 and right[node - 1]
+            can_up = y > 0 and down[node - size]
+            next_dir = _next_dir(snake_dir, can_left, can_right, can_up, can_down)
+            # the cells of the 2x2 block in the order of the walk, starting from the side the walk came from
+            top_left = 2 * x + 2 * y * width
+            block = [top_left, top_left + 1, top_left + 1 + width, top_left + width]
+            start, count = _WALK[snake_dir][next_dir]
+            for k in range(count):
+                order.append(block[(start + k) % 4])
             snake_dir = next_dir
-
             if next_dir == Direction.RIGHT:
                 x += 1
             elif next_dir == Direction.LEFT:
@@ -223,3 +132,59 @@ class Maze:
                 y += 1
             elif next_dir == Direction.UP:
                 y -= 1
+        self.number_to_tour = np.array(order[:self.arena_size])
+        self.tour_to_number = np.zeros(self.arena_size, dtype=int)
+        self.tour_to_number[self.number_to_tour] = np.arange(self.arena_size)
+
+    def save(self, path):
+        """
+        Save the maze and its tour to a file, to reuse it later with Maze.load
+        """
+        with open(path, 'wb') as file:
+            np.savez_compressed(file, board_size=self.board_size, right=self.right, down=self.down,
+                                tour_to_number=self.tour_to_number)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load a maze saved with Maze.save
+        """
+        with np.load(path) as data:
+            maze = cls(int(data['board_size']))
+            maze.right = data['right']
+            maze.down = data['down']
+            maze.tour_to_number = data['tour_to_number']
+            maze.number_to_tour = np.argsort(maze.tour_to_number)
+        return maze
+
+
+def _next_dir(snake_dir, can_left, can_right, can_up, can_down):
+    """
+    The direction of the walk out of a node: keep the wall of the tree on the left hand
+    """
+    if snake_dir == Direction.RIGHT:
+        order = ((can_up, Direction.UP), (can_right, Direction.RIGHT), (can_down, Direction.DOWN))
+        default = Direction.LEFT
+    elif snake_dir == Direction.DOWN:
+        order = ((can_right, Direction.RIGHT), (can_down, Direction.DOWN), (can_left, Direction.LEFT))
+        default = Direction.UP
+    elif snake_dir == Direction.LEFT:
+        order = ((can_down, Direction.DOWN), (can_left, Direction.LEFT), (can_up, Direction.UP))
+        default = Direction.RIGHT
+    else:
+        order = ((can_left, Direction.LEFT), (can_up, Direction.UP), (can_right, Direction.RIGHT))
+        default = Direction.DOWN
+    for can_go, direction in order:
+        if can_go:
+            return direction
+    return default
+
+
+# For every (direction into a node, direction out of it): the first cell of the 2x2 block the walk visits
+# (0 top left, 1 top right, 2 bottom right, 3 bottom left, going clockwise) and how many cells it visits
+_WALK = {
+    Direction.RIGHT: {Direction.UP: (0, 1), Direction.RIGHT: (0, 2), Direction.DOWN: (0, 3), Direction.LEFT: (0, 4)},
+    Direction.DOWN: {Direction.RIGHT: (1, 1), Direction.DOWN: (1, 2), Direction.LEFT: (1, 3), Direction.UP: (1, 4)},
+    Direction.LEFT: {Direction.DOWN: (2, 1), Direction.LEFT: (2, 2), Direction.UP: (2, 3), Direction.RIGHT: (2, 4)},
+    Direction.UP: {Direction.LEFT: (3, 1), Direction.UP: (3, 2), Direction.RIGHT: (3, 3), Direction.DOWN: (3, 4)},
+}
@@ -1,18 +1,128 @@
+import json
+
+import distances
 import utils
+import vector_heuristics
 from agent import State
+from bitboard import SnakeState
+
+# the weights of squareness, compactness, connectivity and dead ends in weighed_compact_heuristics
+WEIGHTS = (4, 4, 3, 3)
 
 
 def manhattan_distance(state: State):
-    head = state.board.snake[0]
-    fruit = state.board.fruit_location
-    return utils.manhattan_d(head, fruit)
+    return _manhattan(state.board)
+
+
+def _manhattan(board):
+    # the coordinates of the head of a SnakeState come from its flat index, its snake property builds the whole body
+    if isinstance(board, SnakeState):
+        size = board.board_size
+        return utils.manhattan_d(divmod(board.head, size), divmod(board.fruit, size))
+    return utils.manhattan_d(board.snake[0], board.fruit_location)
+
+
+def manhattan_cells(grid, cell):
+    """
+    manhattan_distance of the head on a cell of a grid_search.Grid, for the space-time search
+    """
+    return utils.manhattan_d(divmod(cell, grid.size), divmod(grid.goal, grid.size))
+
+
+def table_cells(grid, cell):
+    """
+    table_distance of the head on a cell of a grid_search.Grid, for the space-time search
+    """
+    distance = distances.table_for(grid.size, grid.obstacle_mask, wrap=not grid.flag).distance(cell, grid.goal)
+    return grid.size * grid.size if distance is None else distance
+
+
+def table_distance(state: State, wrap=True):
+    """
+    The shortest path distance from the head to the fruit around the obstacles (ignoring the snake), looked up in the
+    precomputed distance table of the board. A tight admissible heuristic
+    """
+    board = state.board
+    distance = distances.table_for(board.board_size, board.obstacle_mask, wrap).distance(board.head, board.fruit)
+    if distance is None:  # the fruit can't be reached from the head
+        return board.board_size * board.board_size
+    return distance
+
+
+def make_table_distance(wrap):
+    """
+    Returns table_distance for a board with or without borders
+    :param wrap: True if the snake can go through the borders of the board
+    :return: A heuristic function of a State, with the lookup of the space-time search as its `cells`
+    """
+    if wrap:
+        return table_distance
 
+    def heuristic(state):
+        return table_distance(state, wrap)
 
-def weighed_compact_heuristics(state: State):
+    heuristic.cells = table_cells
+    return heuristic
+
+
+def weighed_compact_heuristics(state: State, weights=WEIGHTS):
     manhattan = manhattan_distance(state)
-    squareness = utils.squareness(state.board.snake)
-    compactness = utils.compactness(state.board.snake)
+    squareness = vector_heuristics.squareness(state.board)
+    compactness = vector_heuristics.compactness(state.board)
     connectivity = utils.connectivity(state.board)
     dead_end = utils.dead_end(state.board)
 
-    return manhattan + 4 * squareness + 4 * compactness + 3 * connectivity + 3 * dead_end
+    square_w, compact_w, connect_w, dead_w = weights
+    return manhattan + square_w * squareness + compact_w * compactness + connect_w * connectivity + dead_w * dead_end
+
+
+def make_weighed_compact_heuristics(weights):
+    """
+    Returns weighed_compact_heuristics with other weights
+    :param weights: The weights of squareness, compactness, connectivity and dead ends
+    :return: A heuristic function of a State, with the batched scoring of the successors as its `successors`
+    """
+    weights = tuple(weights)
+    if len(weights) != len(WEIGHTS):
+        raise ValueError(f'Expected {len(WEIGHTS)} weights, got {len(weights)}')
+
+    def heuristic(state):
+        return weighed_compact_heuristics(state, weights)
+
+    heuristic.successors = lambda boards: weighed_compact_successors(boards, weights)
+    return heuristic
+
+
+def load_weights(file_name):
+    """
+    Loading the weights of weighed_compact_heuristics from a weights file of the tuner (tune.py)
+    :param file_name: The JSON file of the weights
+    :return: A tuple of the weights
+    """
+    with open(file_name) as file:
+        return tuple(json.load(file)['weights'])
+
+
+def weighed_compact_successors(boards, weights=WEIGHTS):
+    """
+    Scores all the successors of a state with weighed_compact_heuristics in one call, computing the shape features
+    of all of them together. The A* agent uses it for the heuristics that have it as their `successors`
+    :param boards: The SnakeStates of the successors
+    :param weights: The weights of squareness, compactness, connectivity and dead ends
+    :return: A list of the heuristic values of the successors, in the order of the boards
+    """
+    squareness, compactness = vector_heuristics.batch_shape_features(boards)
+    square_w, compact_w, connect_w, dead_w = weights
+    scores = []
+    for board, square, compact in zip(boards, squareness, compactness):
+        manhattan = _manhattan(board)
+        connectivity = utils.connectivity(board)
+        dead_end = utils.dead_end(board)
+        scores.append(manhattan + square_w * int(square) + compact_w * int(compact) + connect_w * connectivity +
+                      dead_w * dead_end)
+    return scores
+
+
+weighed_compact_heuristics.successors = weighed_compact_successors
+manhattan_distance.cells = manhattan_cells
+table_distance.cells = table_cells
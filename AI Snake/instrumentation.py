@@ -0,0 +1,192 @@
+"""
+Per-move instrumentation of the Snake agents.
+Counters and timers are installed as wrappers around the agent's search, State.legal_action, the heuristic, the
+constructors of the search states, the SnakeState copies (from_board and advance) and the pushes to the fringes when
+the instrumentation is enabled, and removed when it is disabled, so the agents run the plain code (and pay nothing)
+when it is off. The wrappers keep the attributes of the wrapped functions, so the agents take the same code paths
+with the instrumentation on. Every call of the agent's next_move is one record:
+    move, time_ms, search_calls, search_ms, states, legal_action_calls, legal_action_ms, heuristic_calls,
+    heuristic_ms, board_copies, fringe_peak, nodes_expanded
+The records are exported as JSON or CSV.
+For sampling profilers use the profile mode instead (cProfile, or py-spy on a run without instrumentation), the
+wrappers would show up in the stacks.
+"""
+import cProfile
+import csv
+import functools
+import json
+import time
+
+import agent as agent_module
+import bitboard
+import utils
+
+FIELDS = ('move', 'time_ms', 'search_calls', 'search_ms', 'states', 'legal_action_calls', 'legal_action_ms',
+          'heuristic_calls', 'heuristic_ms', 'board_copies', 'fringe_peak', 'nodes_expanded')
+_FRINGES = (utils.Stack, utils.Queue, utils.PriorityQueue)
+
+
+class Instrumentation:
+    """
+    Collects the per-move records of one agent, use as a context manager or with enable() and disable()
+    """
+    active = None
+
+    def __init__(self, agent):
+        self.agent = agent
+        self.records = []
+        self.record = None
+        self._patches = []
+
+    def enable(self):
+        if Instrumentation.active is not None:
+            raise RuntimeError('Another instrumentation is already enabled')
+        Instrumentation.active = self
+        agent = self.agent
+        self._patch_attribute(agent, 'next_move', self._timed_move)
+        if hasattr(agent, 'search'):
+            self._patch_attribute(agent, 'search', lambda f: self._timed(f, 'search'))
+        for name in ('heuristic_function', 'h'):
+            if callable(getattr(agent, name, None)):
+                self._patch_attribute(agent, name, self._timed_heuristic)
+        self._patch_class(agent_module.State, 'legal_action', lambda f: self._timed(f, 'legal_action'))
+        self._patch_class(agent_module.State, '__init__', lambda f: self._counted(f, 'states'))
+        self._patch_class(bitboard.SnakeState, 'advance', lambda f: self._counted(f, 'board_copies'))
+        self._patch_class(bitboard.SnakeState, 'from_board', lambda f: self._counted(f, 'board_copies'))
+        for fringe in _FRINGES:
+            self._patch_class(fringe, 'push', self._measured_push)
+        return self
+
+    def disable(self):
+        for owner, name, original, is_instance in reversed(self._patches):
+            if is_instance and original is None:
+                delattr(owner, name)
+            else:
+                setattr(owner, name, original)
+        self._patches = []
+        if Instrumentation.active is self:
+            Instrumentation.active = None
+
+    def __enter__(self):
+        return self.enable()
+
+    def __exit__(self, *args):
+        self.disable()
+
+    def _patch_attribute(self, owner, name, make):
+        # the attribute of the instance shadows the method of the class, deleting it restores the method
+        original = owner.__dict__.get(name)
+        setattr(owner, name, make(getattr(owner, name)))
+        self._patches.append((owner, name, original, True))
+
+    def _patch_class(self, owner, name, make):
+        original = owner.__dict__[name]
+        if isinstance(original, classmethod):
+            wrapped = classmethod(make(original.__func__))
+        else:
+            wrapped = make(original)
+        setattr(owner, name, wrapped)
+        self._patches.append((owner, name, original, False))
+
+    def _timed_move(self, next_move):
+        def wrapper(board, flag=False):
+            record = dict.fromkeys(FIELDS, 0)
+            record['move'] = len(self.records)
+            self.record = record
+            nodes = getattr(self.agent, 'nodes_expanded', 0)
+            start = time.perf_counter()
+            try:
+                return next_move(board, flag)
+            finally:
+                record['time_ms'] = (time.perf_counter() - start) * 1000
+                record['nodes_expanded'] = getattr(self.agent, 'nodes_expanded', 0) - nodes
+                self.records.append(record)
+                self.record = None
+
+        return wrapper
+
+    def _timed_heuristic(self, heuristic):
+        # the batched scorings the agents look up on the heuristic (heuristics.weighed_compact_successors and
+        # heuristics.manhattan_cells) are kept on the wrapper, and counted as heuristic calls too
+        wrapper = self._timed(heuristic, 'heuristic')
+        for name in ('successors', 'cells'):
+            if callable(getattr(wrapper, name, None)):
+                setattr(wrapper, name, self._timed(getattr(wrapper, name), 'heuristic'))
+        return wrapper
+
+    def _timed(self, function, name):
+        calls, elapsed = f'{name}_calls', f'{name}_ms'
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            record = self.record
+            if record is None:
+                return function(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                record[calls] += 1
+                record[elapsed] += (time.perf_counter() - start) * 1000
+
+        return wrapper
+
+    def _counted(self, function, name):
+        def wrapper(*args, **kwargs):
+            if self.record is not None:
+                self.record[name] += 1
+            return function(*args, **kwargs)
+
+        return wrapper
+
+    def _measured_push(self, push):
+        def wrapper(fringe, *args, **kwargs):
+            push(fringe, *args, **kwargs)
+            record = self.record
+            if record is not None:
+                size = len(getattr(fringe, 'heap', None) or getattr(fringe, 'queue', None) or
+                           getattr(fringe, 'stack', None) or ())
+                if size > record['fringe_peak']:
+                    record['fringe_peak'] = size
+
+        return wrapper
+
+    def totals(self):
+        """
+        Returns the sums of all the records (the peak of the fringe is the maximum)
+        """
+        totals = dict.fromkeys(FIELDS, 0)
+        for record in self.records:
+            for field in FIELDS[1:]:
+                if field == 'fringe_peak':
+                    totals[field] = max(totals[field], record[field])
+                else:
+                    totals[field] += record[field]
+        totals['move'] = len(self.records)
+        return totals
+
+    def save(self, file_name):
+        """
+        Write the records to a file, as CSV if the name ends with .csv and as JSON otherwise
+        """
+        with open(file_name, 'w', newline='') as file:
+            if file_name.endswith('.csv'):
+                writer = csv.DictWriter(file, fieldnames=FIELDS)
+                writer.writeheader()
+                writer.writerows(self.records)
+            else:
+                json.dump(self.records, file)
+
+
+def profile(function, file_name, *args, **kwargs):
+    """
+    Run a function under cProfile and dump the statistics (open them with pstats or snakeviz)
+    :param function: The function to profile, usually Game.run
+    :param file_name: The file to dump the statistics to
+    :return: The return value of the function
+    """
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(function, *args, **kwargs)
+    finally:
+        profiler.dump_stats(file_name)
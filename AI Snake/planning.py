@@ -0,0 +1,208 @@
+"""
+Plan caching for the search agents.
+The obstacles never change during a game, so the distance from every cell to the fruit (ignoring the snake) is fixed
+until the fruit respawns. The cache computes the distance field of a fruit once, on the first replan after the fruit
+appeared, and reuses it on every replan until the fruit is eaten. It uses the field to
+- follow the shortest path to the fruit without searching, when it is collision free under the moving body
+- check that a cached plan is still valid before replanning
+It also has the safety checks of plans: a plan is safe when, after following it on a copy of the snake, the head can
+still reach the tail (the cell that keeps getting freed), so the snake can always chase its tail and never gets trapped
+"""
+import flood_fill
+from config import Direction
+
+DIRECTIONS = (Direction.LEFT, Direction.RIGHT, Direction.UP, Direction.DOWN)
+
+
+class DistanceField:
+    """
+    The distances of all the cells of a board from a goal cell, ignoring the snake.
+    The field is stored as the list of BFS layers (one bitmask per distance), computed with bitboard shifts
+    """
+
+    def __init__(self, board_size, obstacle_mask, goal, wrap=True):
+        self.board_size = board_size
+        self.goal = goal
+        self.geometry = flood_fill.geometry(board_size, wrap)
+        space = self.geometry.full & ~obstacle_mask
+        frontier = reached = 1 << goal
+        self.layers = []
+        while frontier:
+            self.layers.append(frontier)
+            frontier = self.geometry.neighbours(frontier) & space & ~reached
+            reached |= frontier
+        self.reached = reached
+
+    def distance(self, cell):
+        """
+        Returns the distance of a cell from the goal, None if the goal can't be reached from the cell
+        """
+        bit = 1 << cell
+        if not self.reached & bit:
+            return None
+        for distance, layer in enumerate(self.layers):
+            if layer & bit:
+                return distance
+        return None
+
+
+def neighbour(cell, direction, board_size, flag=False):
+    """
+    Returns the cell one step away in a direction, -1 if the step crosses a border of a board with borders
+    """
+    i, j = divmod(cell, board_size)
+    if direction == Direction.LEFT:
+        j -= 1
+    elif direction == Direction.RIGHT:
+        j += 1
+    elif direction == Direction.UP:
+        i -= 1
+    else:
+        i += 1
+    if flag and not (0 <= i < board_size and 0 <= j < board_size):
+        return -1
+    return (i % board_size) * board_size + j % board_size
+
+
+class PlanCache:
+    """
+    The distance field of the current fruit and the plan of an agent, to replan only when needed
+    """
+
+    def __init__(self):
+        self.key = None
+        self.current = None
+        self.expected = None
+
+    def field(self, state, flag=False):
+        """
+        Returns the distance field to the fruit of a SnakeState. The field is kept until the fruit (or the board) of
+        the state changes, a field of an eaten fruit is never needed again
+        """
+        key = (state.board_size, state.obstacle_mask, state.fruit, flag)
+        if key != self.key:
+            self.current = DistanceField(state.board_size, state.obstacle_mask, state.fruit, wrap=not flag)
+            self.key = key
+        return self.current
+
+    @staticmethod
+    def is_valid(state, moves, flag=False):
+        """
+        Simulate the snake along a plan and check it never runs into an obstacle or into its own moving body and
+        that it ends on the fruit
+        :param state: The SnakeState to start from
+        :param moves: The plan, the next move last (the order the agents pop moves in)
+        :param flag: A parameter that determines if the board has borders
+        :return: True if the plan can be followed safely to the fruit, False otherwise
+        """
+        if not moves:
+            return False
+        for move in reversed(moves):
+            cell = neighbour(state.head, move, state.board_size, flag)
+            if cell < 0 or (state.obstacle_mask | state.occupied) >> cell & 1:
+                return False
+            state = state.advance(move)
+        return state.head == state.fruit
+
+    def descend(self, state, flag=False):
+        """
+        Follow the distance field from the head down to the fruit, taking the steps that stay clear of the moving
+        body. A path found this way is a shortest path, so no search is needed
+        :param state: The SnakeState to start from
+        :param flag: A parameter that determines if the board has borders
+        :return: The plan to the fruit (the next move last), or an empty list if the descent was blocked by the snake
+        """
+        if state.fruit < 0:
+            return []
+        field = self.field(state, flag)
+        distance = field.distance(state.head)
+        if not distance:
+            return []
+        moves = []
+        while distance:
+            distance -= 1
+            layer = field.layers[distance]
+            for move in DIRECTIONS:
+                cell = neighbour(state.head, move, state.board_size, flag)
+                if cell >= 0 and layer >> cell & 1 and not state.occupied >> cell & 1:
+                    break
+            else:
+                return []
+            moves.append(move)
+            state = state.advance(move)
+        moves.reverse()
+        return moves
+
+    def expect(self, board, move):
+        """
+        Remember where the snake should be after a move of the plan, so on the next tick the rest of the plan can be
+        kept without checking it again
+        :param board: The game board before the move
+        :param move: The move that is about to be made
+        """
+        size = board.board_size
+        i, j = board.snake[0]
+        head = divmod(neighbour(i * size + j, move, size), size)
+        self.expected = (head, board.fruit_location, len(board.snake))
+
+    def on_track(self, board):
+        """
+        Check in O(1) that the snake is where the plan expected it to be, with the same fruit and length
+        :param board: The game board
+        """
+        return self.expected == (tuple(board.snake[0]), board.fruit_location, len(board.snake))
+
+
+def tail_reachable(state, flag=False):
+    """
+    Check that the head of a SnakeState can reach its tail through free cells, like utils.dead_end checks the
+    reachability of the free cells
+    :param state: The SnakeState
+    :param flag: A parameter that determines if the board has borders
+    :return: True if there is a path from the head to the tail
+    """
+    head, tail = 1 << state.body[0], 1 << state.body[-1]
+    if head == tail:
+        return True
+    geo = flood_fill.geometry(state.board_size, wrap=not flag)
+    space = geo.full & ~(state.obstacle_mask | state.occupied)
+    region = flood_fill.flood(head, space | head, geo)
+    return bool(geo.neighbours(region) & tail)
+
+
+def is_safe(state, moves, flag=False):
+    """
+    Follow a plan on a copy of the snake (the states are immutable, so the board of the game is never touched) and
+    check that the snake can still chase its tail at the end of it
+    :param state: The SnakeState to start from
+    :param moves: The plan, the next move last
+    :param flag: A parameter that determines if the board has borders
+    :return: True if the plan leaves the tail reachable
+    """
+    for move in reversed(moves):
+        state = state.advance(move)
+    return tail_reachable(state, flag)
+
+
+def escape_move(state, flag=False):
+    """
+    The fallback when there is no safe plan: chase the tail. Every legal move is tried on a copy of the snake, and the
+    move that keeps the tail reachable and the most free cells around the head is returned
+    :param state: The SnakeState
+    :param flag: A parameter that determines if the board has borders
+    :return: The move, None if the snake has no legal move
+    """
+    geo = flood_fill.geometry(state.board_size, wrap=not flag)
+    best_move, best_score = None, None
+    for move in DIRECTIONS:
+        cell = neighbour(state.head, move, state.board_size, flag)
+        if cell < 0 or (state.obstacle_mask | state.occupied) >> cell & 1:
+            continue
+        child = state.advance(move)
+        head = 1 << child.head
+        space = geo.full & ~(child.obstacle_mask | child.occupied)
+        area = flood_fill.popcount(flood_fill.flood(head, space | head, geo))
+        score = (tail_reachable(child, flag), area)
+        if best_score is None or score > best_score:
+            best_move, best_score = move, score
+    return best_move
@@ -0,0 +1,227 @@
+"""
+Compact binary replays of AI Snake games.
+A replay holds the seed and the obstacles of the game, the moves of the snake packed two bits per move, the cells the
+fruits spawned on, and a snapshot of the snake every `interval` ticks. Any tick is rebuilt from the closest snapshot
+before it by stepping at most `interval` moves, without running the agent again.
+
+Layout (little endian):
+    header     b'SNKR', version u8, board size u16, seed i64 (-1 for none), moves u32, interval u32
+    obstacles  count u32, cells u16 * count
+    moves      ceil(moves / 4) bytes, the move of tick t in bits 2 * (t % 4) of byte t // 4 (indexes of DIRECTIONS)
+    fruits     count u32, (tick u32, cell i32) * count, the fruit on the board from that tick on (-1 for no fruit)
+    snapshots  count u32, (tick u32, iterations u32, length u32, cells u16 * length) * count, the snake head first
+
+USAGE: python3 replay.py game.replay --tick 120 [--agent astar]
+"""
+import bisect
+import struct
+import time
+from optparse import OptionParser
+
+from config import Direction
+
+MAGIC = b'SNKR'
+VERSION = 1
+DIRECTIONS = (Direction.LEFT, Direction.RIGHT, Direction.UP, Direction.DOWN)
+_STEP = {Direction.LEFT: (0, -1), Direction.RIGHT: (0, 1), Direction.UP: (-1, 0), Direction.DOWN: (1, 0)}
+
+
+class Recorder:
+    """
+    Records a game tick by tick, see Game.run
+    """
+
+    def __init__(self, board, seed=None, interval=256):
+        """
+        :param board: The board of the game after the snake and the first fruit were spawned
+        :param seed: The seed of the game, if it was seeded
+        :param interval: The number of ticks between two snapshots
+        """
+        self.board_size = board.board_size
+        self.seed = seed
+        self.interval = interval
+        self.obstacles = sorted(self.cell(part) for part in board.obstacles)
+        self.moves = bytearray()
+        self.num_of_moves = 0
+        self.fruit = self.cell(board.fruit_location)
+        self.fruits = [(0, self.fruit)]
+        self.snapshots = []
+        self.snapshot(board, 0)
+
+    def cell(self, coordinates):
+        if not coordinates:
+            return -1
+        return coordinates[0] * self.board_size + coordinates[1]
+
+    def snapshot(self, board, iterations):
+        self.snapshots.append((self.num_of_moves, iterations, [self.cell(part) for part in board.snake]))
+
+    def record(self, move, board, iterations):
+        """
+        Record a tick of the game
+        :param move: The move of the snake in the tick
+        :param board: The board after the tick
+        :param iterations: The number of ticks since the last fruit, after the tick
+        """
+        if self.num_of_moves % 4 == 0:
+            self.moves.append(0)
+        self.moves[-1] |= DIRECTIONS.index(move) << 2 * (self.num_of_moves % 4)
+        self.num_of_moves += 1
+        fruit = self.cell(board.fruit_location)
+        if fruit != self.fruit:
+            self.fruit = fruit
+            self.fruits.append((self.num_of_moves, fruit))
+        if self.num_of_moves % self.interval == 0:
+            self.snapshot(board, iterations)
+
+    def save(self, file_name):
+        """
+        Write the replay to a file
+        """
+        seed = -1 if self.seed is None else self.seed
+        with open(file_name, 'wb') as file:
+            file.write(MAGIC)
+            file.write(struct.pack('<BHqII', VERSION, self.board_size, seed, self.num_of_moves, self.interval))
+            file.write(struct.pack(f'<I{len(self.obstacles)}H', len(self.obstacles), *self.obstacles))
+            file.write(bytes(self.moves))
+            file.write(struct.pack('<I', len(self.fruits)))
+            for tick, cell in self.fruits:
+                file.write(struct.pack('<Ii', tick, cell))
+            file.write(struct.pack('<I', len(self.snapshots)))
+            for tick, iterations, snake in self.snapshots:
+                file.write(struct.pack(f'<III{len(snake)}H', tick, iterations, len(snake), *snake))
+
+
+class Replay:
+    """
+    A recorded game, loaded from a replay file
+    """
+
+    def __init__(self, file_name):
+        with open(file_name, 'rb') as file:
+            data = file.read()
+        if data[:4] != MAGIC:
+            raise ValueError(f'{file_name} is not a replay file')
+        offset = 4
+        version, self.board_size, seed, self.num_of_moves, self.interval = struct.unpack_from('<BHqII', data, offset)
+        if version != VERSION:
+            raise ValueError(f'Unsupported replay version {version}')
+        self.seed = None if seed < 0 else seed
+        offset += struct.calcsize('<BHqII')
+        count, = struct.unpack_from('<I', data, offset)
+        offset += 4
+        self.obstacles = struct.unpack_from(f'<{count}H', data, offset)
+        offset += 2 * count
+        moves_size = (self.num_of_moves + 3) // 4
+        self.moves = data[offset:offset + moves_size]
+        offset += moves_size
+        count, = struct.unpack_from('<I', data, offset)
+        offset += 4
+        self.fruits = [struct.unpack_from('<Ii', data, offset + 8 * k) for k in range(count)]
+        self.fruit_ticks = [tick for tick, _ in self.fruits]
+        offset += 8 * count
+        count, = struct.unpack_from('<I', data, offset)
+        offset += 4
+        self.snapshots = []
+        for _ in range(count):
+            tick, iterations, length = struct.unpack_from('<III', data, offset)
+            offset += 12
+            self.snapshots.append((tick, iterations, struct.unpack_from(f'<{length}H', data, offset)))
+            offset += 2 * length
+        self.snapshot_ticks = [tick for tick, _, _ in self.snapshots]
+
+    def move(self, tick):
+        """
+        Returns the move made in a tick (the move from the state of the tick to the state of the next tick)
+        """
+        return DIRECTIONS[self.moves[tick // 4] >> 2 * (tick % 4) & 3]
+
+    def fruit(self, tick):
+        """
+        Returns the cell of the fruit at a tick, -1 if there is no fruit
+        """
+        return self.fruits[bisect.bisect_right(self.fruit_ticks, tick) - 1][1]
+
+    def state(self, tick):
+        """
+        Rebuild the state of the game at a tick, from the closest snapshot before it
+        :param tick: The tick, 0 is the start of the game and `num_of_moves` its end
+        :return: A tuple of (snake cells from the head, fruit cell, number of ticks since the last fruit)
+        """
+        if not 0 <= tick <= self.num_of_moves:
+            raise IndexError(f'The replay has ticks 0 to {self.num_of_moves}')
+        start, iterations, snake = self.snapshots[bisect.bisect_right(self.snapshot_ticks, tick) - 1]
+        snake = list(snake)
+        size = self.board_size
+        for t in range(start, tick):
+            di, dj = _STEP[self.move(t)]
+            i, j = divmod(snake[0], size)
+            head = (i + di) % size * size + (j + dj) % size
+            if head == self.fruit(t):
+                iterations = 0
+            else:
+                snake.pop()
+            snake.insert(0, head)
+            iterations += 1
+        return snake, self.fruit(tick), iterations
+
+    def board(self, tick):
+        """
+        Rebuild the game Board at a tick, to run an agent on it
+        """
+        from game import Board
+        size = self.board_size
+        snake, fruit, _ = self.state(tick)
+        board = Board(size, 0, obstacles={divmod(cell, size) for cell in self.obstacles})
+        board.restore([divmod(cell, size) for cell in snake], divmod(fruit, size) if fruit >= 0 else ())
+        return board
+
+
+def render(board):
+    """
+    Returns the board as text: 'H' the head, 'o' the body, 'x' an obstacle, '*' the fruit
+    """
+    rows = [['.'] * board.board_size for _ in range(board.board_size)]
+    for i, j in board.obstacles:
+        rows[i][j] = 'x'
+    for i, j in board.snake:
+        rows[i][j] = 'o'
+    if board.fruit_location:
+        rows[board.fruit_location[0]][board.fruit_location[1]] = '*'
+    head = board.snake[0]
+    rows[head[0]][head[1]] = 'H'
+    return '\n'.join(''.join(row) for row in rows)
+
+
+def main():
+    usage_str = """USAGE:python3 replay.py <replay file> <options>"""
+    parser = OptionParser(usage_str)
+    parser.add_option('-t', '--tick', help='The tick to show (default: the end of the game)', type=int)
+    agents = ['astar', 'bfs', 'hamiltonian', 'gbfs', 'bibfs', 'jps', 'idastar', 'smastar']
+    parser.add_option('--agent', choices=agents, type='choice', metavar=agents,
+                      help='Run an agent on the board of the tick and time its next move')
+    parser.add_option('--heu', help='The heuristic for the A* agent', default='manhattan')
+    parser.add_option('-b', '--border', help="The borders of the board", default=0, type=int)
+    args, files = parser.parse_args()
+    if len(files) != 1:
+        parser.error('Expected one replay file')
+
+    replay = Replay(files[0])
+    tick = replay.num_of_moves if args.tick is None else args.tick
+    seed = 'none' if replay.seed is None else replay.seed
+    print(f'Board size {replay.board_size}, seed {seed}, {replay.num_of_moves} moves, tick {tick}')
+    board = replay.board(tick)
+    print(render(board))
+    print(f'Score: {len(board.snake)}, next move: {replay.move(tick).name if tick < replay.num_of_moves else None}')
+    if args.agent:
+        from game import get_agent, get_heuristic
+        agent = get_agent(args.agent, size=replay.board_size, heu=get_heuristic(args.heu, wrap=args.border != 1))
+        start = time.perf_counter()
+        move = agent.next_move(board, args.border == 1)
+        elapsed = time.perf_counter() - start
+        print(f'{args.agent} move: {move.name if move else None} in {elapsed * 1000:.2f}ms, '
+              f'{agent.nodes_expanded} nodes expanded')
+
+
+if __name__ == '__main__':
+    main()
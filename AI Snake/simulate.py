@@ -0,0 +1,129 @@
+"""
+Headless batch simulation of AI Snake games.
+Runs many games across a pool of processes without any rendering or frame rate limit, and streams the result of
+every game as a JSON line.
+
+USAGE: python3 simulate.py -n 1000 --agent astar --heu manhattan -o results.jsonl
+"""
+import json
+import multiprocessing
+import random
+import sys
+import time
+from optparse import OptionParser
+
+import numpy as np
+
+import assets
+import config
+import display_engine
+from game import Game, get_agent, get_heuristic
+
+
+def play_game(task):
+    """
+    Play a single headless game
+    :param task: A dictionary with the index and seed of the game and the options of the simulation
+    :return: A dictionary with the results of the game
+    """
+    seed = task['seed']
+    random.seed(seed)
+    np.random.seed(seed)
+    heu = get_heuristic(task['heu'], task.get('weights_file'), wrap=task['border'] != 1)
+    agent = get_agent(task['agent'], size=task['board_size'], heu=heu, safe=task.get('safe', False),
+                      deadline=task.get('deadline'), spacetime=task.get('spacetime', False),
+                      max_nodes=task.get('max_nodes'), max_bytes=task.get('max_bytes'),
+                      exact_states=task.get('exact_states', False))
+    game = Game(task['board_size'], task['obstacle_chance'], agent, display_engine.DefaultDisplayEngine,
+                task['border'], board_file=task['board_file'], num_of_games=1, frame_rate=None, verbose=False)
+    start = time.perf_counter()
+    score = game.run()
+    wall_time = time.perf_counter() - start
+    return {
+        'game': task['game'],
+        'seed': seed,
+        'score': score,
+        'steps': game.steps,
+        'wall_time': wall_time,
+        'nodes_expanded': agent.nodes_expanded,
+    }
+
+
+def simulate(num_of_games, seed=0, workers=None, output=sys.stdout, **options):
+    """
+    Play games across a pool of processes and write the result of each game as a JSON line as soon as it ends.
+    Game `i` is always played with the seed `seed + i`, so the results do not depend on the number of workers
+    :param num_of_games: The number of games to play
+    :param seed: The seed of the first game
+    :param workers: The number of processes, defaults to the number of CPUs
+    :param output: A text file to write the results to
+    :param options: The options of the games (agent, heu, board_size, obstacle_chance, border, board_file, safe,
+                    weights_file, deadline, spacetime, max_nodes, max_bytes, exact_states)
+    :return: A list of the results of all the games, ordered by game index
+    """
+    tasks = [dict(options, game=i, seed=seed + i) for i in range(num_of_games)]
+    results = []
+    with multiprocessing.Pool(workers) as pool:
+        for result in pool.imap_unordered(play_game, tasks):
+            output.write(json.dumps(result) + '\n')
+            output.flush()
+            results.append(result)
+    results.sort(key=lambda r: r['game'])
+    return results
+
+
+def main():
+    usage_str = """USAGE:python3 simulate.py <options>"""
+    parser = OptionParser(usage_str)
+    parser.add_option('-n', '--num-of-games', help='Number of games to play', default=100, type=int)
+    parser.add_option('-j', '--workers', help='Number of worker processes (default: number of CPUs)', type=int)
+    parser.add_option('--seed', help='Seed of the first game, game i uses seed + i', default=0, type=int)
+    parser.add_option('-o', '--output', help='File to write the JSON lines to (default: stdout)')
+    parser.add_option('-b', '--border', help="The borders of the board", default=0, type=int)
+    parser.add_option('-s', '--size', dest='board_size', help='The size of the board', default=config.BOARD_SIZE,
+                      type=int)
+    parser.add_option('--obstacle-chance', help='Chance to spawn obstacles in the board', default=1, type=float)
+    parser.add_option('--board-file', help='A file with the layout of the board')
+
+    agents = ['astar', 'bfs', 'hamiltonian', 'gbfs', 'bibfs', 'jps', 'idastar', 'smastar']
+    heus = ['manhattan', 'weighted-compact', 'distance']
+    parser.add_option('--agent', choices=agents, help=f'The agent to drive the snake', default=agents[0],
+                      type='choice', metavar=agents)
+    parser.add_option('--heu', choices=heus, help=f'The heuristic for the A* agent', default=heus[0], metavar=heus)
+    parser.add_option('--weights-file', help='A weights file of tune.py for the weighted-compact heuristic')
+    parser.add_option('--deadline', type=float, help='Time budget of a search in milliseconds')
+    parser.add_option('--safe', action='store_true', default=False,
+                      help='Let the A* agent follow only paths that leave its tail reachable')
+    parser.add_option('--spacetime', action='store_true', default=False,
+                      help='Let the A* and BFS agents search through the body cells that are freed on the way')
+    parser.add_option('--exact-states', action='store_true', default=False,
+                      help='Let the search agents tell states apart by the whole snake instead of by the head')
+    parser.add_option('--max-nodes', type=int,
+                      help='The number of search states the IDA* and SMA* agents may keep in memory')
+    parser.add_option('--max-bytes', type=int,
+                      help='The memory in bytes the search states of the IDA* and SMA* agents may take (an estimate)')
+
+    args, _ = parser.parse_args()
+    if args.board_file:
+        args.board_size = assets.board_layout(args.board_file).size
+
+    output = open(args.output, 'w') if args.output else sys.stdout
+    try:
+        results = simulate(args.num_of_games, args.seed, args.workers, output, agent=args.agent, heu=args.heu,
+                           board_size=args.board_size, obstacle_chance=args.obstacle_chance, border=args.border,
+                           board_file=args.board_file, safe=args.safe, weights_file=args.weights_file,
+                           deadline=args.deadline, spacetime=args.spacetime, max_nodes=args.max_nodes,
+                           max_bytes=args.max_bytes, exact_states=args.exact_states)
+    finally:
+        if args.output:
+            output.close()
+
+    if results:
+        avg = sum(r['score'] for r in results) / len(results)
+        avg_coverage = avg / (args.board_size * args.board_size)
+        print(f'Finished {len(results)} games with average score of {avg}, '
+              f'average board coverage: {avg_coverage * 100: 0.2f}%', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
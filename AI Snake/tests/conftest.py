@@ -0,0 +1,48 @@
+"""
+The modules of the game are flat scripts, the tests import them from the directory above
+"""
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from game import Board  # noqa: E402
+
+
+@pytest.fixture
+def make_board():
+    """
+    Returns a function that builds a Board with a given snake (head first), fruit and obstacles
+    """
+
+    def make(size, snake, fruit=(), obstacles=()):
+        board = Board(size, 0, obstacles=set(obstacles))
+        board.restore(list(snake), fruit)
+        return board
+
+    return make
+
+
+@pytest.fixture
+def follow():
+    """
+    Returns a function that plays a path (the next move last) from a SnakeState with the rules of Board.step and
+    returns the state at its end, failing the test when the snake runs into an obstacle or into itself
+    """
+
+    def play(state, path):
+        for move in reversed(path):
+            state = state.advance(move)
+            assert not state.obstacle_mask >> state.head & 1, 'the path runs into an obstacle'
+            assert state.head not in state.body[1:], 'the path runs into the snake'
+        return state
+
+    return play
+
+
+@pytest.fixture(autouse=True)
+def seeded():
+    random.seed(0)
@@ -0,0 +1,60 @@
+import pytest
+
+import agent as agent_module
+import config
+from agent import State
+from bitboard import SnakeState
+from game import get_agent, get_heuristic
+
+
+def test_state_keys(make_board):
+    board = SnakeState.from_board(make_board(8, [(2, 2), (2, 3)], (5, 5)))
+    state = State(board, 0, None, [])
+    assert state.key() == board.head
+    assert state.key(exact=True) == board
+
+
+@pytest.mark.parametrize('name', ['astar', 'bfs', 'gbfs'])
+@pytest.mark.parametrize('exact_states', [False, True])
+def test_search_agents_reach_the_fruit(make_board, follow, name, exact_states):
+    board = make_board(10, [(2, 2), (2, 3), (2, 4), (3, 4)], (6, 7), obstacles=[(4, 6), (5, 6), (6, 6)])
+    agent = get_agent(name, heu=get_heuristic('manhattan'), exact_states=exact_states)
+    assert agent.exact_states == exact_states
+    path = agent.search(board, False)
+    assert follow(SnakeState.from_board(board), path).snake[0] == (6, 7)
+
+
+class Clock:
+    """
+    A clock that advances by one second every time it is read
+    """
+
+    def __init__(self):
+        self.now = 0
+
+    def perf_counter(self):
+        self.now += 1
+        return self.now
+
+
+@pytest.mark.parametrize('name', ['astar', 'bfs', 'gbfs'])
+@pytest.mark.parametrize('flag', [False, True])
+def test_search_with_no_time_left(make_board, follow, name, flag):
+    board = make_board(10, [(2, 2), (2, 3), (2, 4), (3, 4)], (6, 7), obstacles=[(1, 2), (3, 2)])
+    agent = get_agent(name, heu=get_heuristic('manhattan'), deadline=0)
+    move, = agent.search(board, flag)
+    assert move == config.Direction.LEFT
+    follow(SnakeState.from_board(board), [move])
+    assert agent.next_move(board, flag) == config.Direction.LEFT
+
+
+@pytest.mark.parametrize('name', ['astar', 'bfs', 'gbfs'])
+def test_search_until_the_deadline(make_board, follow, monkeypatch, name):
+    board = make_board(10, [(2, 2), (2, 3), (2, 4), (3, 4)], (6, 7), obstacles=[(4, 6), (5, 6), (6, 6)])
+    monkeypatch.setattr(agent_module, 'time', Clock())
+    # the clock is read once per state, the search stops after 5 states
+    agent = get_agent(name, heu=get_heuristic('manhattan'), deadline=5 * 1000)
+    path = agent.search(board, False)
+    assert path and agent.nodes_expanded == 5
+    head = follow(SnakeState.from_board(board), path).snake[0]
+    assert abs(head[0] - 6) + abs(head[1] - 7) < 4 + 5
@@ -0,0 +1,95 @@
+import random
+
+import pytest
+
+from arena import EMPTY, OBSTACLE, Arena, ArenaView
+from config import Direction
+from game import get_agent, get_heuristic
+
+
+def check_invariants(arena):
+    size = arena.board_size
+    living = [snake for snake in arena.snakes if snake.alive]
+    bodies = set()
+    for snake in living:
+        assert snake.cells == set(snake.body) and len(snake.body) == len(snake.cells)
+        assert not bodies & snake.cells
+        bodies |= snake.cells
+        for i, j in snake.body:
+            assert arena.grid[i * size + j] == snake.index
+    assert arena.blocked == arena.obstacles | bodies
+    assert arena.blocked_mask == sum(1 << (i * size + j) for i, j in arena.blocked)
+    for k, owner in enumerate(arena.grid):
+        cell = divmod(k, size)
+        assert (owner == OBSTACLE) == (cell in arena.obstacles)
+        assert (owner == EMPTY) == (cell not in arena.blocked)
+    fruits = {cell for bucket in arena.fruits.buckets for cell in bucket}
+    assert not fruits & arena.blocked
+    everything = {(i, j) for i in range(size) for j in range(size)}
+    assert set(arena.free.cells) == everything - arena.blocked - fruits
+
+
+@pytest.mark.parametrize('agent', ['astar', 'bfs'])
+def test_arena_invariants(agent):
+    agents = [get_agent(agent, heu=get_heuristic('manhattan')) for _ in range(8)]
+    arena = Arena(16, 0.2, agents, 6, rand=random.Random(3))
+    check_invariants(arena)
+    for _ in range(200):
+        fruits = len(arena.fruits)
+        living = arena.step()
+        check_invariants(arena)
+        assert len(arena.fruits) == fruits
+        if not living:
+            break
+    assert arena.ticks > 10
+
+
+def test_views_hide_the_own_body():
+    agents = [get_agent('astar', heu=get_heuristic('manhattan')) for _ in range(3)]
+    arena = Arena(12, 0, agents, 4, rand=random.Random(1))
+    for _ in range(20):
+        arena.step()
+    snake = next(snake for snake in arena.snakes if snake.alive)
+    view = ArenaView(arena, snake)
+    others = {cell for other in arena.snakes if other.alive and other is not snake for cell in other.body}
+    assert set(view.obstacles) == arena.obstacles | others and len(view.obstacles) == len(others)
+    assert all(cell in view.obstacles for cell in others) and snake.body[0] not in view.obstacles
+    assert view.obstacle_mask == sum(1 << (i * 12 + j) for i, j in others)
+
+
+def test_plans_are_dropped_when_the_target_changes():
+    agents = [get_agent('astar', heu=get_heuristic('manhattan'))]
+    arena = Arena(12, 0, agents, 1, rand=random.Random(0))
+    snake = arena.snakes[0]
+    agent = snake.agent
+    arena.step()
+    fruit = ArenaView(arena, snake).fruit_location
+    assert snake.target is not None and agent.plan()
+    # a closer fruit spawns next to the head
+    i, j = snake.body[0]
+    closer = next(cell for cell in [(i, (j + 1) % 12), (i, (j - 1) % 12), ((i + 1) % 12, j)]
+                  if cell in arena.free and cell != fruit)
+    arena.free.remove(closer)
+    arena.fruits.add(closer)
+    arena.check_plan(snake, ArenaView(arena, snake).fruit_location)
+    assert agent.plan() == [] and snake.target == closer
+    arena.step()
+    assert snake.body[0] == closer
+
+
+def test_plans_are_dropped_when_the_next_cell_is_taken():
+    agents = [get_agent('bfs') for _ in range(2)]
+    arena = Arena(12, 0, agents, 1, rand=random.Random(0))
+    first, second = arena.snakes
+    arena.step()
+    plan = first.agent.plan()
+    plan[:] = [Direction.RIGHT]
+    i, j = first.body[0]
+    blocker = (i, (j + 1) % 12)
+    if arena.owner(blocker) == EMPTY:
+        arena.free.remove(blocker)
+        arena.fruits.remove(blocker)
+        arena.take(blocker, second)
+        second.body.append(blocker)
+    arena.check_plan(first, first.target)
+    assert first.agent.plan() == []
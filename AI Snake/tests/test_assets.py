@@ -0,0 +1,61 @@
+import os
+
+import pytest
+
+import assets
+from bitboard import SnakeState
+from game import Board
+
+
+@pytest.fixture
+def board_file(tmp_path):
+    path = tmp_path / 'board.txt'
+    path.write_text('0,x,0,0\n0,0,0,x\n0,0,0,0\nx,0,0,0\n')
+    yield path
+    assets.clear_cache()
+
+
+def test_layouts_are_parsed_once(board_file):
+    layout = assets.board_layout(str(board_file))
+    assert layout.size == 4
+    assert layout.obstacles == {(0, 1), (1, 3), (3, 0)}
+    assert layout.mask == assets.obstacle_mask(layout.obstacles, 4)
+    assert assets.board_layout(str(board_file)) is layout
+    assert layout in assets.board_layouts()
+
+
+def test_changed_files_are_parsed_again(board_file):
+    layout = assets.board_layout(str(board_file))
+    board_file.write_text('0,0\n0,x\n')
+    stat = os.stat(board_file)
+    os.utime(board_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    changed = assets.board_layout(str(board_file))
+    assert changed is not layout and changed.size == 2 and changed.obstacles == {(1, 1)}
+
+
+def test_paths_are_resolved_against_the_package(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    assert assets.resolve('game.py') == os.path.join(assets.PACKAGE_DIR, 'game.py')
+    assert assets.data_path('obt.txt') == os.path.join(assets.DATA_DIR, 'obt.txt')
+    (tmp_path / 'game.py').write_text('')
+    assert assets.resolve('game.py') == str(tmp_path / 'game.py')
+    assert assets.obstacle_templates() is assets.obstacle_templates('obt.txt')
+
+
+def test_boards_use_the_layout_mask(board_file):
+    layout = assets.board_layout(str(board_file))
+    board = Board(0, 0, str(board_file))
+    assert board.board_size == 4 and board.obstacle_mask == layout.mask
+    board.spawn_snake(2, 2, 1)
+    state = SnakeState.from_board(board)
+    assert state.obstacle_mask == layout.mask
+    board.obstacles.add((0, 0))  # the set of the board is a copy, the cached layout doesn't change
+    assert (0, 0) not in layout.obstacles
+
+
+def test_spawning_on_an_obstacle_clears_its_bit():
+    board = Board(6, 0, obstacles={(2, 2), (2, 3), (4, 4)})
+    board.spawn_snake(2, 2, 2)
+    assert board.obstacles == {(4, 4)}
+    assert board.obstacle_mask == assets.obstacle_mask(board.obstacles, 6)
+    assert SnakeState.from_board(board).obstacle_mask == board.obstacle_mask
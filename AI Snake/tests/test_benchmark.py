@@ -0,0 +1,51 @@
+from benchmark import GATED_METRICS, METRICS, compare
+
+
+def metrics(**changes):
+    result = {'games': 3, 'moves': 20000, 'nodes_expanded': 1000, 'latency_p50_ms': 1.0, 'latency_p90_ms': 2.0,
+              'latency_p99_ms': 4.0, 'memory_peak_kb': 100.0, 'coverage': 0.5}
+    result.update(changes)
+    return result
+
+
+def test_identical_runs():
+    assert compare({'astar/8': metrics()}, {'astar/8': metrics()}, 0.1) == []
+
+
+def test_directions():
+    baseline = {'astar/8': metrics()}
+    worse = compare({'astar/8': metrics(nodes_expanded=1200, coverage=0.4)}, baseline, 0.1)
+    assert len(worse) == 2 and worse[0].startswith('astar/8 nodes_expanded') and 'coverage' in worse[1]
+    assert compare({'astar/8': metrics(nodes_expanded=800, coverage=0.6)}, baseline, 0.1) == []
+    assert compare({'astar/8': metrics(nodes_expanded=1050, coverage=0.46)}, baseline, 0.1) == []
+
+
+def test_latency_noise():
+    baseline = {'astar/8': metrics(latency_p50_ms=0.01)}
+    # below the absolute floor
+    assert compare({'astar/8': metrics(latency_p50_ms=0.05)}, baseline, 0.1) == []
+    assert len(compare({'astar/8': metrics(latency_p50_ms=0.07)}, baseline, 0.1)) == 1
+    # too few moves above the percentile in either run
+    assert compare({'astar/8': metrics(latency_p50_ms=0.07, moves=300)}, baseline, 0.1) == []
+    assert compare({'astar/8': metrics(latency_p50_ms=0.07)}, {'astar/8': metrics(latency_p50_ms=0.01, moves=300)},
+                   0.1) == []
+    assert compare({'astar/8': metrics(latency_p50_ms=0.07, moves=300)}, baseline, 0.1, min_latency_samples=0)
+    baseline = {'astar/8': metrics(moves=1000)}
+    assert compare({'astar/8': metrics(moves=1000, latency_p50_ms=2.0, latency_p90_ms=4.0)}, baseline, 0.1) == [
+        'astar/8 latency_p50_ms: 1 -> 2']
+
+
+def test_p99_is_not_gated_by_default():
+    assert 'latency_p99_ms' in METRICS and 'latency_p99_ms' not in GATED_METRICS
+    baseline = {'astar/8': metrics()}
+    results = {'astar/8': metrics(latency_p99_ms=40.0)}
+    assert compare(results, baseline, 0.1) == []
+    assert len(compare(results, baseline, 0.1, metrics=tuple(METRICS))) == 1
+
+
+def test_missing_keys():
+    baseline = {'astar/8': metrics(memory_peak_kb=None)}
+    results = {'astar/8': metrics(memory_peak_kb=1000.0), 'bfs/8': metrics(nodes_expanded=10 ** 9)}
+    assert compare(results, baseline, 0.1) == []
+    del baseline['astar/8']['coverage']
+    assert compare({'astar/8': metrics(coverage=0.1)}, baseline, 0.1) == []
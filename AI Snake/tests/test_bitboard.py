@@ -0,0 +1,42 @@
+from bitboard import SnakeState
+from config import Direction
+
+
+def test_from_board(make_board):
+    board = make_board(8, [(2, 2), (2, 3), (2, 4)], (5, 5), obstacles=[(0, 0), (7, 7)])
+    state = SnakeState.from_board(board)
+    assert state.head == 2 * 8 + 2
+    assert state.snake == [(2, 2), (2, 3), (2, 4)]
+    assert state.fruit_location == (5, 5)
+    assert state.obstacles == {(0, 0), (7, 7)}
+    assert not state.is_free(2, 3) and not state.is_free(0, 0) and state.is_free(3, 3)
+
+
+def test_advance_moves_and_wraps(make_board):
+    state = SnakeState.from_board(make_board(8, [(0, 0), (0, 1)], (5, 5)))
+    moved = state.advance(Direction.UP)
+    assert moved.snake == [(7, 0), (0, 0)]
+    assert state.snake == [(0, 0), (0, 1)]  # the state itself is not changed
+    assert moved.occupied == 1 << 56 | 1 << 0
+
+
+def test_advance_grows_on_fruit(make_board):
+    state = SnakeState.from_board(make_board(8, [(2, 2), (2, 3)], (2, 1)))
+    grown = state.advance(Direction.LEFT)
+    assert grown.snake == [(2, 1), (2, 2), (2, 3)]
+
+
+def test_incremental_key_matches_a_new_state(make_board):
+    state = SnakeState.from_board(make_board(8, [(2, 2), (2, 3), (2, 4)], (4, 1)))
+    for move in (Direction.DOWN, Direction.DOWN, Direction.LEFT, Direction.LEFT):
+        state = state.advance(move)
+        fresh = SnakeState(state.board_size, state.obstacle_mask, state.occupied, state.body, state.fruit)
+        assert fresh.key == state.key
+        assert fresh == state and hash(fresh) == hash(state)
+    assert state.snake[0] == (4, 0) and len(state.body) == 4
+
+
+def test_states_with_different_bodies_differ(make_board):
+    a = SnakeState.from_board(make_board(8, [(2, 2), (2, 3)], (5, 5)))
+    b = SnakeState.from_board(make_board(8, [(2, 2), (3, 2)], (5, 5)))
+    assert a != b
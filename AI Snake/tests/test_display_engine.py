@@ -0,0 +1,137 @@
+import io
+import sys
+import threading
+import time
+from functools import partial
+from types import SimpleNamespace
+
+import pytest
+
+import config
+import display_engine
+from agent import AStarAgent
+from display_engine import CLIDisplayEngine, GUIDisplayEngine
+from game import Game
+from heuristics import manhattan_distance
+
+
+def test_cli_messages_land_below_the_board(capsys):
+    size = 6
+    game = Game(size, 0, AStarAgent(manhattan_distance), partial(CLIDisplayEngine, stream=sys.stdout), num_of_games=2,
+                frame_rate=None)
+    for _ in range(2):
+        game.run()
+        assert game.display.writer is None
+    output = capsys.readouterr().out
+    below = f'\x1b[{size + 2};1H\x1b[?25h'
+    assert output.count('Game Ended') == 2
+    assert output.count(below + 'Game Ended') == 2
+    # the second game clears the screen and draws again
+    assert output.count('\x1b[2J') == 2
+    assert output.index('\x1b[2J', output.index('Game Ended')) > output.index('Game Ended')
+
+
+def test_cli_frame_diff():
+    engine = CLIDisplayEngine(lambda move: None, stream=None)
+    first = engine.frame_diff(True, 4, {(0, 0): 'head', (1, 1): 'obstacle'}, 'status')
+    assert first.startswith('\x1b[?25l\x1b[2J') and '\x1b[1;1H@' in first and '\x1b[2;3H#' in first
+    second = engine.frame_diff(False, 4, {(0, 1): 'head', (1, 1): 'obstacle'}, 'status')
+    assert '\x1b[1;1H ' in second and '\x1b[1;3H@' in second and '#' not in second
+
+
+class RacingEvent(threading.Event):
+    """
+    An event that runs a callback the first time it is cleared, between the writer's clear and its taking the lock
+    """
+
+    def __init__(self, callback):
+        super().__init__()
+        self.callback = callback
+
+    def clear(self):
+        super().clear()
+        callback, self.callback = self.callback, None
+        if callback is not None:
+            callback()
+
+
+def test_cli_burst_of_frames(make_board):
+    stream = io.StringIO()
+    engine = CLIDisplayEngine(lambda move: None, stream=stream)
+    game = SimpleNamespace(board=make_board(6, [(2, 2)], (4, 4)), steps=0)
+
+    def burst():
+        for steps in range(1, 4):
+            game.steps = steps
+            engine.push(game, clear=False)
+
+    def written(steps):
+        deadline = time.perf_counter() + 2
+        while not stream.getvalue().endswith(f'Steps: {steps}') and time.perf_counter() < deadline:
+            time.sleep(0.001)
+        return stream.getvalue().endswith(f'Steps: {steps}')
+
+    engine.ready = RacingEvent(burst)
+    engine.push(game, clear=True)
+    assert written(3)
+    for steps in range(4, 8):
+        game.steps = steps
+        engine.push(game, clear=False)
+        assert written(steps), 'the writer stopped before the end of the game'
+    assert engine.writer.is_alive()
+    engine.close()
+    assert not engine.closed and engine.writer is None
+
+
+@pytest.fixture
+def gui(monkeypatch):
+    """
+    A GUIDisplayEngine on the dummy video driver of SDL, with the rectangles of every display update in `updates`
+    """
+    pygame = pytest.importorskip('pygame')
+    monkeypatch.setenv('SDL_VIDEODRIVER', 'dummy')
+    monkeypatch.setattr(config, 'BLOCK_SIZE', config.GUI_WIDTH / 8)
+    engine = GUIDisplayEngine(lambda move: None, frame_rate=10)
+    engine.updates = []
+    update = pygame.display.update
+
+    def recorded(rects=None):
+        engine.updates.append(rects)
+        return update(rects) if rects is not None else update()
+
+    monkeypatch.setattr(pygame.display, 'update', recorded)
+    yield engine
+    pygame.quit()
+
+
+def test_gui_updates_the_changed_cells(gui, make_board):
+    board = make_board(8, [(2, 2), (2, 3), (2, 4)], (6, 6), obstacles=[(0, 0)])
+    gui.draw(board)
+    obstacles, first = gui.updates
+    assert obstacles is None
+    assert sorted(first) == sorted(gui.cell_rect(cell) for cell in [(2, 2), (2, 3), (2, 4), (6, 6)])
+    board.move(config.Direction.LEFT)
+    board.step()
+    gui.updates = []
+    gui.draw(board)
+    # the new head, the old head that is a part of the body now and the cell the tail left
+    assert sorted(gui.updates[0]) == sorted(gui.cell_rect(cell) for cell in [(2, 1), (2, 2), (2, 4)])
+    gui.updates = []
+    gui.draw(board)
+    assert gui.updates == []
+
+
+def test_gui_skips_frames(gui, make_board, monkeypatch):
+    clock = SimpleNamespace(now=100.0)
+    monkeypatch.setattr(display_engine, 'time', SimpleNamespace(perf_counter=lambda: clock.now))
+    drawn = []
+    monkeypatch.setattr(gui, 'draw', drawn.append)
+    game = SimpleNamespace(state=config.GameState.RUNNING, board=make_board(8, [(2, 2)], (6, 6)), num_of_games=1)
+    for now in (100.0, 100.02, 100.05, 100.09, 100.1, 100.15, 100.21):
+        clock.now = now
+        gui.render(game)
+    # a frame every 0.1 seconds
+    assert len(drawn) == 3
+    game.state = config.GameState.GAME_OVER
+    gui.render(game)
+    assert len(drawn) == 4
@@ -0,0 +1,63 @@
+import os
+
+import pytest
+
+import assets
+import distances
+from planning import DistanceField
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(distances, 'CACHE_DIR', str(tmp_path))
+    distances.table_for.cache_clear()
+    yield tmp_path
+    distances.table_for.cache_clear()
+    assets.clear_cache()
+
+
+@pytest.mark.parametrize('wrap', [True, False])
+def test_table_matches_bfs(wrap):
+    size = 6
+    mask = assets.obstacle_mask({(1, 1), (1, 2), (1, 3), (4, 0), (4, 5)}, size)
+    table = distances.DistanceTable.compute(size, mask, wrap, chunk=7)
+    for goal in table.cells:
+        field = DistanceField(size, mask, int(goal), wrap)
+        for cell in range(size * size):
+            expected = None if mask >> cell & 1 else field.distance(cell)
+            assert table.distance(cell, int(goal)) == expected
+
+
+def test_unreachable_cells():
+    size = 5
+    mask = assets.obstacle_mask({(0, 1), (1, 0), (1, 1)}, size)
+    table = distances.DistanceTable.compute(size, mask, wrap=False)
+    assert table.distance(0, 24) is None
+    assert table.distance(0, 0) == 0
+    assert table.distance(6, 24) is None
+
+
+def test_random_boards_stay_in_memory(cache_dir):
+    mask = assets.obstacle_mask({(2, 2)}, 5)
+    table = distances.table_for(5, mask)
+    assert distances.table_for(5, mask) is table
+    assert os.listdir(cache_dir) == []
+
+
+def test_memory_cache_is_bounded(cache_dir):
+    for cell in range(distances.MAX_TABLES + 2):
+        distances.table_for(4, 1 << cell)
+    assert distances.table_for.cache_info().currsize == distances.MAX_TABLES
+
+
+def test_board_files_are_cached_on_disk(cache_dir, tmp_path):
+    board_file = tmp_path / 'board.txt'
+    board_file.write_text('0,x,0,0\n0,x,0,0\n0,0,0,0\n0,0,0,0\n')
+    layout = assets.board_layout(str(board_file))
+    table = distances.table_for(layout.size, layout.mask)
+    files = [name for name in os.listdir(cache_dir) if name.endswith('.npz')]
+    assert len(files) == 1
+    distances.table_for.cache_clear()
+    loaded = distances.table_for(layout.size, layout.mask)
+    assert loaded is not table
+    assert (loaded.dist == table.dist).all() and (loaded.cells == table.cells).all()
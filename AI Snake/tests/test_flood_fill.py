@@ -0,0 +1,41 @@
+import random
+
+import flood_fill
+from bitboard import SnakeState
+from config import Direction
+
+
+def test_flood_stays_in_the_space():
+    geo = flood_fill.geometry(4)
+    # a wall on the second column splits the board
+    space = geo.full & ~sum(1 << (i * 4 + 1) for i in range(4))
+    region = flood_fill.flood(1 << 0, space, geo)
+    assert region == sum(1 << (i * 4) for i in range(4))
+
+
+def test_nth_cell():
+    mask = 0b1011000
+    assert [flood_fill.nth_cell(mask, n) for n in range(3)] == [3, 4, 6]
+
+
+def test_incremental_region_matches_a_new_flood(make_board):
+    rand = random.Random(1)
+    obstacles = [(3, j) for j in range(2, 9)] + [(6, 5), (7, 5)]
+    state = SnakeState.from_board(make_board(10, [(1, 1), (1, 2), (1, 3), (1, 4)], (8, 8), obstacles=obstacles))
+    flood_fill.head_region(state)
+    for _ in range(200):
+        i, j = divmod(state.head, state.board_size)
+        moves = [move for move, (ni, nj) in ((Direction.UP, (i - 1, j)), (Direction.DOWN, (i + 1, j)),
+                                             (Direction.LEFT, (i, j - 1)), (Direction.RIGHT, (i, j + 1)))
+                 if 0 <= ni < 10 and 0 <= nj < 10 and state.is_free(ni, nj)]
+        if not moves:
+            break
+        state = state.advance(rand.choice(moves))
+        fresh = SnakeState(state.board_size, state.obstacle_mask, state.occupied, state.body, state.fruit)
+        assert flood_fill.head_region(state) == flood_fill.head_region(fresh)
+
+
+def test_dead_end_counts_unreachable_cells(make_board):
+    board = make_board(4, [(0, 0)], (3, 3), obstacles=[(1, 0), (0, 1)])
+    assert flood_fill.dead_end(board) == 16 - 3
+    assert flood_fill.dead_end(SnakeState.from_board(board)) == 16 - 3
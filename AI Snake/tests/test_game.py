@@ -0,0 +1,38 @@
+from config import Direction
+
+
+def free_cells(board):
+    size = board.board_size
+    return {(i, j) for i in range(size) for j in range(size)} - board.obstacles - set(board.snake)
+
+
+def test_free_cells_follow_the_snake(make_board):
+    board = make_board(6, [(2, 2), (2, 3), (2, 4)], obstacles={(0, 0), (5, 5)})
+    board.fruit_location = (2, 0)
+    for move in [Direction.LEFT, Direction.LEFT, Direction.LEFT, Direction.UP, Direction.UP, Direction.RIGHT]:
+        board.move(move)
+        board.step()
+        assert not board.collision
+        assert set(board.free.cells) == free_cells(board)
+        assert board.occupied == set(board.snake)
+    assert len(board.snake) == 4
+
+
+def test_spawn_fruit_on_a_free_cell(make_board):
+    board = make_board(4, [(1, 1), (1, 2), (2, 2)], obstacles={(0, 0), (3, 3)})
+    for _ in range(50):
+        board.spawn_fruit()
+        assert board.fruit_location in free_cells(board)
+
+
+def test_spawn_fruit_on_a_full_board(make_board):
+    board = make_board(2, [(0, 0), (0, 1), (1, 1), (1, 0)])
+    board.spawn_fruit()
+    assert board.fruit_location == ()
+
+
+def test_collision_with_the_body(make_board):
+    board = make_board(5, [(2, 2), (2, 3), (3, 3), (3, 2), (3, 1)])
+    board.move(Direction.DOWN)
+    board.step()
+    assert board.collision
@@ -0,0 +1,153 @@
+import random
+from collections import deque
+
+import pytest
+
+from agent import AStarAgent
+from bitboard import SnakeState
+from grid_search import Grid, bidirectional_bfs, jump_point_search, spacetime_search
+from heuristics import manhattan_cells, manhattan_distance, table_distance, weighed_compact_heuristics
+from planning import DIRECTIONS
+from utils import ClosedList
+
+
+def random_state(make_board, size=10):
+    obstacles = {(random.randrange(size), random.randrange(size)) for _ in range(size * size // 5)}
+    free = [(i, j) for i in range(size) for j in range(size) if (i, j) not in obstacles]
+    snake = [random.choice(free)]
+    for _ in range(random.randrange(1, 15)):
+        i, j = snake[-1]
+        di, dj = random.choice([(0, 1), (0, -1), (1, 0), (-1, 0)])
+        cell = ((i + di) % size, (j + dj) % size)
+        if cell not in snake and cell not in obstacles:
+            snake.append(cell)
+    fruit = random.choice([cell for cell in free if cell not in snake])
+    return SnakeState.from_board(make_board(size, snake, fruit, obstacles))
+
+
+def passable_distance(grid):
+    """
+    Breadth first search over the passable cells of the grid, the reference of the grid searches
+    """
+    distances = {grid.head: 0}
+    queue = deque([grid.head])
+    while queue:
+        cell = queue.popleft()
+        if cell == grid.goal:
+            return distances[cell]
+        for move in DIRECTIONS:
+            child = grid.step(cell, move)
+            if child not in distances and grid.passable(child):
+                distances[child] = distances[cell] + 1
+                queue.append(child)
+    return None
+
+
+def check_path(grid, state, path, follow):
+    cell = grid.head
+    for move in reversed(path):
+        cell = grid.step(cell, move)
+        assert cell >= 0, 'the path crosses a border'
+    assert follow(state, path).head == grid.goal
+
+
+@pytest.mark.parametrize('flag', [False, True])
+@pytest.mark.parametrize('seed', range(40))
+def test_grid_searches_find_shortest_paths(make_board, follow, flag, seed):
+    random.seed(seed)
+    state = random_state(make_board)
+    expected = passable_distance(Grid(state, flag))
+    path, expanded = bidirectional_bfs(Grid(state, flag))
+    if expected is None:
+        assert path == []
+    else:
+        assert len(path) == expected and expanded > 0
+        check_path(Grid(state, flag), state, path, follow)
+    path, _ = jump_point_search(Grid(state, flag))
+    if expected is None:
+        assert path == []
+    elif path:  # a path that crosses itself is dropped, the agent falls back to the bidirectional BFS
+        assert len(path) == expected
+        check_path(Grid(state, flag), state, path, follow)
+
+
+def test_passable_body_parts(make_board):
+    # the tail leaves its cell after one move, the part next to the head only after four
+    state = SnakeState.from_board(make_board(8, [(3, 3), (3, 4), (4, 4), (4, 3)], fruit=(6, 6)))
+    grid = Grid(state)
+    assert grid.passable(4 * 8 + 3)
+    assert not grid.passable(3 * 8 + 4)
+    assert grid.free_at(3 * 8 + 4, 3) and not grid.free_at(3 * 8 + 4, 2)
+
+
+def test_no_fruit(make_board):
+    state = SnakeState.from_board(make_board(5, [(1, 1)]))
+    assert bidirectional_bfs(Grid(state)) == ([], 0)
+    assert jump_point_search(Grid(state)) == ([], 0)
+
+
+def test_spacetime_waits_for_the_body(make_board, follow):
+    # every path is blocked by parts of the body the conservative grid searches keep as obstacles, the space-time
+    # search finds the path that gets to them after they moved away
+    snake = [(3, 1), (3, 2), (2, 2), (1, 2), (0, 2), (5, 2), (5, 1), (4, 1), (4, 2)]
+    walls = {(0, 4), (0, 5), (2, 3), (5, 4), (5, 5)}
+    state = SnakeState.from_board(make_board(6, snake, fruit=(4, 4), obstacles=walls))
+    assert bidirectional_bfs(Grid(state, True))[0] == []
+    for heuristic in (None, lambda cell, _: Grid(state, True).distance(cell, state.fruit)):
+        path, expanded = spacetime_search(Grid(state, True), ClosedList(), heuristic)
+        assert len(path) == 6 and expanded > 0
+        cell = state.head
+        for move in reversed(path):
+            cell = Grid(state, True).step(cell, move)
+            assert cell >= 0
+        assert follow(state, path).head == state.fruit
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_spacetime_paths_are_legal(make_board, follow, seed):
+    random.seed(seed)
+    state = random_state(make_board)
+    for heuristic in (None, manhattan_cells):
+        grid = Grid(state)
+        estimate = (lambda cell, _: heuristic(grid, cell)) if heuristic else None
+        path, _ = spacetime_search(grid, ClosedList(), estimate)
+        if path:
+            assert follow(state, path).head == state.fruit
+        elif heuristic is None:
+            assert passable_distance(Grid(state)) is None
+
+
+def test_spacetime_unreachable_fruit(make_board):
+    walls = {(0, 4), (1, 4), (2, 4), (3, 4), (4, 4), (4, 0), (4, 1), (4, 2), (4, 3)}
+    state = SnakeState.from_board(make_board(8, [(6, 6), (6, 5), (6, 4)], fruit=(1, 1), obstacles=walls))
+    path, expanded = spacetime_search(Grid(state, True), ClosedList())
+    assert path == [] and expanded > 0
+
+
+def test_spacetime_with_the_snake_heuristic(make_board, follow):
+    state = SnakeState.from_board(make_board(8, [(3, 3), (3, 4), (4, 4), (4, 5)], fruit=(7, 1)))
+    seen = []
+
+    def heuristic(cell, board):
+        assert board.head == cell
+        seen.append(len(board.body))
+        return Grid(board).distance(cell, board.fruit)
+
+    path, _ = spacetime_search(Grid(state), ClosedList(), heuristic, state=state)
+    assert follow(state, path).head == state.fruit
+    assert min(seen) == 4 and set(seen) <= {4, 5}
+
+
+def test_spacetime_deadline(make_board):
+    state = SnakeState.from_board(make_board(8, [(3, 3)], fruit=(7, 7)))
+    assert spacetime_search(Grid(state), ClosedList(), time_limit=0) == ([], 0)
+    agent = AStarAgent(manhattan_distance, spacetime=True, deadline=0)
+    move, = agent.search(make_board(8, [(3, 3)], fruit=(7, 7)), False)
+    assert move in DIRECTIONS
+
+
+@pytest.mark.parametrize('heu', [manhattan_distance, table_distance, weighed_compact_heuristics])
+def test_spacetime_agent_uses_its_heuristic(make_board, follow, heu):
+    board = make_board(10, [(2, 2), (2, 3), (3, 3), (3, 2)], fruit=(8, 8), obstacles={(5, 5), (5, 6), (6, 5)})
+    path = AStarAgent(heu, spacetime=True).search(board, False)
+    assert follow(SnakeState.from_board(board), path).head == 8 * 10 + 8
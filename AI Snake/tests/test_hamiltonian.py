@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+
+import display_engine
+from agent import HamiltonianAgent
+from game import Game
+from hamiltonian_cycle import Maze
+
+
+def make_maze(size, seed=0):
+    np.random.seed(seed)
+    maze = Maze(size)
+    maze.generate()
+    return maze
+
+
+@pytest.mark.parametrize('size', [2, 4, 8, 10, 16])
+def test_tour_is_a_hamiltonian_cycle(size):
+    maze = make_maze(size)
+    tour = maze.number_to_tour.tolist()
+    assert sorted(tour) == list(range(size * size))
+    for k, cell in enumerate(tour):
+        i, j = divmod(cell, size)
+        ni, nj = divmod(tour[(k + 1) % len(tour)], size)
+        assert abs(i - ni) + abs(j - nj) == 1
+    assert (maze.tour_to_number[maze.number_to_tour] == np.arange(size * size)).all()
+
+
+def test_tree_spans_the_nodes():
+    maze = make_maze(12)
+    assert maze.right.sum() + maze.down.sum() == maze.nodes_size * maze.nodes_size - 1
+
+
+def test_seed_reproduces_the_maze():
+    assert (make_maze(8, 3).number_to_tour == make_maze(8, 3).number_to_tour).all()
+
+
+def test_save_and_load(tmp_path):
+    maze = make_maze(8)
+    path = str(tmp_path / 'tour.npz')
+    maze.save(path)
+    loaded = Maze.load(path)
+    assert loaded.board_size == 8
+    assert (loaded.tour_to_number == maze.tour_to_number).all()
+    assert (loaded.number_to_tour == maze.number_to_tour).all()
+    assert (loaded.right == maze.right).all() and (loaded.down == maze.down).all()
+
+
+def test_path_distance():
+    maze = Maze(4)
+    assert maze.path_distance(2, 5) == 2
+    assert maze.path_distance(14, 1) == 2
+
+
+def test_agent_follows_the_board(make_board):
+    np.random.seed(0)
+    board = make_board(8, [(2, 2)])
+    board.spawn_fruit()
+    agent = HamiltonianAgent(8)
+    for _ in range(300):
+        move = agent.next_move(board)
+        assert move is not None
+        board.move(move)
+        fruit = board.fruit_location
+        board.step()
+        assert not board.collision
+        if board.snake[0] == fruit:
+            board.spawn_fruit()
+            if not board.fruit_location:
+                break
+        agent.sync(board)
+        size = board.board_size
+        assert [k for k, taken in enumerate(agent.occupied) if taken] == sorted(i * size + j for i, j in board.snake)
+    assert len(board.snake) > 10
+
+
+def test_agent_fills_an_empty_board():
+    np.random.seed(1)
+    game = Game(6, 0, HamiltonianAgent(6), display_engine.DefaultDisplayEngine, num_of_games=1, frame_rate=None,
+                verbose=False)
+    assert game.run() == 36
+
+
+def test_agent_tour_file(tmp_path):
+    np.random.seed(2)
+    path = str(tmp_path / 'tour.npz')
+    agent = HamiltonianAgent(8, tour_file=path)
+    assert HamiltonianAgent(8, tour_file=path).tour == agent.tour
+    with pytest.raises(ValueError):
+        HamiltonianAgent(10, tour_file=path)
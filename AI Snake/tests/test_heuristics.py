@@ -0,0 +1,38 @@
+from types import SimpleNamespace
+
+import pytest
+
+from agent import AStarAgent, State
+from bitboard import SnakeState
+from game import get_heuristic
+from grid_search import Grid
+from heuristics import manhattan_distance, table_cells, table_distance, weighed_compact_successors
+
+
+def test_manhattan_of_a_snake_state(make_board, monkeypatch):
+    board = make_board(10, [(2, 2), (2, 3), (2, 4), (3, 4)], (6, 7))
+    expected = manhattan_distance(SimpleNamespace(board=board))
+    assert expected == 4 + 5
+    state = SnakeState.from_board(board)
+    successors = [state.advance(move) for move in State(state, 0, None, []).legal_action()]
+    scores = weighed_compact_successors(successors)
+
+    def snake(_):
+        pytest.fail('the heuristic built the coordinates of the body')
+
+    monkeypatch.setattr(SnakeState, 'snake', property(snake))
+    assert manhattan_distance(State(state, 0, None, [])) == expected
+    assert weighed_compact_successors(successors) == scores
+
+
+def test_table_distance_of_a_board_with_borders(make_board, follow):
+    board = make_board(10, [(5, 0)], (5, 9), obstacles=[(4, 5), (5, 5), (6, 5)])
+    state = SnakeState.from_board(board)
+    heuristic = get_heuristic('distance', wrap=False)
+    assert get_heuristic('distance') is table_distance and table_distance(State(state, 0, None, [])) == 1
+    assert heuristic(State(state, 0, None, [])) == 9 + 4
+    assert table_cells(Grid(state, True), state.head) == 9 + 4 and table_cells(Grid(state), state.head) == 1
+    path = AStarAgent(heuristic).search(board, True)
+    assert len(path) == 13 and follow(state, path).snake[0] == (5, 9)
+    path = AStarAgent(heuristic, spacetime=True).search(board, True)
+    assert len(path) == 13
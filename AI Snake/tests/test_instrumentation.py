@@ -0,0 +1,68 @@
+import csv
+import json
+
+import pytest
+
+import agent as agent_module
+import bitboard
+import heuristics
+from agent import AStarAgent
+from heuristics import manhattan_distance
+from instrumentation import FIELDS, Instrumentation
+
+
+def test_records_and_restores(make_board, tmp_path):
+    board = make_board(8, [(2, 2), (2, 3)], fruit=(6, 5))
+    agent = AStarAgent(manhattan_distance)
+    originals = (agent_module.State.__init__, agent_module.State.legal_action, bitboard.SnakeState.advance)
+    with Instrumentation(agent) as instrumentation:
+        for _ in range(3):
+            board.move(agent.next_move(board))
+            board.step()
+        with pytest.raises(RuntimeError):
+            Instrumentation(agent).enable()
+    assert (agent_module.State.__init__, agent_module.State.legal_action, bitboard.SnakeState.advance) == originals
+    assert 'next_move' not in agent.__dict__ and agent.heuristic_function is manhattan_distance
+
+    first, second, _ = instrumentation.records
+    assert first['search_calls'] == 1 and second['search_calls'] == 0
+    assert first['states'] > 1 and first['heuristic_calls'] == first['states']
+    assert first['nodes_expanded'] == agent.nodes_expanded and first['fringe_peak'] > 0
+    totals = instrumentation.totals()
+    assert totals['move'] == 3 and totals['states'] == first['states']
+
+    instrumentation.save(str(tmp_path / 'moves.json'))
+    assert json.loads((tmp_path / 'moves.json').read_text()) == instrumentation.records
+    instrumentation.save(str(tmp_path / 'moves.csv'))
+    with open(tmp_path / 'moves.csv') as file:
+        rows = list(csv.DictReader(file))
+    assert len(rows) == 3 and tuple(rows[0]) == FIELDS
+
+
+def test_batched_heuristic_is_kept(make_board, monkeypatch):
+    calls = []
+    batched = heuristics.weighed_compact_successors
+
+    def counted(boards, weights):
+        calls.append(len(boards))
+        return batched(boards, weights)
+
+    monkeypatch.setattr(heuristics, 'weighed_compact_successors', counted)
+    heuristic = heuristics.make_weighed_compact_heuristics(heuristics.WEIGHTS)
+    board = make_board(8, [(2, 2), (2, 3), (2, 4)], fruit=(6, 5))
+    expected = AStarAgent(heuristic).search(board, False)
+    plain_calls = len(calls)
+    assert plain_calls > 0
+
+    agent = AStarAgent(heuristic)
+    with Instrumentation(agent) as instrumentation:
+        move = agent.next_move(board)
+    assert agent.moves + [move] == expected and len(calls) == 2 * plain_calls
+    assert instrumentation.records[0]['heuristic_calls'] >= plain_calls
+    with Instrumentation(agent):
+        assert agent.heuristic_function.successors is not heuristic.successors
+    agent = AStarAgent(manhattan_distance, spacetime=True)
+    with Instrumentation(agent) as instrumentation:
+        assert agent.heuristic_function.cells is not None
+        agent.next_move(board)
+    assert instrumentation.records[0]['heuristic_calls'] > 0 and instrumentation.records[0]['states'] == 0
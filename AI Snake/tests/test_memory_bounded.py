@@ -0,0 +1,69 @@
+import pytest
+
+import display_engine
+from agent import IterativeDeepeningAStarAgent
+from bitboard import SnakeState
+from game import Game, get_agent, get_heuristic
+
+SNAKE = [(2, 2), (2, 3), (2, 4), (3, 4)]
+WALL = [(4, 6), (5, 6), (6, 6)]
+
+
+@pytest.mark.parametrize('name', ['idastar', 'smastar'])
+@pytest.mark.parametrize('exact_states', [False, True])
+def test_shortest_path_without_a_node_limit(make_board, follow, name, exact_states):
+    board = make_board(10, SNAKE, (6, 7), obstacles=WALL)
+    shortest = get_agent('bfs').search(board, False)
+    path = get_agent(name, heu=get_heuristic('manhattan'), exact_states=exact_states).search(board, False)
+    assert len(path) == len(shortest)
+    assert follow(SnakeState.from_board(board), path).snake[0] == (6, 7)
+
+
+@pytest.mark.parametrize('name', ['idastar', 'smastar'])
+@pytest.mark.parametrize('max_nodes', [4, 16, 64])
+def test_valid_plan_with_a_node_limit(make_board, follow, name, max_nodes):
+    board = make_board(10, SNAKE, (6, 7), obstacles=WALL)
+    agent = get_agent(name, heu=get_heuristic('manhattan'), max_nodes=max_nodes)
+    path = agent.search(board, False)
+    assert path, 'a partial plan at least'
+    follow(SnakeState.from_board(board), path)
+
+
+def test_smastar_partial_plan_when_the_fruit_is_too_far(make_board, follow):
+    board = make_board(10, [(0, 0)], (5, 5))
+    path = get_agent('smastar', heu=get_heuristic('manhattan'), max_nodes=4).search(board, False)
+    assert 0 < len(path) < 4
+    head = follow(SnakeState.from_board(board), path).snake[0]
+    assert abs(head[0] - 5) + abs(head[1] - 5) == 10 - len(path)
+
+
+def test_idastar_skips_the_cells_of_its_branch(make_board):
+    board = make_board(12, [(0, 0)], (0, 5))
+    agent = get_agent('idastar', heu=lambda state: 0, max_nodes=1)
+    assert len(agent.search(board, False)) == 5
+    # the table holds the first state only, the branches of an iteration of bound g are the self avoiding walks of up
+    # to g moves
+    walks = [1, 4, 12, 36, 100, 284]
+    assert agent.nodes_expanded <= sum(sum(walks[:bound + 1]) for bound in range(6))
+
+
+def test_capped_idastar_game_ends(monkeypatch):
+    """
+    A node limit makes IDA* expand the states the table can't hold again on every path, every search returns the
+    partial plan to the closest state to the fruit after its expansion budget
+    """
+    budgets = []
+    search = IterativeDeepeningAStarAgent.search
+
+    def counted(agent, board, flag=False):
+        expanded = agent.nodes_expanded
+        path = search(agent, board, flag)
+        budgets.append(agent.nodes_expanded - expanded)
+        return path
+
+    monkeypatch.setattr(IterativeDeepeningAStarAgent, 'search', counted)
+    agent = get_agent('idastar', heu=get_heuristic('manhattan'), max_nodes=5)
+    game = Game(16, 1, agent, display_engine.DefaultDisplayEngine, num_of_games=1, frame_rate=None, verbose=False,
+                seed=1)
+    assert game.run() > 1
+    assert max(budgets) <= IterativeDeepeningAStarAgent.EXPANSIONS * 16 * 16 + 1
@@ -0,0 +1,112 @@
+from agent import AStarAgent, State
+from bitboard import SnakeState
+from heuristics import manhattan_distance
+from config import Direction
+from planning import DistanceField, PlanCache, escape_move, is_safe, tail_reachable
+
+
+def wrapped_distance(a, b, size):
+    return sum(min(abs(x - y), size - abs(x - y)) for x, y in zip(a, b))
+
+
+def test_distance_field_without_obstacles():
+    size = 7
+    field = DistanceField(size, 0, 3 * size + 4)
+    for i in range(size):
+        for j in range(size):
+            assert field.distance(i * size + j) == wrapped_distance((i, j), (3, 4), size)
+
+
+def test_distance_field_unreachable(make_board):
+    walls = {(0, 1), (1, 0), (1, 1)}
+    state = SnakeState.from_board(make_board(5, [(3, 3)], fruit=(0, 0), obstacles=walls))
+    field = DistanceField(5, state.obstacle_mask, state.fruit, wrap=False)
+    assert field.distance(state.head) is None
+    assert field.distance(0) == 0
+
+
+def test_field_is_kept_until_the_fruit_changes(make_board):
+    cache = PlanCache()
+    state = SnakeState.from_board(make_board(8, [(2, 2), (2, 3)], fruit=(6, 6)))
+    field = cache.field(state)
+    assert cache.field(state.advance(next(iter(State(state, 0, None, []).legal_action())))) is field
+    moved = SnakeState.from_board(make_board(8, [(2, 2), (2, 3)], fruit=(1, 6)))
+    assert cache.field(moved) is not field
+    assert cache.field(moved).goal == moved.fruit
+
+
+def test_descend_is_a_valid_shortest_path(make_board, follow):
+    body = [(5, 5), (5, 6), (5, 7), (4, 7), (3, 7)]
+    state = SnakeState.from_board(make_board(10, body, fruit=(5, 1)))
+    moves = PlanCache().descend(state)
+    assert PlanCache.is_valid(state, moves)
+    assert len(moves) == wrapped_distance((5, 5), (5, 1), 10)
+    assert follow(state, moves).head == state.fruit
+    # every shortest path to (5, 9) goes through the body
+    assert PlanCache().descend(SnakeState.from_board(make_board(10, body, fruit=(5, 9)))) == []
+
+
+def test_is_valid_rejects_plans_into_the_body(make_board):
+    state = SnakeState.from_board(make_board(6, [(2, 2), (2, 3), (3, 3), (3, 2)], fruit=(2, 4)))
+    assert not PlanCache.is_valid(state, [])
+    plan = AStarAgent(manhattan_distance).search(make_board(6, [(2, 2), (2, 3), (3, 3), (3, 2)], fruit=(2, 4)), False)
+    assert PlanCache.is_valid(state, plan)
+    assert not PlanCache.is_valid(state, plan[1:])
+
+
+def test_cached_agent_reaches_the_fruits(make_board):
+    board = make_board(10, [(0, 0)], fruit=(7, 3), obstacles={(4, 3), (4, 4), (4, 2)})
+    agent = AStarAgent(manhattan_distance, plan_cache=True)
+    for fruit in [(7, 3), (2, 8), (9, 9)]:
+        board.restore(list(board.snake), fruit)
+        for _ in range(2 * board.board_size):
+            move = agent.next_move(board)
+            assert move is not None
+            board.move(move)
+            board.step()
+            assert not board.collision and board.snake[0] not in board.obstacles
+            if board.snake[0] == fruit:
+                break
+        assert board.snake[0] == fruit
+
+
+def test_tail_reachable(make_board):
+    # the head is walled in by the body and the obstacles, away from the tail
+    walls = {(0, 2), (1, 3), (2, 2)}
+    trapped = SnakeState.from_board(make_board(5, [(1, 2), (1, 1), (2, 1), (3, 1), (3, 2)], obstacles=walls))
+    assert not tail_reachable(trapped, flag=True)
+    free = SnakeState.from_board(make_board(5, [(1, 2), (1, 1), (2, 1), (3, 1), (3, 2)]))
+    assert tail_reachable(free, flag=True)
+
+
+def test_is_safe_follows_a_copy(make_board):
+    state = SnakeState.from_board(make_board(5, [(1, 2), (1, 1), (2, 1)], fruit=(1, 4), obstacles={(0, 3), (2, 3)}))
+    body = state.body
+    assert is_safe(state, [Direction.RIGHT, Direction.RIGHT], flag=True)
+    assert state.body == body
+
+
+def test_escape_move_keeps_the_tail_reachable(make_board):
+    walls = {(0, 2), (1, 3), (2, 3)}
+    state = SnakeState.from_board(make_board(5, [(1, 2), (1, 1), (2, 1), (3, 1), (3, 2)], obstacles=walls))
+    move = escape_move(state, flag=True)
+    assert move == Direction.DOWN
+    assert tail_reachable(state.advance(move), flag=True)
+    boxed = SnakeState.from_board(make_board(3, [(1, 1)], obstacles={(0, 1), (1, 0), (1, 2), (2, 1)}))
+    assert escape_move(boxed) is None
+
+
+def test_safe_agent_survives(make_board):
+    board = make_board(8, [(3, 3)], obstacles={(5, 1), (5, 2), (5, 3)})
+    board.spawn_fruit()
+    agent = AStarAgent(manhattan_distance, safe=True)
+    for _ in range(300):
+        move = agent.next_move(board)
+        assert move is not None
+        board.move(move)
+        fruit = board.fruit_location
+        board.step()
+        assert not board.collision and board.snake[0] not in board.obstacles
+        if board.snake[0] == fruit:
+            board.spawn_fruit()
+    assert len(board.snake) > 5
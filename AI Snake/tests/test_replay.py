@@ -0,0 +1,66 @@
+from functools import partial
+
+import pytest
+
+import display_engine
+import replay
+from game import Game, get_agent, get_heuristic
+from replay import Replay, render
+
+
+class TickRecorder(display_engine.DisplayEngine):
+    """
+    A display that keeps the board of every tick of a game
+    """
+    ticks = []
+
+    def render(self, game):
+        size = game.board.board_size
+        fruit = game.board.fruit_location
+        TickRecorder.ticks.append(([i * size + j for i, j in game.board.snake], fruit[0] * size + fruit[1] if fruit
+                                   else -1, game.iterations))
+
+
+@pytest.fixture(params=[8, 256])
+def recorded_game(request, tmp_path, monkeypatch):
+    monkeypatch.setattr(replay, 'Recorder', partial(replay.Recorder, interval=request.param))
+    TickRecorder.ticks = []
+    path = str(tmp_path / 'game.replay')
+    game = Game(8, 0.2, get_agent('astar', heu=get_heuristic('manhattan')), TickRecorder, num_of_games=1,
+                frame_rate=None, verbose=False, seed=11)
+    score = game.run(replay_file=path)
+    return Replay(path), TickRecorder.ticks[:-1], score
+
+
+def test_every_tick_is_rebuilt(recorded_game):
+    recorded, ticks, score = recorded_game
+    assert recorded.num_of_moves == len(ticks) and recorded.seed == 11 and recorded.board_size == 8
+    assert recorded.state(0) == ([2 * 8 + 2], recorded.fruit(0), 0)
+    for tick, (snake, fruit, iterations) in enumerate(ticks, 1):
+        assert recorded.state(tick) == (snake, fruit, iterations)
+    assert len(recorded.board(recorded.num_of_moves).snake) == score
+    with pytest.raises(IndexError):
+        recorded.state(recorded.num_of_moves + 1)
+
+
+def test_snapshots_and_moves(recorded_game):
+    recorded, _, _ = recorded_game
+    assert recorded.snapshot_ticks == list(range(0, recorded.num_of_moves + 1, recorded.interval))
+    for tick in range(recorded.num_of_moves):
+        board = recorded.board(tick)
+        board.move(recorded.move(tick))
+        board.step()
+        assert [i * 8 + j for i, j in board.snake] == recorded.state(tick + 1)[0]
+
+
+def test_render(recorded_game):
+    recorded, _, _ = recorded_game
+    text = render(recorded.board(0)).split('\n')
+    assert len(text) == 8 and text[2][2] == 'H'
+
+
+def test_not_a_replay(tmp_path):
+    path = tmp_path / 'other.replay'
+    path.write_bytes(b'nope')
+    with pytest.raises(ValueError):
+        Replay(str(path))
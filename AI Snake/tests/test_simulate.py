@@ -0,0 +1,13 @@
+from simulate import play_game
+
+
+def task(**options):
+    return dict({'game': 0, 'seed': 7, 'agent': 'astar', 'heu': 'manhattan', 'board_size': 8, 'obstacle_chance': 0.2,
+                 'border': 0, 'board_file': None}, **options)
+
+
+def test_seeded_games_are_reproducible():
+    first, second = play_game(task()), play_game(task())
+    assert first['score'] == second['score'] and first['steps'] == second['steps']
+    assert first['nodes_expanded'] == second['nodes_expanded']
+    assert first['score'] >= 1
@@ -0,0 +1,85 @@
+import json
+
+import game
+import tune
+from tune import Tuner, cache_key, load_cache, open_cache
+
+
+class FakePool:
+    """
+    A pool that plays the games in the calling process, in order
+    """
+
+    def __init__(self):
+        self.tasks = []
+
+    def map(self, function, tasks):
+        self.tasks += tasks
+        return [function(task) for task in tasks]
+
+    def imap_unordered(self, function, tasks):
+        return iter(self.map(function, list(tasks)))
+
+
+def fake_game(task):
+    return dict(task, score=int(10 * sum(task['weights'])) + task['seed'])
+
+
+def make_tuner(pool, cache=None, cache_file=None):
+    return Tuner([0, 1], 4, 0, pool, cache, cache_file)
+
+
+def test_results_are_appended_and_read_back(tmp_path, monkeypatch):
+    monkeypatch.setattr(tune, 'play_game', fake_game)
+    path = tmp_path / 'cache.jsonl'
+    pool = FakePool()
+    with open_cache(str(path)) as cache_file:
+        tuner = make_tuner(pool, load_cache(str(path)), cache_file)
+        assert tuner.evaluate([(1.0, 0.0, 0.0, 0.0), (0.5, 0.5, 0.0, 0.0)]) == [10.5 / 16, 10.5 / 16]
+    assert tuner.games_played == len(pool.tasks) == 4
+    lines = path.read_text().splitlines()
+    assert len(lines) == 4 and json.loads(lines[0])['score'] == 10
+    assert load_cache(str(path)) == {cache_key(task['weights'], task['seed'], 4, 0): fake_game(task)['score']
+                                     for task in pool.tasks}
+
+
+def test_resume_skips_the_cached_games(tmp_path, monkeypatch):
+    monkeypatch.setattr(tune, 'play_game', fake_game)
+    path = tmp_path / 'cache.jsonl'
+    with open_cache(str(path)) as cache_file:
+        first = make_tuner(FakePool(), {}, cache_file).evaluate([(1.0, 0.0, 0.0, 0.0)])
+        cache_file.write('{"weights": [2.0, 0.0')  # the last line of an interrupted run
+    pool = FakePool()
+    with open_cache(str(path)) as cache_file:
+        tuner = make_tuner(pool, load_cache(str(path)), cache_file)
+        assert tuner.evaluate([(1.0, 0.0, 0.0, 0.0)]) == first
+        assert tuner.games_played == 0 and pool.tasks == []
+        tuner.evaluate([(1.0, 0.0, 0.0, 0.0), (2.0, 0.0, 0.0, 0.0)])
+    assert [task['weights'] for task in pool.tasks] == [[2.0, 0.0, 0.0, 0.0]] * 2
+    assert len(load_cache(str(path))) == 4
+
+
+def test_search_resumes_from_the_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(tune, 'play_game', fake_game)
+    path = tmp_path / 'cache.jsonl'
+    with open_cache(str(path)) as cache_file:
+        best = make_tuner(FakePool(), {}, cache_file).search(2, 3, 1.0, log=None)
+    pool = FakePool()
+    assert make_tuner(pool, load_cache(str(path))).search(2, 3, 1.0, log=None) == best
+    assert pool.tasks == []
+
+
+def test_weights_file_reaches_the_heuristic(tmp_path, monkeypatch):
+    path = tmp_path / 'weights.json'
+    path.write_text(json.dumps({'weights': [1.5, 0.0, 2.0, 0.25], 'coverage': 0.5}))
+    loaded = []
+    make = game.make_weighed_compact_heuristics
+
+    def spy(weights):
+        loaded.append(weights)
+        return make(weights)
+
+    monkeypatch.setattr(game, 'make_weighed_compact_heuristics', spy)
+    heuristic = game.get_heuristic('weighted-compact', str(path))
+    assert loaded == [(1.5, 0.0, 2.0, 0.25)] and callable(heuristic.successors)
+    assert game.get_heuristic('weighted-compact') is game.weighed_compact_heuristics and len(loaded) == 1
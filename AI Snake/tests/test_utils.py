@@ -0,0 +1,61 @@
+import random
+
+import pytest
+
+from utils import BucketGrid, ClosedList, FreeCells
+
+
+def test_closed_list_keeps_the_lowest_cost():
+    closed = ClosedList()
+    assert closed.close('a', 3)
+    assert not closed.close('a', 3)
+    assert not closed.close('a', 4)
+    assert closed.is_closed('a', 5) and not closed.is_closed('a', 2)
+    assert closed.close('a', 2)
+    assert 'a' in closed and 'b' not in closed and len(closed) == 1
+
+
+def test_free_cells_match_a_set():
+    free, reference = FreeCells(), set()
+    for _ in range(2000):
+        cell = (random.randrange(6), random.randrange(6))
+        if random.random() < 0.5:
+            free.add(cell)
+            reference.add(cell)
+        else:
+            free.remove(cell)
+            reference.discard(cell)
+        assert len(free) == len(reference)
+        assert set(free.cells) == reference
+        assert all(free.cells[index] == cell for cell, index in free.position.items())
+    sample = free.sample()
+    assert sample in reference if reference else sample is None
+
+
+def test_free_cells_sample():
+    assert FreeCells().sample() is None
+    free = FreeCells([(0, 0), (0, 1), (1, 1)])
+    free.remove((0, 1))
+    assert {free.sample() for _ in range(100)} == {(0, 0), (1, 1)}
+
+
+@pytest.mark.parametrize('size, bucket_size, wrap', [(10, 4, True), (10, 4, False), (16, 4, True), (7, 3, True),
+                                                     (7, 2, False), (5, 8, True)])
+def test_bucket_grid_nearest(size, bucket_size, wrap):
+    grid = BucketGrid(size, bucket_size, wrap)
+    cells = set()
+    assert grid.nearest((0, 0)) == (None, None)
+    for _ in range(300):
+        cell = (random.randrange(size), random.randrange(size))
+        if random.random() < 0.3 and cells:
+            removed = random.choice(sorted(cells))
+            grid.remove(removed)
+            cells.discard(removed)
+        else:
+            grid.add(cell)
+            cells.add(cell)
+        assert len(grid) == len(cells)
+        query = (random.randrange(size), random.randrange(size))
+        best, distance = grid.nearest(query)
+        assert best in cells
+        assert distance == grid.distance(query, best) == min(grid.distance(query, other) for other in cells)
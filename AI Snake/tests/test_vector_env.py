@@ -0,0 +1,90 @@
+import numpy as np
+
+from config import Direction
+from game import Board
+from vector_env import DIRECTIONS, NO_MOVE, STARVATION, VectorEnv, greedy_policy
+
+
+def test_games_follow_board_step():
+    env = VectorEnv.from_seeds(8, 0.3, list(range(16)))
+    observation = env.reset()
+    boards = []
+    for k in range(env.num_of_games):
+        board = Board(8, 0, obstacles=env.obstacle_set(k))
+        board.spawn_snake(2, 2, 1)
+        boards.append(board)
+    rng = np.random.default_rng(0)
+    for _ in range(150):
+        actions = greedy_policy(observation)
+        # some random moves, to run into the obstacles and the bodies too
+        explore = rng.random(len(actions)) < 0.2
+        actions[explore] = rng.integers(0, 4, explore.sum())
+        expected = env.alive.copy()
+        for k in np.flatnonzero(env.alive):
+            board = boards[k]
+            board.fruit_location = env.board_view(k).fruit_location
+            if actions[k] == NO_MOVE:
+                expected[k] = False
+                continue
+            board.move(DIRECTIONS[actions[k]])
+            board.step()
+            expected[k] = not (board.collision or board.snake[0] in board.obstacles)
+        observation = env.step(actions)
+        assert (env.alive == expected).all()
+        for k in np.flatnonzero(env.alive):
+            assert env.board_view(k).snake == list(boards[k].snake)
+            assert env.length[k] == len(boards[k].snake)
+        if not env.alive.any():
+            break
+
+
+def test_fruits_are_spawned_on_free_cells():
+    env = VectorEnv.from_seeds(6, 0.5, list(range(32)))
+    observation = env.reset()
+    for _ in range(50):
+        for k in np.flatnonzero(env.alive):
+            assert env.free_cells()[k, env.fruit[k]]
+        observation = env.step(greedy_policy(observation))
+
+
+def test_head_can_follow_the_tail():
+    env = VectorEnv([Board(4, 0, obstacles=set())], np.random.default_rng(0))
+    env.reset(0, 0)
+    env.fruit[:] = -1
+    env.age[0, :] = 0
+    # a snake of length 4 on the square (0, 0) (0, 1) (1, 1) (1, 0), the head at (0, 0)
+    for cell, age in zip([0, 1, 5, 4], [4, 3, 2, 1]):
+        env.age[0, cell] = age
+    env.length[:] = 4
+    down = DIRECTIONS.index(Direction.DOWN)
+    env.step([down])
+    assert env.alive[0] and env.head[0] == 4
+
+
+def test_starvation():
+    env = VectorEnv([Board(4, 0, obstacles=set())], np.random.default_rng(0))
+    env.reset()
+    env.fruit[:] = -1
+    right = DIRECTIONS.index(Direction.RIGHT)
+    for _ in range(STARVATION):
+        env.step([right])
+    assert env.alive[0]
+    env.step([right])
+    assert not env.alive[0]
+
+
+def test_filling_the_board_wins():
+    env = VectorEnv([Board(2, 0, obstacles=set())], np.random.default_rng(0))
+    observation = env.reset(0, 0)
+    for _ in range(100):
+        if not env.alive.any():
+            break
+        observation = env.step(greedy_policy(observation))
+    assert env.won[0] and env.length[0] == 4 and not env.alive[0]
+
+
+def test_no_move_ends_the_game():
+    env = VectorEnv.from_seeds(5, 0, [0, 1])
+    env.reset()
+    env.step([NO_MOVE, 0])
+    assert list(env.alive) == [False, True]
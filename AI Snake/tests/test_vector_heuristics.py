@@ -0,0 +1,59 @@
+import random
+
+import pytest
+
+import heuristics
+import utils
+import vector_heuristics
+from agent import AStarAgent, State
+from bitboard import SnakeState
+
+
+def random_boards(count, size=10):
+    boards = []
+    for _ in range(count):
+        body = [(random.randrange(size), random.randrange(size))]
+        for _ in range(random.randrange(12)):
+            i, j = body[-1]
+            di, dj = random.choice([(0, 1), (0, -1), (1, 0), (-1, 0)])
+            cell = ((i + di) % size, (j + dj) % size)
+            if cell not in body:
+                body.append(cell)
+        boards.append((size, body))
+    return boards
+
+
+@pytest.mark.parametrize('size, body', random_boards(30))
+def test_shape_features_match_utils(make_board, size, body):
+    board = make_board(size, body)
+    state = SnakeState.from_board(board)
+    for view in (board, state):
+        assert vector_heuristics.squareness(view) == utils.squareness(body)
+        assert vector_heuristics.compactness(view) == utils.compactness(body)
+
+
+def test_batch_shape_features(make_board):
+    states = [SnakeState.from_board(make_board(size, body)) for size, body in random_boards(20)]
+    squareness, compactness = vector_heuristics.batch_shape_features(states)
+    assert list(squareness) == [vector_heuristics.squareness(state) for state in states]
+    assert list(compactness) == [vector_heuristics.compactness(state) for state in states]
+
+
+def test_successors_match_heuristic(make_board):
+    root = SnakeState.from_board(make_board(10, [(4, 4), (4, 5), (5, 5)], fruit=(1, 2)))
+    boards = [root.advance(move) for move in State(root, 0, None, []).legal_action()]
+    random.seed(3)
+    batched = heuristics.weighed_compact_successors(boards)
+    random.seed(3)
+    assert batched == [heuristics.weighed_compact_heuristics(State(board, 1, None, [])) for board in boards]
+
+
+def test_astar_uses_batched_successors(make_board):
+    board = make_board(10, [(4, 4), (4, 5), (5, 5), (5, 6)], fruit=(8, 1))
+    heuristic = heuristics.make_weighed_compact_heuristics(heuristics.WEIGHTS)
+    assert callable(heuristic.successors)
+    paths = []
+    for function in (heuristic, lambda state: heuristic(state)):
+        random.seed(5)
+        paths.append(AStarAgent(function).search(board, False))
+    assert paths[0] == paths[1] and paths[0]
@@ -0,0 +1,193 @@
+"""
+Tuning of the weights of heuristics.weighed_compact_heuristics.
+A random search around the best weights found so far: every round draws new candidate weight vectors with gaussian
+steps, plays headless A* games with every candidate on a fixed set of seeds across a pool of processes, and keeps the
+candidate with the best average board coverage. The step shrinks after rounds without an improvement.
+The result of every (weights, seed) game is appended to a cache file as soon as it ends, and the candidates are drawn
+from a seeded generator, so an interrupted run started again with the same options replays its rounds from the cache
+and only plays the missing games.
+
+USAGE: python3 tune.py -o weights.json --cache tune_cache.jsonl
+       python3 game.py --heu weighted-compact --weights-file weights.json
+"""
+import json
+import multiprocessing
+import os
+import random
+import sys
+from optparse import OptionParser
+
+import numpy as np
+
+import display_engine
+from agent import AStarAgent
+from game import Game
+from heuristics import WEIGHTS, make_weighed_compact_heuristics
+
+
+def cache_key(weights, seed, board_size, obstacle_chance):
+    return tuple(weights), seed, board_size, obstacle_chance
+
+
+def load_cache(file_name):
+    """
+    Loading the results of the games of previous runs
+    :param file_name: The JSON lines cache file
+    :return: A dictionary from the key of a game to its score
+    """
+    cache = {}
+    if file_name and os.path.exists(file_name):
+        with open(file_name) as file:
+            for line in file:
+                if not line.strip():
+                    continue
+                try:
+                    result = json.loads(line)
+                except json.JSONDecodeError:  # the last line of an interrupted run
+                    continue
+                key = cache_key(result['weights'], result['seed'], result['board_size'], result['obstacle_chance'])
+                cache[key] = result['score']
+    return cache
+
+
+def open_cache(file_name):
+    """
+    Opening the cache file to append the results of new games to
+    :param file_name: The JSON lines cache file
+    :return: The open file, the partial last line of an interrupted run ended so the next result is on its own line
+    """
+    cache_file = open(file_name, 'a+')
+    if cache_file.tell():
+        cache_file.seek(cache_file.tell() - 1)
+        if cache_file.read(1) != '\n':
+            cache_file.write('\n')
+    return cache_file
+
+
+def play_game(task):
+    """
+    Play a single headless game of the A* agent with weighed_compact_heuristics
+    :param task: A dictionary with the weights, the seed and the board of the game
+    :return: The task with the score of the game
+    """
+    random.seed(task['seed'])
+    np.random.seed(task['seed'])
+    agent = AStarAgent(make_weighed_compact_heuristics(task['weights']))
+    game = Game(task['board_size'], task['obstacle_chance'], agent, display_engine.DefaultDisplayEngine,
+                num_of_games=1, frame_rate=None, verbose=False)
+    return dict(task, score=game.run())
+
+
+class Tuner:
+    def __init__(self, seeds, board_size, obstacle_chance, pool, cache=None, cache_file=None):
+        """
+        :param seeds: The seeds of the games every candidate is evaluated on
+        :param board_size: The size of the board
+        :param obstacle_chance: Chance to spawn obstacles in the board
+        :param pool: A multiprocessing pool to play the games in
+        :param cache: The scores of the games that were already played
+        :param cache_file: An open text file to append the results of new games to
+        """
+        self.seeds = seeds
+        self.board_size = board_size
+        self.obstacle_chance = obstacle_chance
+        self.pool = pool
+        self.cache = cache if cache is not None else {}
+        self.cache_file = cache_file
+        self.games_played = 0
+
+    def evaluate(self, candidates):
+        """
+        Evaluate weight vectors, playing only the games that are not in the cache
+        :param candidates: A list of weight vectors
+        :return: A list of the average board coverage of every candidate
+        """
+        tasks = []
+        for weights in candidates:
+            for seed in self.seeds:
+                key = cache_key(weights, seed, self.board_size, self.obstacle_chance)
+                if key not in self.cache:
+                    self.cache[key] = None
+                    tasks.append({'weights': list(weights), 'seed': seed, 'board_size': self.board_size,
+                                  'obstacle_chance': self.obstacle_chance})
+        for result in self.pool.imap_unordered(play_game, tasks):
+            key = cache_key(result['weights'], result['seed'], self.board_size, self.obstacle_chance)
+            self.cache[key] = result['score']
+            self.games_played += 1
+            if self.cache_file:
+                self.cache_file.write(json.dumps(result) + '\n')
+                self.cache_file.flush()
+        cells = self.board_size * self.board_size
+        return [sum(self.cache[cache_key(weights, seed, self.board_size, self.obstacle_chance)]
+                    for seed in self.seeds) / (len(self.seeds) * cells) for weights in candidates]
+
+    def search(self, rounds, population, step, seed=0, start=WEIGHTS, log=sys.stderr):
+        """
+        Random search of the weights
+        :param rounds: The number of rounds
+        :param population: The number of candidates of every round
+        :param step: The initial standard deviation of the gaussian steps
+        :param seed: The seed of the candidates
+        :param start: The weights to start from
+        :return: A tuple of (best weights, best average coverage)
+        """
+        rng = np.random.default_rng(seed)
+        best = tuple(float(w) for w in start)
+        best_fitness = self.evaluate([best])[0]
+        print(f'start {best}: {best_fitness:.4f}', file=log)
+        for i in range(rounds):
+            # rounded, so the candidates of a resumed run are the same keys of the cache
+            steps = rng.normal(0, step, (population, len(best)))
+            candidates = [tuple(round(float(w), 2) for w in np.maximum(np.array(best) + s, 0)) for s in steps]
+            fitness = self.evaluate(candidates)
+            winner = int(np.argmax(fitness))
+            if fitness[winner] > best_fitness:
+                best, best_fitness = candidates[winner], fitness[winner]
+            else:
+                step /= 2
+            print(f'round {i + 1}/{rounds} best {best}: {best_fitness:.4f} (step {step:.3g}, '
+                  f'{self.games_played} games played)', file=log)
+        return best, best_fitness
+
+
+def main():
+    usage_str = """USAGE:python3 tune.py <options>"""
+    parser = OptionParser(usage_str)
+    parser.add_option('-o', '--output', help='The weights file to write', default='weights.json')
+    parser.add_option('--cache', help='JSON lines file of the played games, to resume interrupted runs',
+                      default='tune_cache.jsonl')
+    parser.add_option('-r', '--rounds', help='Number of rounds of the search', default=10, type=int)
+    parser.add_option('-p', '--population', help='Number of candidates of every round', default=8, type=int)
+    parser.add_option('--step', help='The initial standard deviation of the steps', default=1.0, type=float)
+    parser.add_option('--games', help='Number of seeded games per candidate', default=8, type=int)
+    parser.add_option('--seed', help='Seed of the first game and of the search', default=0, type=int)
+    parser.add_option('-s', '--size', dest='board_size', help='The size of the board', default=8, type=int)
+    parser.add_option('--obstacle-chance', help='Chance to spawn obstacles in the board', default=0.2, type=float)
+    parser.add_option('-j', '--workers', help='Number of worker processes (default: number of CPUs)', type=int)
+    args, _ = parser.parse_args()
+
+    seeds = list(range(args.seed, args.seed + args.games))
+    cache = load_cache(args.cache)
+    cache_file = open_cache(args.cache) if args.cache else None
+    try:
+        with multiprocessing.Pool(args.workers) as pool:
+            tuner = Tuner(seeds, args.board_size, args.obstacle_chance, pool, cache, cache_file)
+            weights, fitness = tuner.search(args.rounds, args.population, args.step, args.seed)
+    finally:
+        if cache_file:
+            cache_file.close()
+
+    with open(args.output, 'w') as file:
+        json.dump({
+            'weights': list(weights),
+            'coverage': fitness,
+            'board_size': args.board_size,
+            'obstacle_chance': args.obstacle_chance,
+            'seeds': seeds,
+        }, file, indent=2)
+    print(f'Best weights {weights} with average board coverage {fitness * 100: 0.2f}%, written to {args.output}',
+          file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,8 @@
 import heapq
 import random
+from collections import deque
+
+import flood_fill
 
 """
 Heuristics functions
@@ -47,68 +50,17 @@ def compactness(snake):
 
 
 def connectivity(board):
-    snake = board.snake
-    empty_cells = []
-    for i in range(board.board_size):
-        for j in range(board.board_size):
-            if (i, j) not in board.obstacles and (i, j) not in snake:
-                empty_cells.append((i, j))
-    if len(empty_cells) > 1:
-        rand_field = empty_cells[random.randint(0, len(empty_cells) - 1)]
-    else:
-        return 0
-    reached = [rand_field]
-    empty_cells.remove(rand_field)
-
-    while len(reached) > 0:
-        curr_field = reached[0]
-        reached.remove(curr_field)
-        up, down, right, left = (curr_field[0], curr_field[1] + 1), (curr_field[0], curr_field[1] - 1), (
-            curr_field[0] + 1, curr_field[1]), (curr_field[0] - 1, curr_field[1])
-        if up in empty_cells:
-            empty_cells.remove(up)
-            reached.append(up)
-        if down in empty_cells:
-            empty_cells.remove(down)
-            reached.append(down)
-        if right in empty_cells:
-            empty_cells.remove(right)
-            reached.append(right)
-        if left in empty_cells:
-            empty_cells.remove(left)
-            reached.append(left)
-    return len(empty_cells)
+    """
+    The number of empty cells that are not connected to a random empty cell
+    """
+    return flood_fill.connectivity(board, random)
 
 
 def dead_end(board):
-    snake = board.snake
-    empty_cells = []
-    for i in range(board.board_size):
-        for j in range(board.board_size):
-            if (i, j) not in board.obstacles and (i, j) not in snake:
-                empty_cells.append((i, j))
-    snake_head = snake[0]
-    reached = [snake_head]
-
-    while len(reached) > 0:
-        curr_field = reached[0]
-        reached.remove(curr_field)
-        up, down, right, left = (curr_field[0], curr_field[1] + 1), (curr_field[0], curr_field[1] - 1), (
-            curr_field[0] + 1, curr_field[1]), (curr_field[0] - 1, curr_field[1])
-
-        if up in empty_cells:
-            empty_cells.remove(up)
-            reached.append(up)
-        if down in empty_cells:
-            empty_cells.remove(down)
-            reached.append(down)
-        if right in empty_cells:
-            empty_cells.remove(right)
-            reached.append(right)
-        if left in empty_cells:
-            empty_cells.remove(left)
-            reached.append(left)
-    return len(empty_cells)
+    """
+    The number of empty cells that can't be reached from the snake's head
+    """
+    return flood_fill.dead_end(board)
 
 
 """
@@ -157,22 +109,22 @@ class Queue:
     """
 
     def __init__(self):
-        self.queue = []
+        self.queue = deque()
 
     def push(self, item):
         """
-        Adding an element to the start of the list
+        Adding an element to the end of the queue
         :param item: The item we want to add
         :return:
         """
-        self.queue.insert(0, item)
+        self.queue.append(item)
 
     def pop(self):
         """
         Dequeue the first element added to the queue and removing it
         :return: The dequeued element
         """
-        return self.queue.pop()
+        return self.queue.popleft()
 
     def is_empty(self):
         """
@@ -237,6 +189,192 @@ class PriorityQueueWithFunction(PriorityQueue):
         PriorityQueue.push(self, item, self.priorityFunction(item))
 
 
+class ClosedList:
+    """
+    The closed list of a search: a hash map from the key of every expanded state to the lowest cost (g) it was
+    reached with, so membership checks are O(1) and a state is expanded again only through a cheaper path
+    """
+
+    def __init__(self):
+        self.best_g = {}
+
+    def close(self, key, g):
+        """
+        Mark a state as expanded
+        :param key: The hashable key of the state
+        :param g: The cost of the path to the state
+        :return: True if the state should be expanded, False if it was already expanded with a lower or equal cost
+        """
+        if self.is_closed(key, g):
+            return False
+        self.best_g[key] = g
+        return True
+
+    def is_closed(self, key, g):
+        """
+        Check if a state was already expanded with a lower or equal cost
+        :param key: The hashable key of the state
+        :param g: The cost of the path to the state
+        :return: True if a path that is not more expensive was already expanded, False otherwise
+        """
+        best = self.best_g.get(key)
+        return best is not None and best <= g
+
+    def __contains__(self, key):
+        return key in self.best_g
+
+    def __len__(self):
+        return len(self.best_g)
+
+
+class FreeCells:
+    """
+    The free cells of a board: an array of the cells and the position of every cell in it. A cell is removed by moving
+    the last cell of the array to its place, so adding and removing a cell and drawing a uniformly random free cell
+    are all O(1)
+    """
+
+    def __init__(self, cells=()):
+        self.cells = []
+        self.position = {}
+        for cell in cells:
+            self.add(cell)
+
+    def add(self, cell):
+        """
+        Mark a cell as free
+        :param cell: The (row, col) coordinates of the cell
+        """
+        if cell not in self.position:
+            self.position[cell] = len(self.cells)
+            self.cells.append(cell)
+
+    def remove(self, cell):
+        """
+        Mark a cell as taken, cells that are not free are ignored
+        :param cell: The (row, col) coordinates of the cell
+        """
+        index = self.position.pop(cell, None)
+        if index is None:
+            return
+        last = self.cells.pop()
+        if index < len(self.cells):
+            self.cells[index] = last
+            self.position[last] = index
+
+    def sample(self, rand=random):
+        """
+        Draw a uniformly random free cell
+        :param rand: A source of randomness with a `randrange` method
+        :return: The (row, col) coordinates of the cell, None if there are no free cells
+        """
+        if not self.cells:
+            return None
+        return self.cells[rand.randrange(len(self.cells))]
+
+    def __contains__(self, cell):
+        return cell in self.position
+
+    def __len__(self):
+        return len(self.cells)
+
+
+class BucketGrid:
+    """
+    A spatial index of cells for nearest neighbour queries: the board is split into square buckets of cells, and a
+    query looks at the rings of buckets around the bucket of the cell, nearest ring first, until no bucket that is
+    left can hold a closer cell. Adding and removing a cell are O(1)
+    """
+
+    def __init__(self, board_size, bucket_size=4, wrap=True, cells=()):
+        """
+        :param board_size: The size of the board
+        :param bucket_size: The number of rows (and columns) of a bucket
+        :param wrap: Measure the distances around the borders of the board (a board without borders)
+        :param cells: The cells to add
+        """
+        self.board_size = board_size
+        self.bucket_size = bucket_size
+        self.wrap = wrap
+        self.buckets_per_side = -(-board_size // bucket_size)
+        # the last bucket of a row is smaller when the size isn't a multiple of the bucket size, a ring that wraps
+        # around through it is closer by the missing cells
+        self.slack = (-board_size) % bucket_size if wrap else 0
+        self.buckets = [set() for _ in range(self.buckets_per_side * self.buckets_per_side)]
+        self.count = 0
+        for cell in cells:
+            self.add(cell)
+
+    def bucket(self, cell):
+        return self.buckets[cell[0] // self.bucket_size * self.buckets_per_side + cell[1] // self.bucket_size]
+
+    def add(self, cell):
+        """
+        Add a cell to the index
+        :param cell: The (row, col) coordinates of the cell
+        """
+        bucket = self.bucket(cell)
+        if cell not in bucket:
+            bucket.add(cell)
+            self.count += 1
+
+    def remove(self, cell):
+        """
+        Remove a cell from the index, cells that are not in it are ignored
+        :param cell: The (row, col) coordinates of the cell
+        """
+        bucket = self.bucket(cell)
+        if cell in bucket:
+            bucket.remove(cell)
+            self.count -= 1
+
+    def distance(self, a, b):
+        di, dj = abs(a[0] - b[0]), abs(a[1] - b[1])
+        if self.wrap:
+            di, dj = min(di, self.board_size - di), min(dj, self.board_size - dj)
+        return di + dj
+
+    def nearest(self, cell):
+        """
+        Find the closest cell of the index to a cell (manhattan distance)
+        :param cell: The (row, col) coordinates of the cell
+        :return: A tuple of (the closest cell, its distance), (None, None) if the index is empty
+        """
+        if not self.count:
+            return None, None
+        n = self.buckets_per_side
+        bi, bj = cell[0] // self.bucket_size, cell[1] // self.bucket_size
+        best, best_distance = None, None
+        visited = set()
+        for r in range(n if not self.wrap else n // 2 + 1):
+            # every cell of a bucket r rings away is at least (r - 1) * bucket_size + 1 rows or columns away
+            if best is not None and best_distance <= (r - 1) * self.bucket_size + 1 - self.slack:
+                break
+            for di in range(-r, r + 1):
+                for dj in range(-r, r + 1):
+                    if max(abs(di), abs(dj)) != r:
+                        continue
+                    i, j = bi + di, bj + dj
+                    if self.wrap:
+                        i, j = i % n, j % n
+                    elif not (0 <= i < n and 0 <= j < n):
+                        continue
+                    if (i, j) in visited:
+                        continue
+                    visited.add((i, j))
+                    for other in self.buckets[i * n + j]:
+                        distance = self.distance(cell, other)
+                        if best is None or distance < best_distance:
+                            best, best_distance = other, distance
+        return best, best_distance
+
+    def __contains__(self, cell):
+        return cell in self.bucket(cell)
+
+    def __len__(self):
+        return self.count
+
+
 """
 END of Data Structure declaration
 """
@@ -0,0 +1,289 @@
+"""
+A NumPy environment that plays many Snake games in lockstep.
+All the games share the board size, and the state of every game is a row of stacked arrays over the flat cells of the
+board (cell = row * board_size + col):
+- obstacles: True for the cells with an obstacle
+- age: for every part of the snake, the number of ticks until it leaves its cell (the head is the length of the snake,
+  the tail is 1), 0 for the other cells. A tick that doesn't eat the fruit decrements all the ages, which moves the tail
+  of every snake at once, and the cells of the snake are the cells with a positive age.
+The rules are the rules of Board.step and Game.run: the head wraps around the borders (% board_size), the tail is
+removed before the collision check unless the fruit was eaten, a game is lost on an obstacle, on the snake or after 256
+ticks without a fruit, and won when no free cell is left for a fruit. Fruits are drawn uniformly from the free cells.
+
+USAGE: python3 vector_env.py -k 256 --agent astar
+"""
+import random
+import time
+from optparse import OptionParser
+
+import numpy as np
+
+import config
+from config import Direction
+from game import Board, get_agent, get_heuristic
+
+DIRECTIONS = (Direction.LEFT, Direction.RIGHT, Direction.UP, Direction.DOWN)
+_DI = np.array([0, 0, -1, 1])
+_DJ = np.array([-1, 1, 0, 0])
+STARVATION = 256
+NO_MOVE = -1
+
+
+class VectorEnv:
+    """
+    K independent Snake games advanced together
+    """
+
+    def __init__(self, boards, rng=None):
+        """
+        :param boards: The game Boards to play on (all of the same size), only their obstacles are used
+        :param rng: A numpy Generator for the fruits, a new unseeded one by default
+        """
+        self.board_size = size = boards[0].board_size
+        self.num_of_games = len(boards)
+        self.cells = size * size
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self.obstacles = np.zeros((self.num_of_games, self.cells), dtype=bool)
+        for k, board in enumerate(boards):
+            if board.board_size != size:
+                raise ValueError('All the boards of a VectorEnv must have the same size')
+            for i, j in board.obstacles:
+                if 0 <= i < size and 0 <= j < size:
+                    self.obstacles[k, i * size + j] = True
+        self.rows = np.arange(self.num_of_games)
+        self.age = np.zeros((self.num_of_games, self.cells), dtype=np.int32)
+        self.head = np.zeros(self.num_of_games, dtype=np.int64)
+        self.fruit = np.full(self.num_of_games, -1, dtype=np.int64)
+        self.length = np.zeros(self.num_of_games, dtype=np.int64)
+        self.iterations = np.zeros(self.num_of_games, dtype=np.int64)
+        self.steps = np.zeros(self.num_of_games, dtype=np.int64)
+        self.alive = np.zeros(self.num_of_games, dtype=bool)
+        self.won = np.zeros(self.num_of_games, dtype=bool)
+        self._obstacle_sets = None
+
+    @classmethod
+    def from_seeds(cls, board_size, obstacle_chance, seeds):
+        """
+        Generate one board per seed, the same board a seeded headless Game generates
+        :param board_size: The size of the boards
+        :param obstacle_chance: The chance to spawn obstacles in the boards
+        :param seeds: The seeds of the games, the first one also seeds the fruits
+        """
+        boards = []
+        for seed in seeds:
+            random.seed(seed)
+            np.random.seed(seed)
+            boards.append(Board(board_size, obstacle_chance))
+        return cls(boards, np.random.default_rng(seeds[0] if len(seeds) else None))
+
+    def reset(self, row=2, col=2):
+        """
+        Start all the games: a snake of length 1 at (row, col), as Game.run spawns it, and a fruit
+        """
+        head = row * self.board_size + col
+        self.obstacles[:, head] = False
+        self._obstacle_sets = None
+        self.age[:] = 0
+        self.age[:, head] = 1
+        self.head[:] = head
+        self.length[:] = 1
+        self.iterations[:] = 0
+        self.steps[:] = 0
+        self.alive[:] = True
+        self.won[:] = False
+        self.spawn_fruit(self.alive.copy())
+        return self.observe()
+
+    def free_cells(self):
+        """
+        Returns a (K, cells) boolean array of the cells without an obstacle or a part of the snake
+        """
+        return ~self.obstacles & (self.age == 0)
+
+    def spawn_fruit(self, games):
+        """
+        Put a fruit on a uniformly random free cell of the given games
+        :param games: A boolean mask of the games that need a new fruit
+        """
+        if not games.any():
+            return
+        free = self.free_cells()[games]
+        counts = free.sum(axis=1)
+        picks = (self.rng.random(len(counts)) * counts).astype(np.int64)
+        cells = np.argmax(np.cumsum(free, axis=1) > picks[:, np.newaxis], axis=1)
+        self.fruit[games] = np.where(counts > 0, cells, -1)
+
+    def observe(self):
+        """
+        Returns the batched observation of the games, the arrays are views of the state and must not be changed
+        """
+        shape = (self.num_of_games, self.board_size, self.board_size)
+        return {
+            'board_size': self.board_size,
+            'head': self.head,
+            'fruit': self.fruit,
+            'length': self.length,
+            'age': self.age.reshape(shape),
+            'obstacles': self.obstacles.reshape(shape),
+            'alive': self.alive,
+        }
+
+    def step(self, actions):
+        """
+        Advance all the running games by one tick
+        :param actions: An integer array of K indexes into DIRECTIONS, NO_MOVE ends a game (like an agent with no move)
+        :return: The observation after the tick
+        """
+        actions = np.asarray(actions, dtype=np.int64)
+        self.alive &= actions != NO_MOVE
+        games = self.rows[self.alive]
+        if not len(games):
+            return self.observe()
+        size = self.board_size
+        moves = actions[games]
+        i, j = np.divmod(self.head[games], size)
+        head = ((i + _DI[moves]) % size) * size + (j + _DJ[moves]) % size
+
+        eat = head == self.fruit[games]
+        moving = games[~eat]
+        self.age[moving] -= self.age[moving] > 0
+        collision = (self.age[games, head] > 0) | self.obstacles[games, head]
+        starved = self.iterations[games] == STARVATION
+        self.length[games] += eat
+        self.age[games, head] = self.length[games]
+        self.head[games] = head
+
+        dead = collision | starved
+        ate = games[eat & ~dead]
+        full = ~self.free_cells()[ate].any(axis=1)
+        self.won[ate[full]] = True
+        self.iterations[games] += 1
+        self.iterations[ate] = 1
+        self.steps[games] += 1
+        self.alive[games[dead]] = False
+        self.alive[ate[full]] = False
+        respawn = np.zeros(self.num_of_games, dtype=bool)
+        respawn[ate[~full]] = True
+        self.spawn_fruit(respawn)
+        return self.observe()
+
+    def run(self, policy, max_steps=None):
+        """
+        Play all the games to the end
+        :param policy: A function from an observation to an array of K actions (indexes into DIRECTIONS)
+        :param max_steps: Stop after this many ticks even if some games are still running
+        :return: The scores of the games (the lengths of the snakes)
+        """
+        observation = self.reset()
+        ticks = 0
+        while self.alive.any() and (max_steps is None or ticks < max_steps):
+            observation = self.step(policy(observation))
+            ticks += 1
+        return self.length.copy()
+
+    def obstacle_set(self, k):
+        """
+        Returns the obstacles of a game as a set of (row, col) coordinates, the same set object on every call
+        """
+        if self._obstacle_sets is None:
+            self._obstacle_sets = [{divmod(int(cell), self.board_size) for cell in np.flatnonzero(obstacles)}
+                                   for obstacles in self.obstacles]
+        return self._obstacle_sets[k]
+
+    def board_view(self, k):
+        """
+        Returns a read only view of one game with the attributes of a game Board, for the scalar agents
+        """
+        return BoardView(self, k)
+
+
+class BoardView:
+    """
+    One game of a VectorEnv seen as a game Board (board_size, snake, obstacles and fruit_location)
+    """
+
+    def __init__(self, env, k):
+        size = env.board_size
+        self.board_size = size
+        body = np.flatnonzero(env.age[k])
+        body = body[np.argsort(-env.age[k, body], kind='stable')]
+        self.snake = [divmod(int(cell), size) for cell in body]
+        self.obstacles = env.obstacle_set(k)
+        fruit = int(env.fruit[k])
+        self.fruit_location = divmod(fruit, size) if fruit >= 0 else ()
+        self.next_move = config.Direction.LEFT
+
+
+def agent_policy(env, agents, flag=False):
+    """
+    A policy that asks one scalar agent per game for its move, to play the agents of agent.py in a VectorEnv
+    :param env: The environment
+    :param agents: A list of K agents
+    :param flag: A parameter that determines if the board has borders
+    :return: The policy function
+    """
+
+    def policy(observation):
+        actions = np.full(env.num_of_games, NO_MOVE, dtype=np.int64)
+        for k in np.flatnonzero(observation['alive']):
+            move = agents[k].next_move(env.board_view(k), flag)
+            if move:
+                actions[k] = DIRECTIONS.index(move)
+        return actions
+
+    return policy
+
+
+def greedy_policy(observation):
+    """
+    A fully vectorized policy: move to the free neighbour closest to the fruit (wrapped manhattan distance), NO_MOVE
+    when the head is surrounded
+    """
+    size = observation['board_size']
+    head, fruit = observation['head'], observation['fruit']
+    blocked = (observation['age'] > 1) | observation['obstacles']
+    blocked = blocked.reshape(len(head), -1)
+    i, j = np.divmod(head, size)
+    fi, fj = np.divmod(np.maximum(fruit, 0), size)
+    ni = (i[:, np.newaxis] + _DI) % size
+    nj = (j[:, np.newaxis] + _DJ) % size
+    di = np.abs(ni - fi[:, np.newaxis])
+    dj = np.abs(nj - fj[:, np.newaxis])
+    distance = np.minimum(di, size - di) + np.minimum(dj, size - dj)
+    distance = np.where(blocked[np.arange(len(head))[:, np.newaxis], ni * size + nj], np.iinfo(np.int64).max,
+                        distance)
+    actions = np.argmin(distance, axis=1)
+    return np.where(distance.min(axis=1) == np.iinfo(np.int64).max, NO_MOVE, actions)
+
+
+def main():
+    usage_str = """USAGE:python3 vector_env.py <options>"""
+    parser = OptionParser(usage_str)
+    parser.add_option('-k', '--num-of-games', help='Number of games to play together', default=256, type=int)
+    parser.add_option('-s', '--size', dest='board_size', help='The size of the board', default=config.BOARD_SIZE,
+                      type=int)
+    parser.add_option('--obstacle-chance', help='Chance to spawn obstacles in the board', default=0.2, type=float)
+    parser.add_option('--seed', help='Seed of the first game, game i uses seed + i', default=0, type=int)
+    policies = ['greedy', 'astar', 'bfs', 'gbfs', 'bibfs', 'jps', 'idastar', 'smastar']
+    parser.add_option('--agent', choices=policies, default=policies[0], type='choice', metavar=policies,
+                      help='The policy: the vectorized greedy policy or one of the search agents')
+    parser.add_option('--heu', help='The heuristic for the A* agent', default='manhattan')
+    args, _ = parser.parse_args()
+
+    seeds = list(range(args.seed, args.seed + args.num_of_games))
+    env = VectorEnv.from_seeds(args.board_size, args.obstacle_chance, seeds)
+    if args.agent == 'greedy':
+        policy = greedy_policy
+    else:
+        agents = [get_agent(args.agent, size=args.board_size, heu=get_heuristic(args.heu)) for _ in seeds]
+        policy = agent_policy(env, agents)
+    start = time.perf_counter()
+    scores = env.run(policy)
+    wall_time = time.perf_counter() - start
+    avg = scores.mean()
+    print(f'Finished {len(scores)} games in {wall_time:.2f}s ({env.steps.sum() / wall_time:.0f} ticks/s) with average '
+          f'score of {avg}, average board coverage: {avg / env.cells * 100: 0.2f}%')
+
+
+if __name__ == '__main__':
+    main()
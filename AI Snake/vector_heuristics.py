@@ -0,0 +1,85 @@
+"""
+NumPy implementations of the shape heuristics of utils (squareness and compactness).
+The snake is laid on an occupancy grid that holds the index of every part of the body (-1 for cells without a snake),
+so adjacencies are counted with shifted views of the grid and bounding boxes with min/max reductions, instead of
+Python loops over all the pairs of parts.
+All the functions take a board (a SnakeState or a game Board) and return the same values as the utils functions.
+"""
+import numpy as np
+
+
+def body_coordinates(board):
+    """
+    Returns the rows and columns of the snake's parts, the head first
+    :param board: A SnakeState or a game Board
+    :return: A tuple of two integer arrays (rows, cols)
+    """
+    body = getattr(board, 'body', None)
+    if body is not None:
+        return np.divmod(np.fromiter(body, dtype=np.int64, count=len(body)), board.board_size)
+    snake = np.array(board.snake, dtype=np.int64).reshape(-1, 2)
+    return snake[:, 0], snake[:, 1]
+
+
+def squareness(board):
+    """
+    Vectorized utils.squareness: the bounding box of the snake (measured from the corner of the board) against its
+    length
+    """
+    rows, cols = body_coordinates(board)
+    return int(_squareness(rows.max(), cols.max(), len(rows)))
+
+
+def _squareness(row_max, col_max, length):
+    # utils.squareness starts its bounding box from (0, 0), and all the coordinates are non negative
+    return row_max * -col_max - length
+
+
+def compactness(board):
+    """
+    Vectorized utils.compactness: minus the number of neighbouring pairs of parts of the snake, where a pair is
+    counted when the part closer to the head is right of or below the other one (as utils.compactness counts them)
+    """
+    grid = np.full((board.board_size, board.board_size), -1, dtype=np.int64)
+    rows, cols = body_coordinates(board)
+    grid[rows, cols] = np.arange(len(rows))
+    return -int(_count_pairs(grid[np.newaxis])[0])
+
+
+def _count_pairs(grids):
+    """
+    Count the counted neighbouring pairs of a stack of occupancy grids
+    :param grids: An array of shape (K, board_size, board_size) of body indexes, -1 for empty cells
+    :return: An array of K counts
+    """
+    left, right = grids[:, :, :-1], grids[:, :, 1:]
+    top, bottom = grids[:, :-1, :], grids[:, 1:, :]
+    horizontal = (right >= 0) & (right < left)
+    vertical = (bottom >= 0) & (bottom < top)
+    return horizontal.sum(axis=(1, 2)) + vertical.sum(axis=(1, 2))
+
+
+def batch_shape_features(boards):
+    """
+    Computes squareness and compactness of many boards of the same size in one call, with the snakes of all the
+    boards stacked on one array of occupancy grids
+    :param boards: A list of SnakeStates (or game Boards) of the same board size
+    :return: A tuple of two integer arrays (squareness, compactness), one value per board
+    """
+    if not boards:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    size = boards[0].board_size
+    coordinates = [body_coordinates(board) for board in boards]
+    lengths = np.array([len(rows) for rows, _ in coordinates])
+    rows = np.concatenate([rows for rows, _ in coordinates])
+    cols = np.concatenate([cols for _, cols in coordinates])
+    which = np.repeat(np.arange(len(boards)), lengths)
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    ranks = np.arange(len(rows)) - np.repeat(starts, lengths)
+
+    grids = np.full((len(boards), size, size), -1, dtype=np.int64)
+    grids[which, rows, cols] = ranks
+    compact = -_count_pairs(grids)
+    square = _squareness(np.maximum.reduceat(rows, starts), np.maximum.reduceat(cols, starts), lengths)
+    return square, compact
+